@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pathlib
+import pickle
+import sys
+import time
+from typing import Any, Dict, List
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf.batch import _finish_batch, _parse_batch, parse_many
+
+
+def field_count(message) -> int:
+    return len(message.fields) if message is not None else 0
+
+
+def parent_share(corpus: List[bytes], options: Dict[str, Any]) -> float:
+    # share of the work that stays serial in the parent process, which
+    # caps the speedup at 1 / share however many workers run
+    transform = options.get("transform")
+    rebuild = options.get("rebuild", False)
+    start = time.perf_counter()
+    results = pickle.dumps(_parse_batch(corpus, transform))
+    worker_time = time.perf_counter() - start
+    start = time.perf_counter()
+    # parent side as in parse_many: unpickle the results and yield them in
+    # input order
+    results = pickle.loads(results)
+
+    for _ in _finish_batch(corpus, results, transform, rebuild):
+        pass
+
+    parent_time = time.perf_counter() - start
+
+    return parent_time / (worker_time + parent_time)
+
+
+if __name__ == "__main__":
+    payload = bytes.fromhex(
+        "08 96 01 12 0A 50 68 6F 6E 65 20 42 6F 6F"
+        "6B 18 01 22 0F 0A 0B 41 6C 65 78 20 49 76"
+        "61 6E 6F 76 10 01 22 0F 0A 0B 56 6F 76 61"
+        "20 50 65 74 72 6F 76 10 02"
+    )
+    corpus = [payload] * 20_000
+    # the worker counts to try can be given on the command line
+    worker_counts = [int(arg) for arg in sys.argv[1:]] or [
+        1 << i for i in range((os.cpu_count() or 1).bit_length())
+    ]
+    modes = {
+        "records": {},
+        "rebuilt": {"rebuild": True},
+        "summaries": {"transform": field_count},
+    }
+
+    for kind, options in modes.items():
+        share = parent_share(corpus, options)
+        print(f"{kind:>9}: parent share {share:6.1%}, speedup cap "
+              f"{1 / share:6.1f}x")
+
+    for kind, options in modes.items():
+        baseline = None
+
+        for workers in worker_counts:
+            start = time.perf_counter()
+            results = parse_many(corpus, workers, 256, **options)
+            results = sum(1 for _ in results)
+            elapsed = time.perf_counter() - start
+            throughput = len(corpus) / elapsed
+            baseline = baseline or throughput
+
+            assert results == len(corpus)
+            print(
+                f"workers={workers:<3} {kind:>9}: "
+                f"{throughput:10.0f} payloads/s "
+                f"{throughput / baseline:6.2f}x"
+            )
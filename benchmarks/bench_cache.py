@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pathlib
+import sys
+import timeit
+from typing import List, Optional
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf import parser
+
+
+def encode_chunk(field_no: int, payload: bytes) -> bytes:
+    return bytes([field_no << 3 | 2, len(payload)]) + payload
+
+
+def records(count: int, distinct: int) -> List[bytes]:
+    # records with a timestamp of their own around a nested config blob,
+    # which repeats across every distinct-th record
+    result = []
+
+    for i in range(count):
+        config = encode_chunk(1, b"service-%d" % (i % distinct)) + b"".join(
+            encode_chunk(2, bytes.fromhex("08 96 01 10 01 1d 00 00 80 3f"))
+            for _ in range(4)
+        )
+        result.append(
+            bytes([0x08, i & 0x7f, 0x10, i >> 7 & 0x7f]) +
+            encode_chunk(3, config)
+        )
+
+    return result
+
+
+def parse_all(
+    payloads: List[bytes], cache: Optional[parser.ParseCache]
+) -> None:
+    if cache is not None:
+        cache.clear()
+
+    for payload in payloads:
+        parser.parse_proto(payload, cache=cache)
+
+
+if __name__ == "__main__":
+    for name, payloads in (
+        # the same heartbeat over and over
+        ("heartbeats", [records(1, 1)[0]] * 20_000),
+        ("shared configs", records(20_000, 10)),
+        ("distinct configs", records(20_000, 20_000)),
+    ):
+        for label, cache in (
+            ("no cache", None), ("cache", parser.ParseCache())
+        ):
+            best = min(timeit.repeat(
+                lambda: parse_all(payloads, cache), number=1, repeat=5
+            ))
+            print(
+                f"{name:>16} {label:>8}: "
+                f"{len(payloads) / best / 1e3:8.1f} k records/s"
+                + (f", {cache!r}" if cache is not None else "")
+            )
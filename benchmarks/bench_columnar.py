@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import pathlib
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Iterable, List, Tuple
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf.columnar import export_csv, iter_field_columns
+    from revpbuf.parser import (
+        ChunkRepr, Fixed32Repr, FixedRepr, VarintRepr, parse_proto
+    )
+
+
+def encode_chunk(field_no: int, payload: bytes) -> bytes:
+    return bytes([field_no << 3 | 2, len(payload)]) + payload
+
+
+def records(count: int) -> List[bytes]:
+    # small log-like records with a nested header and a few scalars
+    result = []
+
+    for i in range(count):
+        header = bytes([0x08, i & 0x7f, 0x10, 0x01]) + encode_chunk(
+            3, b"service-%d" % (i % 10)
+        )
+        result.append(
+            encode_chunk(1, header) + bytes.fromhex("10 96 01 1d 00 00 80 3f")
+            + encode_chunk(4, b"request handled in %d ms" % i)
+        )
+
+    return result
+
+
+def walk_trees(payloads: Iterable[bytes]) -> int:
+    # the same rows collected from parsed message trees
+    rows = []
+
+    for record, payload in enumerate(payloads):
+        stack = [("", iter(parse_proto(payload).fields))]
+
+        while stack:
+            path, fields = stack[-1]
+            field = next(fields, None)
+
+            if field is None:
+                stack.pop()
+                continue
+
+            field_no = field.field_desc.field_no
+            field_repr = field.field_repr
+
+            if isinstance(field_repr, VarintRepr):
+                rows.append((record, path, field_no, field_repr.int))
+            elif isinstance(field_repr, FixedRepr):
+                rows.append((
+                    record, path, field_no, field_repr.value,
+                    isinstance(field_repr, Fixed32Repr)
+                ))
+            elif isinstance(field_repr, ChunkRepr):
+                rows.append((record, path, field_no, field_repr.str))
+
+                if field_repr.msg is not None:
+                    sub_path = f"{path}.{field_no}" if path else str(field_no)
+                    stack.append((sub_path, iter(field_repr.msg.fields)))
+
+    return len(rows)
+
+
+def columns(payloads: Iterable[bytes]) -> int:
+    return sum(len(batch) for batch in iter_field_columns(payloads))
+
+
+def measure(func: Callable[[], Any]) -> Tuple[float, int]:
+    best = min(timeit.repeat(func, number=1, repeat=5))
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+if __name__ == "__main__":
+    payloads = records(50_000)
+    rows = columns(payloads)
+
+    for name, func in (
+        ("trees", lambda: walk_trees(payloads)),
+        ("columnar", lambda: columns(payloads)),
+        ("csv", lambda: export_csv(payloads, io.StringIO())),
+    ):
+        best, peak = measure(func)
+        print(
+            f"{name:>8}: {rows / best / 1e6:6.2f} M rows/s, "
+            f"peak {peak / 1024:10.1f} KiB"
+        )
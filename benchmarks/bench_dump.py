@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pathlib
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+    sys.path.append(str(cur_dir.parent / "examples"))
+
+    from utils import Printer
+    from revpbuf.core import dump
+    from revpbuf.parser import parse_proto
+
+
+def encode_chunk(field_no: int, payload: bytes) -> bytes:
+    length = bytearray()
+    size = len(payload)
+
+    while size > 0x7f:
+        length.append(size & 0x7f | 0x80)
+        size >>= 7
+
+    length.append(size)
+
+    return bytes([field_no << 3 | 2]) + bytes(length) + payload
+
+
+def nested_payload(depth: int, width: int) -> bytes:
+    # every level holds a few scalar fields and the next level
+    leaf = bytes.fromhex("08 96 01 15 00 00 80 3f") + encode_chunk(3, b"leaf")
+    payload = leaf
+
+    for _ in range(depth):
+        payload = leaf * width + encode_chunk(4, payload)
+
+    return payload
+
+
+def print_to(message: Any, stream: Any) -> None:
+    printer = Printer()
+
+    for field in message.fields:
+        stream.write(field.field_desc.accept(printer))
+        stream.write(field.field_repr.accept(printer))
+
+
+def measure(func: Callable[[], Any]) -> Tuple[float, int]:
+    best = min(timeit.repeat(func, number=1, repeat=5))
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+if __name__ == "__main__":
+    message = parse_proto(nested_payload(depth=100, width=20))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "dump.txt")
+
+        def printer() -> None:
+            with open(path, "w") as stream:
+                print_to(message, stream)
+
+        def dumper() -> None:
+            with open(path, "wb") as stream:
+                dump(message, stream)
+
+        for name, func in (("printer", printer), ("dump", dumper)):
+            best, peak = measure(func)
+            size = os.path.getsize(path)
+            print(
+                f"{name:>8}: {size / best / 1e6:8.2f} MB/s, "
+                f"peak {peak / 1024:10.1f} KiB"
+            )
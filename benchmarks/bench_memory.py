@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pathlib
+import sys
+import tracemalloc
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf.parser import parse_proto
+
+CORPORA = {
+    "varint": bytes.fromhex("08 96 01"),
+    "fixed32": bytes.fromhex("0d 00 00 20 3e"),
+    "fixed64": bytes.fromhex("09 00 00 00 00 00 00 00 40"),
+    "chunk": bytes.fromhex("12 04 74 65 73 74"),
+}
+
+
+def retained_per_field(field: bytes, count: int) -> float:
+    payload = field * count
+    tracemalloc.start()
+    message = parse_proto(payload)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(message.fields) == count
+
+    return retained / count
+
+
+if __name__ == "__main__":
+    for name, field in CORPORA.items():
+        per_field = retained_per_field(field, 100_000)
+        print(f"{name:>8}: {per_field:6.1f} bytes/field")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pathlib
+import sys
+import timeit
+from typing import Any, Callable
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf import core, parser
+
+
+def encode_varint(value: int) -> bytes:
+    result = bytearray()
+
+    while value > 0x7f:
+        result.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    result.append(value)
+
+    return bytes(result)
+
+
+def decode_all_varints(decode_varint: Callable, payload: bytes) -> int:
+    offset = 0
+    count = 0
+    end = len(payload)
+
+    while offset != end:
+        _, offset = decode_varint(payload, offset)
+        count += 1
+
+    return count
+
+
+def best_time(func: Callable[[], Any]) -> float:
+    return min(timeit.repeat(func, number=5, repeat=5)) / 5
+
+
+if __name__ == "__main__":
+    if core._speedups is None:
+        sys.exit("C speedups are not built: python setup.py build_ext -i")
+
+    # 10k fields: varints of various width, short chunks and fixed values
+    field = bytes.fromhex(
+        "08 96 01 10 ff ff ff ff 0f 1a 04 74 65 73 74 25 00 00 80 3f"
+    )
+    payload = field * 10_000
+    fields = len(core.py_scan_fields(payload)[0])
+    cases = {
+        "decode_varint": (
+            lambda: decode_all_varints(core.py_decode_varint, payload),
+            lambda: decode_all_varints(core._speedups.decode_varint, payload)
+        ),
+        "scan_fields": (
+            lambda: core.py_scan_fields(payload),
+            lambda: core._speedups.scan_fields(payload)
+        ),
+    }
+
+    for name, (py_func, c_func) in cases.items():
+        py_time = best_time(py_func)
+        c_time = best_time(c_func)
+        print(
+            f"{name:>14}: {py_time / fields * 1e9:8.1f} ns/field python, "
+            f"{c_time / fields * 1e9:8.1f} ns/field c, "
+            f"x{py_time / c_time:.1f}"
+        )
+
+    # 100k packed elements of one to five bytes
+    packed = b"".join(
+        encode_varint(i * 7919 % (1 << 7 * (1 + i % 5)))
+        for i in range(100_000)
+    )
+    py_time = best_time(lambda: parser.py_decode_packed_varints(packed))
+    c_time = best_time(
+        lambda: core._speedups.decode_packed_varints(packed)
+    )
+    print(
+        f"{'packed_varints':>14}: {py_time / 100_000 * 1e9:8.1f} ns/item "
+        f"python, {c_time / 100_000 * 1e9:8.1f} ns/item c, "
+        f"x{py_time / c_time:.1f}"
+    )
+
+    # parse_proto binds scan_fields on import, so swap it for the
+    # pure Python implementation to compare the whole parser
+    c_time = best_time(lambda: parser.parse_proto(payload))
+    parser.scan_fields = core.py_scan_fields
+    py_time = best_time(lambda: parser.parse_proto(payload))
+    print(
+        f"{'parse_proto':>14}: {py_time / fields * 1e9:8.1f} ns/field python, "
+        f"{c_time / fields * 1e9:8.1f} ns/field c, x{py_time / c_time:.1f}"
+    )
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import pathlib
+import sys
+import timeit
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf.core import (
+        decode_identifier, decode_value, read_identifier, read_value
+    )
+
+
+def stream_fields(payload: bytes) -> int:
+    stream = io.BytesIO(payload)
+    count = 0
+
+    while True:
+        proto_id = read_identifier(stream)
+
+        if proto_id is None:
+            return count
+
+        read_value(stream, proto_id.wire_type)
+        count += 1
+
+
+def buffer_fields(payload: bytes) -> int:
+    offset = 0
+    count = 0
+
+    while True:
+        proto_id, offset = decode_identifier(payload, offset)
+
+        if proto_id is None:
+            return count
+
+        _, offset = decode_value(payload, offset, proto_id.wire_type)
+        count += 1
+
+
+if __name__ == "__main__":
+    # 10k fields: varints of various width and short chunks
+    field = bytes.fromhex("08 96 01 10 ff ff ff ff 0f 1a 04 74 65 73 74")
+    payload = field * 10_000
+    fields = buffer_fields(payload)
+
+    assert fields == stream_fields(payload)
+
+    for name, func in (("stream", stream_fields), ("buffer", buffer_fields)):
+        best = min(timeit.repeat(lambda: func(payload), number=10, repeat=5))
+        per_field = best / 10 / fields * 1e9
+        print(f"{name:>8}: {per_field:8.1f} ns/field")
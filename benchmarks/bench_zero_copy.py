@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pathlib
+import sys
+import time
+import tracemalloc
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+
+    from revpbuf.parser import parse_proto
+
+
+def encode_varint(value: int) -> bytes:
+    result = bytearray()
+
+    while value > 0x7f:
+        result.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    result.append(value)
+
+    return bytes(result)
+
+
+def nested_payload(size: int, depth: int) -> bytes:
+    # a blob that can not be parsed as a message wrapped into `depth` levels
+    payload = b"\xff" * size
+
+    for _ in range(depth):
+        payload = b"\x0a" + encode_varint(len(payload)) + payload
+
+    return payload
+
+
+def deep_payload(depth: int) -> bytes:
+    # a small message wrapped into `depth` levels, each with a trailing
+    # varint field, built without copying the inner levels again
+    leaf = bytes.fromhex("08 01 12 04 6c 65 61 66")
+    trailer = bytes.fromhex("08 01")
+    headers = []
+    size = len(leaf)
+
+    for _ in range(depth):
+        header = b"\x1a" + encode_varint(size)
+        headers.append(header)
+        size += len(header) + len(trailer)
+
+    return b"".join(reversed(headers)) + leaf + trailer * depth
+
+
+def peak_memory(payload: bytes, zero_copy: bool) -> int:
+    tracemalloc.start()
+    message = parse_proto(payload, zero_copy=zero_copy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert message is not None
+
+    return peak
+
+
+if __name__ == "__main__":
+    size = 4 * 1024 * 1024
+
+    for depth in (1, 4, 16):
+        payload = nested_payload(size, depth)
+
+        for zero_copy in (False, True):
+            peak = peak_memory(payload, zero_copy)
+            print(
+                f"depth {depth:>2} zero_copy={zero_copy!s:<5}: "
+                f"peak {peak / len(payload):6.2f}x of input size on top of it"
+            )
+
+    # parse time should grow linearly with the nesting depth in both modes
+    for depth in (5_000, 10_000, 20_000, 40_000):
+        payload = deep_payload(depth)
+
+        for zero_copy in (False, True):
+            start = time.perf_counter()
+            parse_proto(payload, zero_copy=zero_copy)
+            elapsed = time.perf_counter() - start
+            print(
+                f"depth {depth:>6} zero_copy={zero_copy!s:<5}: "
+                f"{elapsed:6.3f} s, {elapsed / depth * 1e6:5.2f} us/level"
+            )
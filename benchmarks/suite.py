@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import fnmatch
+import io
+import json
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+if __name__ == "__main__":
+    cur_dir = pathlib.Path(__file__).parent.absolute()
+    sys.path.append(str(cur_dir.parent))
+    sys.path.append(str(cur_dir.parent / "examples"))
+
+    from utils import Printer
+    from revpbuf.core import (
+        decode_varint, dumps, read_identifier, read_varint, scan_fields
+    )
+    from revpbuf.columnar import iter_field_columns
+    from revpbuf.export import to_json
+    from revpbuf.parser import MessageRepr, parse_proto
+    from revpbuf.schema import compile_hints
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[[], Any]
+    ops: int
+    size: int
+
+
+def encode_varint(value: int) -> bytes:
+    result = bytearray()
+
+    while value > 0x7f:
+        result.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    result.append(value)
+
+    return bytes(result)
+
+
+def encode_field(field_no: int, wire_type: int, value: Any) -> bytes:
+    tag = encode_varint(field_no << 3 | wire_type)
+
+    if wire_type == 0:
+        return tag + encode_varint(value)
+    elif wire_type == 2:
+        return tag + encode_varint(len(value)) + value
+
+    return tag + value
+
+
+def small_varints(count: int = 20_000) -> bytes:
+    return b"".join(
+        encode_field(1 + i % 15, 0, (i * 7919) % (1 << (7 * (1 + i % 5))))
+        for i in range(count)
+    )
+
+
+def large_strings(count: int = 8, size: int = 256 * 1024) -> bytes:
+    text = (b"The quick brown fox jumps over the lazy dog. " * size)[:size]
+
+    return b"".join(encode_field(2, 2, text) for _ in range(count))
+
+
+def deeply_nested(depth: int = 64) -> bytes:
+    payload = encode_field(1, 0, 150) + encode_field(2, 2, b"leaf")
+
+    for _ in range(depth):
+        payload = encode_field(3, 2, payload) + encode_field(1, 0, 1)
+
+    return payload
+
+
+def wide_repeated(count: int = 5_000) -> bytes:
+    item = (
+        encode_field(1, 0, 42) + encode_field(2, 2, b"name") +
+        encode_field(3, 5, b"\x00\x00\x20\x3e")
+    )
+
+    return encode_field(1, 2, item) * count
+
+
+def packed_arrays(count: int = 50_000) -> bytes:
+    varints = b"".join(encode_varint(i * 31) for i in range(count))
+    fixed32 = b"".join((i * 17).to_bytes(4, "little") for i in range(count))
+
+    return encode_field(4, 2, varints) + encode_field(5, 2, fixed32)
+
+
+def proto_print(message: MessageRepr) -> str:
+    printer = Printer()
+    str_stream = io.StringIO()
+
+    for field in message.fields:
+        str_stream.write(field.field_desc.accept(printer))
+        str_stream.write(field.field_repr.accept(printer))
+
+    return str_stream.getvalue()
+
+
+def read_all_varints(payload: bytes) -> int:
+    stream = io.BytesIO(payload)
+    count = 0
+
+    while read_varint(stream) is not None:
+        count += 1
+
+    return count
+
+
+def decode_all_varints(payload: bytes) -> int:
+    offset = 0
+    count = 0
+    end = len(payload)
+
+    while offset != end:
+        _, offset = decode_varint(payload, offset)
+        count += 1
+
+    return count
+
+
+def read_all_identifiers(payload: bytes) -> int:
+    stream = io.BytesIO(payload)
+    count = 0
+
+    while read_identifier(stream) is not None:
+        count += 1
+
+    return count
+
+
+def benchmarks() -> Iterator[Benchmark]:
+    varints = small_varints()
+    varint_count = decode_all_varints(varints)
+    # every other varint of the corpus is a field tag
+    tags = b"".join(encode_varint(1 + i % 2047 << 3) for i in range(20_000))
+
+    yield Benchmark(
+        "read_varint/small", lambda: read_all_varints(varints),
+        varint_count, len(varints)
+    )
+    yield Benchmark(
+        "decode_varint/small", lambda: decode_all_varints(varints),
+        varint_count, len(varints)
+    )
+    yield Benchmark(
+        "read_identifier/tags", lambda: read_all_identifiers(tags),
+        20_000, len(tags)
+    )
+
+    corpora = {
+        "small_varints": varints,
+        "large_strings": large_strings(),
+        "deeply_nested": deeply_nested(),
+        "wide_repeated": wide_repeated(),
+        "packed_arrays": packed_arrays(),
+    }
+
+    for name, payload in corpora.items():
+        message = parse_proto(payload)
+
+        assert message is not None, name
+
+        yield Benchmark(
+            f"scan_fields/{name}",
+            lambda payload=payload: scan_fields(payload), 1, len(payload)
+        )
+        yield Benchmark(
+            f"parse_proto/{name}",
+            lambda payload=payload: parse_proto(payload), 1, len(payload)
+        )
+        yield Benchmark(
+            f"print/{name}",
+            lambda message=message: proto_print(message), 1, len(payload)
+        )
+        yield Benchmark(
+            f"dump/{name}",
+            lambda message=message: dumps(message), 1, len(payload)
+        )
+        yield Benchmark(
+            f"json/{name}",
+            lambda message=message: to_json(message), 1, len(payload)
+        )
+        yield Benchmark(
+            f"columnar/{name}",
+            lambda payload=payload: list(iter_field_columns([payload])), 1,
+            len(payload)
+        )
+
+    # extraction of a single deep field and of a field from a wide message
+    # with lazily parsed sub-messages
+    for name, path in (
+        ("deeply_nested", "3." * 64 + "2"), ("wide_repeated", "1.2")
+    ):
+        payload = corpora[name]
+
+        assert parse_proto(payload, eager_depth=0).find(path) is not None
+
+        yield Benchmark(
+            f"find/{name}",
+            lambda payload=payload, path=path: (
+                parse_proto(payload, eager_depth=0).find(path)
+            ), 1, len(payload)
+        )
+
+    # projections selecting a few of the fields
+    for name, include in (
+        ("small_varints", {1, 2}), ("wide_repeated", {1: {2}})
+    ):
+        payload = corpora[name]
+
+        yield Benchmark(
+            f"include/{name}",
+            lambda payload=payload, include=include: (
+                parse_proto(payload, include=include)
+            ), 1, len(payload)
+        )
+
+    hinted = compile_hints({1: {1: "uint", 2: "str", 3: "float"}})
+    payload = corpora["wide_repeated"]
+
+    yield Benchmark(
+        "parse_hinted/wide_repeated", lambda: hinted.parse(payload), 1,
+        len(payload)
+    )
+
+
+def measure(benchmark: Benchmark, min_time: float,
+            repeat: int) -> Dict[str, float]:
+    best = float("inf")
+
+    for _ in range(repeat):
+        loops = 0
+        start = time.perf_counter()
+
+        while True:
+            benchmark.func()
+            loops += 1
+            elapsed = time.perf_counter() - start
+
+            if elapsed >= min_time:
+                break
+
+        best = min(best, elapsed / loops)
+
+    tracemalloc.start()
+    benchmark.func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": benchmark.ops / best,
+        "mb_per_sec": benchmark.size / best / 1e6,
+        "peak_memory": peak,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]], threshold: float) -> bool:
+    regressed = False
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["ops_per_sec"] / baseline[name]["ops_per_sec"]
+        marker = ""
+
+        if ratio < 1 - threshold:
+            marker = "  <-- regression"
+            regressed = True
+
+        print(f"{name:<32} {ratio:6.2f}x vs baseline{marker}")
+
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark revpbuf parsing hot paths"
+    )
+    arg_parser.add_argument(
+        "-k", dest="pattern", default="*",
+        help="run only benchmarks matching the glob pattern"
+    )
+    arg_parser.add_argument("--min-time", type=float, default=0.2)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--save", help="save results to a JSON file")
+    arg_parser.add_argument(
+        "--compare", help="compare results with a saved JSON file"
+    )
+    arg_parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="relative slowdown reported as a regression"
+    )
+    args = arg_parser.parse_args(argv)
+    results = {}
+
+    for benchmark in benchmarks():
+        if not fnmatch.fnmatch(benchmark.name, args.pattern):
+            continue
+
+        result = measure(benchmark, args.min_time, args.repeat)
+        results[benchmark.name] = result
+        print(
+            f"{benchmark.name:<32} {result['ops_per_sec']:12.1f} ops/s "
+            f"{result['mb_per_sec']:9.2f} MB/s "
+            f"{result['peak_memory'] / 1024:10.1f} KiB peak"
+        )
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "results": results
+                },
+                output,
+                indent=2
+            )
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            baseline_results = json.load(baseline)["results"]
+
+        if compare(results, baseline_results, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1110 @@
+/*
+ * C implementation of the revpbuf.core buffer scanners.
+ *
+ * The functions mirror py_decode_varint and py_scan_fields in core.py,
+ * py_decode_packed_varints in parser.py and py_scan_columns in columnar.py
+ * and accept any object that supports the buffer protocol.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+#define VARINT_MAX_SHIFT 63
+
+/* the field number checks of parser.looks_like_message, set from the
+ * constants in core.py by set_message_precheck on import */
+static Py_ssize_t precheck_fields;
+static uint64_t max_field_no;
+static uint64_t reserved_field_nos_start;
+static uint64_t reserved_field_nos_end;
+
+enum varint_status {
+    VARINT_OK,
+    VARINT_TRUNCATED,
+    VARINT_OVERLONG,
+    /* the 10th byte carries bits beyond 64, the value needs a Python int */
+    VARINT_WIDE,
+};
+
+static enum varint_status
+read_varint(const unsigned char *data, Py_ssize_t size, Py_ssize_t *offset,
+            uint64_t *value)
+{
+    uint64_t varint = 0;
+    unsigned int shift = 0;
+    Py_ssize_t pos = *offset;
+
+    while (pos < size) {
+        unsigned char byte = data[pos++];
+
+        if (shift == VARINT_MAX_SHIFT && (byte & 0x7f) > 1) {
+            return (byte & 0x80) ? VARINT_OVERLONG : VARINT_WIDE;
+        }
+
+        varint |= (uint64_t)(byte & 0x7f) << shift;
+
+        if (byte < 0x80) {
+            *value = varint;
+            *offset = pos;
+            return VARINT_OK;
+        }
+
+        shift += 7;
+
+        if (shift > VARINT_MAX_SHIFT) {
+            return VARINT_OVERLONG;
+        }
+    }
+
+    return VARINT_TRUNCATED;
+}
+
+static PyObject *
+wide_varint(const unsigned char *data, Py_ssize_t offset)
+{
+    /* only reached for a terminated 10 byte varint, so compose it from the
+     * 63 low bits and the last byte shifted in place */
+    uint64_t low = 0;
+    PyObject *high, *shift, *shifted, *result;
+    int i;
+
+    for (i = 0; i < 9; i++) {
+        low |= (uint64_t)(data[offset + i] & 0x7f) << (7 * i);
+    }
+
+    high = PyLong_FromLong(data[offset + 9]);
+    shift = PyLong_FromLong(VARINT_MAX_SHIFT);
+
+    if (high == NULL || shift == NULL) {
+        Py_XDECREF(high);
+        Py_XDECREF(shift);
+        return NULL;
+    }
+
+    shifted = PyNumber_Lshift(high, shift);
+    Py_DECREF(high);
+    Py_DECREF(shift);
+
+    if (shifted == NULL) {
+        return NULL;
+    }
+
+    high = PyLong_FromUnsignedLongLong(low);
+
+    if (high == NULL) {
+        Py_DECREF(shifted);
+        return NULL;
+    }
+
+    result = PyNumber_Or(shifted, high);
+    Py_DECREF(shifted);
+    Py_DECREF(high);
+
+    return result;
+}
+
+/* builds a tuple and steals the references to its items */
+static PyObject *
+steal_tuple(Py_ssize_t size, PyObject **items)
+{
+    PyObject *tuple;
+    Py_ssize_t i;
+
+    for (i = 0; i < size; i++) {
+        if (items[i] == NULL) {
+            goto error;
+        }
+    }
+
+    tuple = PyTuple_New(size);
+
+    if (tuple == NULL) {
+        goto error;
+    }
+
+    for (i = 0; i < size; i++) {
+        PyTuple_SET_ITEM(tuple, i, items[i]);
+    }
+
+    return tuple;
+
+error:
+    for (i = 0; i < size; i++) {
+        Py_XDECREF(items[i]);
+    }
+
+    return NULL;
+}
+
+static PyObject *
+value_offset(PyObject *value, Py_ssize_t offset)
+{
+    PyObject *items[2] = {value, PyLong_FromSsize_t(offset)};
+
+    return steal_tuple(2, items);
+}
+
+static int
+check_nargs(const char *name, Py_ssize_t nargs, Py_ssize_t min,
+            Py_ssize_t max)
+{
+    if (nargs < min || nargs > max) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s expected from %zd to %zd arguments, got %zd", name,
+                     min, max, nargs);
+        return -1;
+    }
+
+    return 0;
+}
+
+static int
+parse_offset(PyObject *arg, Py_ssize_t *offset)
+{
+    *offset = PyNumber_AsSsize_t(arg, PyExc_IndexError);
+
+    return (*offset == -1 && PyErr_Occurred()) ? -1 : 0;
+}
+
+static PyObject *
+decode_varint(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    Py_buffer view;
+    Py_ssize_t offset = 0;
+    Py_ssize_t end;
+    uint64_t value;
+    PyObject *result = NULL;
+
+    if (check_nargs("decode_varint", nargs, 1, 2) < 0) {
+        return NULL;
+    }
+
+    if (nargs == 2 && parse_offset(args[1], &offset) < 0) {
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(args[0], &view, PyBUF_SIMPLE) < 0) {
+        return NULL;
+    }
+
+    end = offset;
+
+    if (offset < 0 || offset >= view.len) {
+        Py_INCREF(Py_None);
+        result = value_offset(Py_None, offset);
+        goto done;
+    }
+
+    switch (read_varint(view.buf, view.len, &end, &value)) {
+    case VARINT_OK:
+        result = value_offset(PyLong_FromUnsignedLongLong(value), end);
+        break;
+    case VARINT_TRUNCATED:
+        Py_INCREF(Py_None);
+        result = value_offset(Py_None, offset);
+        break;
+    case VARINT_OVERLONG:
+        PyErr_SetString(PyExc_ValueError, "Malformed varint");
+        break;
+    case VARINT_WIDE:
+        result = value_offset(wide_varint(view.buf, offset), offset + 10);
+        break;
+    }
+
+done:
+    PyBuffer_Release(&view);
+
+    return result;
+}
+
+static PyObject *
+scan_fields(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    Py_buffer view;
+    Py_ssize_t offset = 0;
+    Py_ssize_t end;
+    Py_ssize_t max_fields = PY_SSIZE_T_MAX;
+    const unsigned char *data;
+    PyObject *fields;
+
+    if (check_nargs("scan_fields", nargs, 1, 4) < 0) {
+        return NULL;
+    }
+
+    if (nargs >= 2 && parse_offset(args[1], &offset) < 0) {
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(args[0], &view, PyBUF_SIMPLE) < 0) {
+        return NULL;
+    }
+
+    end = view.len;
+
+    if (nargs >= 3 && args[2] != Py_None && parse_offset(args[2], &end) < 0) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    if (nargs == 4 && args[3] != Py_None &&
+        parse_offset(args[3], &max_fields) < 0) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    if (end > view.len) {
+        end = view.len;
+    }
+
+    fields = PyList_New(0);
+
+    if (fields == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    data = view.buf;
+
+    while (offset >= 0 && offset < end &&
+           PyList_GET_SIZE(fields) < max_fields) {
+        Py_ssize_t pos = offset;
+        uint64_t identifier, value;
+        PyObject *identifier_obj = NULL;
+        PyObject *value_obj = NULL;
+        Py_ssize_t value_end;
+        PyObject *field;
+
+        switch (read_varint(data, end, &pos, &identifier)) {
+        case VARINT_OK:
+            break;
+        case VARINT_WIDE:
+            identifier_obj = wide_varint(data, pos);
+            if (identifier_obj == NULL) {
+                goto error;
+            }
+            /* the wire type lives in the low bits that were decoded */
+            identifier = data[pos];
+            pos += 10;
+            break;
+        default:
+            goto stop;
+        }
+
+        switch (identifier & 0x07) {
+        case 0:
+            value_end = pos;
+
+            switch (read_varint(data, end, &value_end, &value)) {
+            case VARINT_OK:
+                break;
+            case VARINT_WIDE:
+                value_obj = wide_varint(data, pos);
+                if (value_obj == NULL) {
+                    Py_XDECREF(identifier_obj);
+                    goto error;
+                }
+                value_end = pos + 10;
+                break;
+            default:
+                Py_XDECREF(identifier_obj);
+                goto stop;
+            }
+            break;
+        case 1:
+            value = (uint64_t)pos;
+            value_end = pos + 8;
+            break;
+        case 2: {
+            uint64_t length;
+
+            if (read_varint(data, end, &pos, &length) != VARINT_OK ||
+                length > (uint64_t)(end - pos)) {
+                Py_XDECREF(identifier_obj);
+                goto stop;
+            }
+            value = (uint64_t)pos;
+            value_end = pos + (Py_ssize_t)length;
+            break;
+        }
+        case 5:
+            value = (uint64_t)pos;
+            value_end = pos + 4;
+            break;
+        default:
+            Py_XDECREF(identifier_obj);
+            goto stop;
+        }
+
+        if (value_end > end) {
+            Py_XDECREF(identifier_obj);
+            Py_XDECREF(value_obj);
+            break;
+        }
+
+        {
+            PyObject *items[3] = {
+                identifier_obj != NULL
+                    ? identifier_obj
+                    : PyLong_FromUnsignedLongLong(identifier),
+                value_obj != NULL
+                    ? value_obj
+                    : PyLong_FromUnsignedLongLong(value),
+                PyLong_FromSsize_t(value_end),
+            };
+
+            field = steal_tuple(3, items);
+        }
+
+        if (field == NULL) {
+            goto error;
+        }
+
+        if (PyList_Append(fields, field) < 0) {
+            Py_DECREF(field);
+            goto error;
+        }
+
+        Py_DECREF(field);
+        offset = value_end;
+    }
+
+stop:
+    PyBuffer_Release(&view);
+
+    return value_offset(fields, offset);
+
+error:
+    Py_DECREF(fields);
+    PyBuffer_Release(&view);
+
+    return NULL;
+}
+
+/* (value >> 1) ^ -(value & 1) of a value that does not fit 64 bits */
+static PyObject *
+zigzag_wide(PyObject *value)
+{
+    PyObject *one, *half, *sign, *negated, *result = NULL;
+
+    one = PyLong_FromLong(1);
+
+    if (one == NULL) {
+        return NULL;
+    }
+
+    half = PyNumber_Rshift(value, one);
+    sign = PyNumber_And(value, one);
+    negated = sign != NULL ? PyNumber_Negative(sign) : NULL;
+
+    if (half != NULL && negated != NULL) {
+        result = PyNumber_Xor(half, negated);
+    }
+
+    Py_DECREF(one);
+    Py_XDECREF(half);
+    Py_XDECREF(sign);
+    Py_XDECREF(negated);
+
+    return result;
+}
+
+static PyObject *
+decode_packed_varints(PyObject *module, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"payload", "zigzag", NULL};
+    Py_buffer view;
+    int zigzag = 0;
+    const unsigned char *data;
+    Py_ssize_t offset = 0;
+    Py_ssize_t count = 0;
+    Py_ssize_t index = 0;
+    Py_ssize_t i;
+    PyObject *values;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs,
+                                     "y*|p:decode_packed_varints", keywords,
+                                     &view, &zigzag)) {
+        return NULL;
+    }
+
+    data = view.buf;
+
+    /* every varint ends with the only byte of it that is below 0x80 */
+    for (i = 0; i < view.len; i++) {
+        count += data[i] < 0x80;
+    }
+
+    if (view.len > 0 && data[view.len - 1] >= 0x80) {
+        PyBuffer_Release(&view);
+        Py_RETURN_NONE;
+    }
+
+    values = PyList_New(count);
+
+    if (values == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    while (offset < view.len) {
+        Py_ssize_t start = offset;
+        uint64_t value;
+        PyObject *item;
+
+        switch (read_varint(data, view.len, &offset, &value)) {
+        case VARINT_OK:
+            item = zigzag ? PyLong_FromLongLong((long long)(value >> 1) ^
+                                                -(long long)(value & 1))
+                          : PyLong_FromUnsignedLongLong(value);
+            break;
+        case VARINT_WIDE:
+            item = wide_varint(data, start);
+            offset = start + 10;
+
+            if (item != NULL && zigzag) {
+                PyObject *wide = item;
+
+                item = zigzag_wide(wide);
+                Py_DECREF(wide);
+            }
+            break;
+        default:
+            Py_DECREF(values);
+            PyBuffer_Release(&view);
+            Py_RETURN_NONE;
+        }
+
+        if (item == NULL) {
+            Py_DECREF(values);
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+
+        PyList_SET_ITEM(values, index++, item);
+    }
+
+    PyBuffer_Release(&view);
+
+    return values;
+}
+
+/* the column buffers of scan_columns, in the order they are returned */
+enum {
+    COLUMN_RECORD,
+    COLUMN_PATH,
+    COLUMN_FIELD_NO,
+    COLUMN_WIRE_TYPE,
+    COLUMN_OFFSET,
+    COLUMN_LENGTH,
+    COLUMN_UINT,
+    COLUMN_SINT,
+    COLUMN_FLOAT,
+    COLUMN_STR_VALID,
+    COLUMN_STR_OFFSETS,
+    COLUMN_STR_DATA,
+    COLUMN_COUNT,
+};
+
+typedef struct {
+    char *data;
+    Py_ssize_t size;
+    Py_ssize_t capacity;
+} column;
+
+/* a message to be added and the message and field it was decoded from */
+typedef struct {
+    Py_ssize_t start;
+    Py_ssize_t end;
+    Py_ssize_t parent;
+    unsigned int field_no;
+} pending_message;
+
+static int
+grow(void **data, Py_ssize_t *capacity, Py_ssize_t needed, size_t item_size)
+{
+    Py_ssize_t new_capacity = *capacity ? *capacity : 64;
+    void *new_data;
+
+    while (new_capacity < needed) {
+        new_capacity *= 2;
+    }
+
+    new_data = PyMem_Realloc(*data, (size_t)new_capacity * item_size);
+
+    if (new_data == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    *data = new_data;
+    *capacity = new_capacity;
+
+    return 0;
+}
+
+static int
+column_append(column *col, const void *value, Py_ssize_t size)
+{
+    if (col->size + size > col->capacity &&
+        grow((void **)&col->data, &col->capacity, col->size + size, 1) < 0) {
+        return -1;
+    }
+
+    memcpy(col->data + col->size, value, (size_t)size);
+    col->size += size;
+
+    return 0;
+}
+
+/* the item types match the array typecodes of columnar.FieldColumns */
+static int
+append_row(column *columns, unsigned int field_no, unsigned char wire_type,
+           unsigned long long offset, unsigned long long length,
+           unsigned long long uint, long long sint, double number,
+           unsigned char str_valid, long long str_offset)
+{
+    if (column_append(&columns[COLUMN_FIELD_NO], &field_no,
+                      sizeof(field_no)) < 0 ||
+        column_append(&columns[COLUMN_WIRE_TYPE], &wire_type,
+                      sizeof(wire_type)) < 0 ||
+        column_append(&columns[COLUMN_OFFSET], &offset, sizeof(offset)) < 0 ||
+        column_append(&columns[COLUMN_LENGTH], &length, sizeof(length)) < 0 ||
+        column_append(&columns[COLUMN_UINT], &uint, sizeof(uint)) < 0 ||
+        column_append(&columns[COLUMN_SINT], &sint, sizeof(sint)) < 0 ||
+        column_append(&columns[COLUMN_FLOAT], &number, sizeof(number)) < 0 ||
+        column_append(&columns[COLUMN_STR_VALID], &str_valid,
+                      sizeof(str_valid)) < 0 ||
+        column_append(&columns[COLUMN_STR_OFFSETS], &str_offset,
+                      sizeof(str_offset)) < 0) {
+        return -1;
+    }
+
+    return 0;
+}
+
+static uint64_t
+read_fixed(const unsigned char *data, int size)
+{
+    uint64_t value = 0;
+    int i;
+
+    for (i = size - 1; i >= 0; i--) {
+        value = value << 8 | data[i];
+    }
+
+    return value;
+}
+
+static int
+is_printable(const unsigned char *data, Py_ssize_t size)
+{
+    /* string.printable is ASCII graphic characters and whitespace */
+    Py_ssize_t i;
+
+    for (i = 0; i < size; i++) {
+        unsigned char byte = data[i];
+
+        if (!(byte >= 0x20 && byte < 0x7f) && !(byte >= 0x09 && byte <= 0x0d)) {
+            return 0;
+        }
+    }
+
+    return 1;
+}
+
+static int
+valid_field_no(uint64_t field_no)
+{
+    return field_no != 0 && field_no <= max_field_no &&
+           !(field_no >= reserved_field_nos_start &&
+             field_no < reserved_field_nos_end);
+}
+
+/* whether the chunk scans as a message as a whole, like parse_proto checks
+ * before it descends into it */
+static int
+is_message(const unsigned char *data, Py_ssize_t offset, Py_ssize_t end)
+{
+    Py_ssize_t count = 0;
+
+    if (offset >= end) {
+        return 0;
+    }
+
+    while (offset < end) {
+        uint64_t identifier, value;
+
+        switch (read_varint(data, end, &offset, &identifier)) {
+        case VARINT_OK:
+            break;
+        case VARINT_WIDE:
+            if (count < precheck_fields) {
+                return 0;
+            }
+            identifier = data[offset];
+            offset += 10;
+            break;
+        default:
+            return 0;
+        }
+
+        if (count < precheck_fields && !valid_field_no(identifier >> 3)) {
+            return 0;
+        }
+
+        switch (identifier & 0x07) {
+        case 0: {
+            Py_ssize_t start = offset;
+
+            switch (read_varint(data, end, &offset, &value)) {
+            case VARINT_OK:
+                break;
+            case VARINT_WIDE:
+                offset = start + 10;
+                break;
+            default:
+                return 0;
+            }
+            break;
+        }
+        case 1:
+            offset += 8;
+            break;
+        case 2:
+            if (read_varint(data, end, &offset, &value) != VARINT_OK ||
+                value > (uint64_t)(end - offset)) {
+                return 0;
+            }
+            offset += (Py_ssize_t)value;
+            break;
+        case 5:
+            offset += 4;
+            break;
+        default:
+            return 0;
+        }
+
+        if (offset > end) {
+            return 0;
+        }
+
+        count++;
+    }
+
+    return 1;
+}
+
+/* adds the rows of one message and queues the chunks that are messages,
+ * returns 1 for a malformed message and -1 on errors */
+static int
+add_message(const unsigned char *data, Py_ssize_t offset, Py_ssize_t end,
+            Py_ssize_t message, int descend, long long str_base,
+            column *columns, pending_message **pending,
+            Py_ssize_t *pending_size, Py_ssize_t *pending_capacity)
+{
+    if (offset >= end) {
+        return 1;
+    }
+
+    while (offset < end) {
+        Py_ssize_t pos = offset;
+        Py_ssize_t start;
+        uint64_t identifier, value;
+        unsigned int field_no;
+        unsigned char wire_type;
+        int status, i;
+
+        /* wide tags are field numbers beyond the column range */
+        if (read_varint(data, end, &pos, &identifier) != VARINT_OK ||
+            (identifier >> 3) > UINT_MAX) {
+            return 1;
+        }
+
+        field_no = (unsigned int)(identifier >> 3);
+        wire_type = (unsigned char)(identifier & 0x07);
+        start = pos;
+
+        switch (wire_type) {
+        case 0:
+            status = read_varint(data, end, &pos, &value);
+
+            if (status == VARINT_WIDE) {
+                /* the low 64 bits of the value */
+                value = 0;
+
+                for (i = 0; i < 10; i++) {
+                    value |= (uint64_t)(data[start + i] & 0x7f) << (7 * i);
+                }
+
+                pos = start + 10;
+            } else if (status != VARINT_OK) {
+                return 1;
+            }
+
+            if (append_row(columns, field_no, 0, start, pos - start, value,
+                           (long long)(value >> 1) ^ -(long long)(value & 1),
+                           NAN, 0,
+                           str_base + columns[COLUMN_STR_DATA].size) < 0) {
+                return -1;
+            }
+            break;
+        case 1:
+        case 5: {
+            int size = wire_type == 1 ? 8 : 4;
+            double number;
+
+            if (end - pos < size) {
+                return 1;
+            }
+
+            value = read_fixed(data + pos, size);
+
+            if (size == 8) {
+                memcpy(&number, &value, sizeof(number));
+            } else {
+                uint32_t value32 = (uint32_t)value;
+                float number32;
+
+                memcpy(&number32, &value32, sizeof(number32));
+                number = number32;
+            }
+
+            if (append_row(columns, field_no, wire_type, pos, size, value,
+                           size == 8 ? (long long)(int64_t)value
+                                     : (long long)(int32_t)(uint32_t)value,
+                           number, 0,
+                           str_base + columns[COLUMN_STR_DATA].size) < 0) {
+                return -1;
+            }
+
+            pos += size;
+            break;
+        }
+        case 2: {
+            uint64_t length;
+            int printable;
+
+            if (read_varint(data, end, &pos, &length) != VARINT_OK ||
+                length > (uint64_t)(end - pos)) {
+                return 1;
+            }
+
+            printable = is_printable(data + pos, (Py_ssize_t)length);
+
+            if (printable &&
+                column_append(&columns[COLUMN_STR_DATA], data + pos,
+                              (Py_ssize_t)length) < 0) {
+                return -1;
+            }
+
+            if (append_row(columns, field_no, 2, pos, length, 0, 0, NAN,
+                           (unsigned char)printable,
+                           str_base + columns[COLUMN_STR_DATA].size) < 0) {
+                return -1;
+            }
+
+            if (descend && is_message(data, pos, pos + (Py_ssize_t)length)) {
+                pending_message *item;
+
+                if (*pending_size == *pending_capacity &&
+                    grow((void **)pending, pending_capacity,
+                         *pending_size + 1, sizeof(pending_message)) < 0) {
+                    return -1;
+                }
+
+                item = &(*pending)[(*pending_size)++];
+                item->start = pos;
+                item->end = pos + (Py_ssize_t)length;
+                item->parent = message;
+                item->field_no = field_no;
+            }
+
+            pos += (Py_ssize_t)length;
+            break;
+        }
+        default:
+            return 1;
+        }
+
+        offset = pos;
+    }
+
+    return 0;
+}
+
+/* the id of the path of a sub-message in the paths list, which is looked
+ * up by (parent path id, field number) in path_ids and added if missing */
+static Py_ssize_t
+sub_path_id(PyObject *paths, PyObject *path_ids, Py_ssize_t parent,
+            unsigned int field_no)
+{
+    PyObject *key, *value, *parent_path, *path;
+    Py_ssize_t path_id = -1;
+
+    key = Py_BuildValue("(nI)", parent, field_no);
+
+    if (key == NULL) {
+        return -1;
+    }
+
+    value = PyDict_GetItemWithError(path_ids, key);
+
+    if (value != NULL) {
+        path_id = PyLong_AsSsize_t(value);
+        Py_DECREF(key);
+        return path_id;
+    }
+
+    if (PyErr_Occurred()) {
+        Py_DECREF(key);
+        return -1;
+    }
+
+    parent_path = PyList_GetItem(paths, parent);
+
+    if (parent_path == NULL) {
+        Py_DECREF(key);
+        return -1;
+    }
+
+    path = PyObject_Length(parent_path) > 0
+               ? PyUnicode_FromFormat("%S.%u", parent_path, field_no)
+               : PyUnicode_FromFormat("%u", field_no);
+    value = PyLong_FromSsize_t(PyList_GET_SIZE(paths));
+
+    if (path != NULL && value != NULL && PyList_Append(paths, path) == 0 &&
+        PyDict_SetItem(path_ids, key, value) == 0) {
+        path_id = PyList_GET_SIZE(paths) - 1;
+    }
+
+    Py_XDECREF(path);
+    Py_XDECREF(value);
+    Py_DECREF(key);
+
+    return path_id;
+}
+
+static PyObject *
+scan_columns(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    Py_buffer view;
+    PyObject *buffers, *paths, *path_ids;
+    unsigned long record;
+    unsigned int record32;
+    int descend = 1;
+    long long str_base;
+    column columns[COLUMN_COUNT];
+    pending_message *pending = NULL;
+    Py_ssize_t pending_size = 0;
+    Py_ssize_t pending_capacity = 0;
+    /* the path id of every message added so far */
+    Py_ssize_t *message_paths = NULL;
+    Py_ssize_t messages = 0;
+    Py_ssize_t messages_capacity = 0;
+    PyObject *result = NULL;
+    int i;
+
+    if (check_nargs("scan_columns", nargs, 5, 6) < 0) {
+        return NULL;
+    }
+
+    buffers = args[1];
+    paths = args[3];
+    path_ids = args[4];
+
+    if (!PyTuple_Check(buffers) || PyTuple_GET_SIZE(buffers) != COLUMN_COUNT ||
+        !PyList_Check(paths) || !PyDict_Check(path_ids)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "scan_columns expects a tuple of the column "
+                        "bytearrays, a paths list and a path ids dict");
+        return NULL;
+    }
+
+    for (i = 0; i < COLUMN_COUNT; i++) {
+        if (!PyByteArray_Check(PyTuple_GET_ITEM(buffers, i))) {
+            PyErr_SetString(PyExc_TypeError,
+                            "scan_columns expects bytearray columns");
+            return NULL;
+        }
+    }
+
+    record = PyLong_AsUnsignedLong(args[2]);
+
+    if (record == (unsigned long)-1 && PyErr_Occurred()) {
+        return NULL;
+    }
+
+    if (record > UINT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "record index is too large");
+        return NULL;
+    }
+
+    record32 = (unsigned int)record;
+
+    if (nargs == 6 && (descend = PyObject_IsTrue(args[5])) < 0) {
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(args[0], &view, PyBUF_SIMPLE) < 0) {
+        return NULL;
+    }
+
+    memset(columns, 0, sizeof(columns));
+    str_base = PyByteArray_GET_SIZE(
+        PyTuple_GET_ITEM(buffers, COLUMN_STR_DATA));
+
+    if (grow((void **)&pending, &pending_capacity, 1,
+             sizeof(pending_message)) < 0) {
+        goto done;
+    }
+
+    pending[0].start = 0;
+    pending[0].end = view.len;
+    pending[0].parent = -1;
+    pending[0].field_no = 0;
+    pending_size = 1;
+
+    /* the rows of a message are followed by those of its sub-messages, so
+     * the sub-messages queued by a message are reversed on the stack */
+    while (pending_size > 0) {
+        pending_message current = pending[--pending_size];
+        Py_ssize_t base = pending_size;
+        Py_ssize_t rows = columns[COLUMN_WIRE_TYPE].size;
+        Py_ssize_t path_id = 0;
+        Py_ssize_t low, high;
+        unsigned int path;
+        int status;
+
+        if (messages == messages_capacity &&
+            grow((void **)&message_paths, &messages_capacity, messages + 1,
+                 sizeof(Py_ssize_t)) < 0) {
+            goto done;
+        }
+
+        if (current.parent >= 0) {
+            path_id = sub_path_id(paths, path_ids,
+                                  message_paths[current.parent],
+                                  current.field_no);
+
+            if (path_id < 0) {
+                goto done;
+            }
+        }
+
+        message_paths[messages] = path_id;
+        status = add_message(view.buf, current.start, current.end, messages,
+                             descend, str_base, columns, &pending,
+                             &pending_size, &pending_capacity);
+        messages++;
+
+        if (status < 0) {
+            goto done;
+        }
+
+        if (status > 0) {
+            /* sub-messages were checked before, so only the top level
+             * message or a field number out of range gets here */
+            Py_INCREF(Py_False);
+            result = Py_False;
+            goto done;
+        }
+
+        path = (unsigned int)path_id;
+
+        for (rows = columns[COLUMN_WIRE_TYPE].size - rows; rows > 0; rows--) {
+            if (column_append(&columns[COLUMN_RECORD], &record32,
+                              sizeof(record32)) < 0 ||
+                column_append(&columns[COLUMN_PATH], &path,
+                              sizeof(path)) < 0) {
+                goto done;
+            }
+        }
+
+        for (low = base, high = pending_size - 1; low < high;
+             low++, high--) {
+            pending_message swap = pending[low];
+
+            pending[low] = pending[high];
+            pending[high] = swap;
+        }
+    }
+
+    /* the payload is added to the batch only once it is decoded as a whole */
+    for (i = 0; i < COLUMN_COUNT; i++) {
+        PyObject *buffer = PyTuple_GET_ITEM(buffers, i);
+        Py_ssize_t size = PyByteArray_GET_SIZE(buffer);
+
+        if (PyByteArray_Resize(buffer, size + columns[i].size) < 0) {
+            goto done;
+        }
+
+        if (columns[i].size) {
+            memcpy(PyByteArray_AS_STRING(buffer) + size, columns[i].data,
+                   (size_t)columns[i].size);
+        }
+    }
+
+    Py_INCREF(Py_True);
+    result = Py_True;
+
+done:
+    for (i = 0; i < COLUMN_COUNT; i++) {
+        PyMem_Free(columns[i].data);
+    }
+
+    PyMem_Free(pending);
+    PyMem_Free(message_paths);
+    PyBuffer_Release(&view);
+
+    return result;
+}
+
+static PyObject *
+set_message_precheck(PyObject *module, PyObject *args)
+{
+    Py_ssize_t fields;
+    unsigned long long max_no, reserved_start, reserved_end;
+
+    if (!PyArg_ParseTuple(args, "nKKK", &fields, &max_no, &reserved_start,
+                          &reserved_end)) {
+        return NULL;
+    }
+
+    precheck_fields = fields;
+    max_field_no = max_no;
+    reserved_field_nos_start = reserved_start;
+    reserved_field_nos_end = reserved_end;
+
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"decode_varint", (PyCFunction)(void (*)(void))decode_varint,
+     METH_FASTCALL, NULL},
+    {"scan_fields", (PyCFunction)(void (*)(void))scan_fields,
+     METH_FASTCALL, NULL},
+    {"decode_packed_varints",
+     (PyCFunction)(void (*)(void))decode_packed_varints,
+     METH_VARARGS | METH_KEYWORDS, NULL},
+    {"scan_columns", (PyCFunction)(void (*)(void))scan_columns,
+     METH_FASTCALL, NULL},
+    {"set_message_precheck", set_message_precheck, METH_VARARGS, NULL},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "revpbuf._speedups",
+    NULL,
+    -1,
+    speedups_methods,
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    return PyModule_Create(&speedups_module);
+}
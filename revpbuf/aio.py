@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+from typing import AsyncIterator, Optional
+
+from .core import decode_varint
+from .parser import MessageRepr, parse_proto
+from .reader import READ_SIZE
+
+# messages of at least this size are parsed in an executor, so that the
+# event loop keeps serving other tasks meanwhile
+OFFLOAD_SIZE = 1024 * 1024
+
+
+async def read_delimited(
+    reader: asyncio.StreamReader,
+    eager_depth: Optional[int] = None,
+    read_size: int = READ_SIZE,
+    offload_size: Optional[int] = OFFLOAD_SIZE,
+    executor: Optional[concurrent.futures.Executor] = None
+) -> AsyncIterator[Optional[MessageRepr]]:
+    buffer = b""
+    offset = 0
+
+    while True:
+        length, start = decode_varint(buffer, offset)
+
+        if length is not None:
+            end = start + length
+
+            if end > len(buffer):
+                # the rest of a record is read in one go instead of
+                # growing the buffer piece by piece
+                missing = end - len(buffer)
+                buffer = buffer[offset:] + await _read_exactly(
+                    reader, missing, "Truncated delimited record"
+                )
+                start -= offset
+                end -= offset
+                offset = 0
+
+            if start == end:
+                # a message with all fields at their defaults
+                yield MessageRepr()
+            else:
+                yield await _parse(
+                    buffer[start:end], eager_depth, offload_size, executor
+                )
+
+            offset = end
+            continue
+
+        data = await reader.read(read_size)
+
+        if not data:
+            if offset != len(buffer):
+                raise ValueError("Truncated delimited record")
+
+            return
+
+        # keep only the unprocessed tail of the buffer
+        buffer = buffer[offset:] + data
+        offset = 0
+
+
+async def parse_proto_async(
+    reader: asyncio.StreamReader,
+    length: int,
+    eager_depth: Optional[int] = None,
+    offload_size: Optional[int] = OFFLOAD_SIZE,
+    executor: Optional[concurrent.futures.Executor] = None
+) -> Optional[MessageRepr]:
+    payload = await _read_exactly(reader, length, "Truncated message")
+
+    return await _parse(payload, eager_depth, offload_size, executor)
+
+
+async def _read_exactly(
+    reader: asyncio.StreamReader, size: int, error: str
+) -> bytes:
+    try:
+        return await reader.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        raise ValueError(error) from e
+
+
+async def _parse(
+    payload: bytes,
+    eager_depth: Optional[int],
+    offload_size: Optional[int],
+    executor: Optional[concurrent.futures.Executor]
+) -> Optional[MessageRepr]:
+    if offload_size is None or len(payload) < offload_size:
+        return parse_proto(payload, eager_depth)
+
+    # the default executor is a thread pool, which keeps the loop responsive
+    # but still shares the GIL with it
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(
+        executor, functools.partial(parse_proto, payload, eager_depth)
+    )
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import itertools
+import os
+from typing import (
+    Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+from .core import Buffer, _field_descriptor, scan_fields
+from .parser import (
+    _DEFERRED_COPY_SIZE, _UNSET, ChunkRepr, Field, Fixed32Repr, Fixed64Repr,
+    MessageRepr, VarintRepr, parse_proto
+)
+
+# (tag, varint value or (start, end) of the raw value in the whole payload,
+# number of fields of the chunk parsed as a sub-message)
+CompactField = Tuple[int, Union[int, Tuple[int, int]], Optional[int]]
+# the fields of a message and of all its sub-messages depth-first, the fields
+# of a sub-message follow the field of its chunk, so that deep nesting is
+# pickled without recursion
+CompactMessage = Tuple[CompactField, ...]
+
+Transform = Callable[[Optional[MessageRepr]], Any]
+
+
+def to_compact(message: MessageRepr, payload: Buffer) -> CompactMessage:
+    # raw values are stored as offsets into the whole payload, so nothing
+    # but small integers has to be sent back from a worker process
+    #
+    # sub-messages are walked with an explicit stack, and the fields of
+    # each one are located by scan_fields in place in the payload
+    stack = []
+    fields = message.fields
+    scanned, _ = scan_fields(payload)
+    index = 0
+    result = []
+
+    while True:
+        if index < len(fields):
+            identifier, value, end = scanned[index]
+            field_repr = fields[index].field_repr
+            index += 1
+            wire_type = identifier & 0b111
+
+            if wire_type == 0:
+                result.append((identifier, value, None))
+                continue
+
+            sub_message = field_repr.msg if wire_type == 2 else None
+
+            if sub_message is None:
+                result.append((identifier, (value, end), None))
+                continue
+
+            result.append(
+                (identifier, (value, end), len(sub_message.fields))
+            )
+            stack.append((fields, scanned, index))
+            fields = sub_message.fields
+            scanned, _ = scan_fields(payload, value, end)
+            index = 0
+            continue
+
+        if not stack:
+            return tuple(result)
+
+        fields, scanned, index = stack.pop()
+
+
+def from_compact(compact: CompactMessage, payload: Buffer) -> MessageRepr:
+    # large chunks of bytes payloads are deferred copies, as in parse_proto,
+    # so deep nesting does not copy the payload at every level
+    deferred = payload.__class__ is bytes
+    root = message = MessageRepr()
+    # fields left to add to the current message, the root never runs out
+    remaining = len(compact) + 1
+    stack = []
+
+    for identifier, value, sub_fields in compact:
+        while not remaining:
+            message, remaining = stack.pop()
+
+        wire_type = identifier & 0b111
+
+        if wire_type == 0:
+            field_repr = VarintRepr(value)
+        elif wire_type == 2:
+            start, end = value
+
+            if deferred and end - start >= _DEFERRED_COPY_SIZE:
+                raw = (payload, start, end)
+            else:
+                raw = payload[start:end]
+
+            field_repr = ChunkRepr.from_parsed(raw, None)
+        elif wire_type == 5:
+            field_repr = Fixed32Repr(payload[value[0]:value[1]])
+        else:
+            field_repr = Fixed64Repr(payload[value[0]:value[1]])
+
+        message.add_field(Field(_field_descriptor(identifier), field_repr))
+        remaining -= 1
+
+        if sub_fields is not None:
+            stack.append((message, remaining))
+            message = field_repr._message_repr = MessageRepr()
+            remaining = sub_fields
+
+    return root
+
+
+def _top_level_fields(compact: CompactMessage) -> int:
+    count = 0
+    # fields of sub-messages still to skip
+    nested = 0
+
+    for _, _, sub_fields in compact:
+        if nested:
+            nested -= 1
+        else:
+            count += 1
+
+        if sub_fields is not None:
+            nested += sub_fields
+
+    return count
+
+
+class CompactRecord:
+    # a parsed payload in the compact form sent back by the workers, the
+    # MessageRepr tree is only built when `message` is first accessed, so
+    # the parent process does not rebuild trees nobody looks at
+    __slots__ = ("payload", "_compact", "_message")
+
+    def __init__(self, payload: Buffer, compact: CompactMessage) -> None:
+        self.payload = payload
+        self._compact = compact
+        self._message = _UNSET
+
+    @classmethod
+    def from_message(cls, payload: Buffer,
+                     message: MessageRepr) -> CompactRecord:
+        record = cls(payload, _UNSET)
+        record._message = message
+
+        return record
+
+    @property
+    def compact(self) -> CompactMessage:
+        if self._compact is _UNSET:
+            self._compact = to_compact(self._message, self.payload)
+
+        return self._compact
+
+    @property
+    def message(self) -> MessageRepr:
+        if self._message is _UNSET:
+            self._message = from_compact(self._compact, self.payload)
+
+        return self._message
+
+    def __len__(self) -> int:
+        return _top_level_fields(self.compact)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(fields={len(self)})"
+
+
+def parse_many(
+    payloads: Iterable[Buffer],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    transform: Optional[Transform] = None,
+    rebuild: bool = False
+) -> Iterator[Any]:
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    batches = _batched(payloads, chunksize)
+
+    if workers <= 1:
+        for batch in batches:
+            for payload in batch:
+                message = parse_proto(payload)
+
+                if transform is not None:
+                    yield transform(message)
+                elif message is None or rebuild:
+                    yield message
+                else:
+                    yield CompactRecord.from_message(payload, message)
+
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # keep a bounded number of batches in flight, so that arbitrary
+        # long inputs are not pulled into memory all at once
+        pending = collections.deque()
+
+        for batch in batches:
+            future = executor.submit(_parse_batch, batch, transform)
+            pending.append((batch, future))
+
+            if len(pending) >= workers * 2:
+                batch, future = pending.popleft()
+                yield from _finish_batch(
+                    batch, future.result(), transform, rebuild
+                )
+
+        while pending:
+            batch, future = pending.popleft()
+            yield from _finish_batch(
+                batch, future.result(), transform, rebuild
+            )
+
+
+def _batched(payloads: Iterable[Buffer],
+             chunksize: int) -> Iterator[List[Buffer]]:
+    iterator = iter(payloads)
+    batch = list(itertools.islice(iterator, chunksize))
+
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, chunksize))
+
+
+def _parse_batch(payloads: Sequence[Buffer],
+                 transform: Optional[Transform]) -> List[Any]:
+    results = []
+
+    for payload in payloads:
+        message = parse_proto(payload)
+
+        if transform is not None:
+            results.append(transform(message))
+        elif message is not None:
+            results.append(to_compact(message, payload))
+        else:
+            results.append(None)
+
+    return results
+
+
+def _finish_batch(
+    payloads: Sequence[Buffer], results: Sequence[Any],
+    transform: Optional[Transform], rebuild: bool
+) -> Iterator[Any]:
+    if transform is not None:
+        yield from results
+        return
+
+    for payload, compact in zip(payloads, results):
+        if compact is None:
+            yield None
+        elif rebuild:
+            yield from_compact(compact, payload)
+        else:
+            yield CompactRecord(payload, compact)
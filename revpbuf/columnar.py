@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import array
+import csv
+import math
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from itertools import repeat
+from operator import and_, itemgetter, neg, rshift, sub, xor
+from typing import (
+    Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple,
+    Union
+)
+
+from .core import (
+    Buffer, _speedups, py_decode_varint, py_scan_fields
+)
+from .parser import _PRINTABLE, looks_like_message, zigzag_decode
+
+BATCH_ROWS = 64 * 1024
+
+# name, array typecode and NumPy dtype of the fixed-width columns
+_COLUMNS = (
+    ("record", "I", "u4"),
+    ("path", "I", "u4"),
+    ("field_no", "I", "u4"),
+    ("wire_type", "B", "u1"),
+    ("offset", "Q", "u8"),
+    ("length", "Q", "u8"),
+    ("uint", "Q", "u8"),
+    ("sint", "q", "i8"),
+    ("float", "d", "f8"),
+    ("str_valid", "B", "u1"),
+)
+_ARROW_TYPES = {
+    "u1": "uint8", "u4": "uint32", "u8": "uint64", "i8": "int64",
+    "f8": "float64"
+}
+_CSV_HEADER = (
+    "record", "path", "field_no", "wire_type", "offset", "length", "uint",
+    "sint", "float", "str"
+)
+_UINT64_MASK = (1 << 64) - 1
+_UINT32_MAX = (1 << 32) - 1
+_FIXED32 = struct.Struct("<Ifi")
+_FIXED64 = struct.Struct("<Qdq")
+
+Path = Union[str, os.PathLike]
+# raw bytes of the _COLUMNS, of the string end offsets and of the strings
+ColumnBuffers = Tuple[bytearray, ...]
+# path ids by (parent path id, field number)
+PathIds = Dict[Tuple[int, int], int]
+
+
+class FieldColumns:
+    # one batch of decoded fields, a row per field, the rows of a message
+    # are followed by those of its sub-messages in order
+    __slots__ = (
+        "paths", "record", "path", "field_no", "wire_type", "offset",
+        "length", "uint", "sint", "float", "str_valid", "str_offsets",
+        "str_data"
+    )
+
+    def __init__(
+        self, paths: List[str], buffers: Optional[ColumnBuffers] = None
+    ) -> None:
+        # dotted field number paths of the enclosing chunks, the path
+        # column holds indexes into this list shared by all batches
+        self.paths = paths
+
+        if buffers is None:
+            buffers = _new_buffers()
+
+        for (name, typecode, _), buffer in zip(_COLUMNS, buffers):
+            column = array.array(typecode)
+            column.frombytes(buffer)
+            setattr(self, name, column)
+
+        # printable chunks in the Arrow string layout
+        self.str_offsets = array.array("q", [0])
+        self.str_offsets.frombytes(buffers[-2])
+        self.str_data = bytes(buffers[-1])
+
+    def __len__(self) -> int:
+        return len(self.record)
+
+    def columns(self) -> Dict[str, Any]:
+        result = {name: getattr(self, name) for name, _, _ in _COLUMNS}
+        result["str_offsets"] = self.str_offsets
+        result["str_data"] = self.str_data
+
+        return result
+
+    def rows(self) -> Iterator[tuple]:
+        # values that do not apply to the wire type of a field are None
+        paths = self.paths
+        data = self.str_data
+        offsets = self.str_offsets
+
+        for (
+            record, path, field_no, wire_type, offset, length, uint, sint,
+            number, str_valid, start, end
+        ) in zip(
+            self.record, self.path, self.field_no, self.wire_type,
+            self.offset, self.length, self.uint, self.sint, self.float,
+            self.str_valid, offsets, offsets[1:]
+        ):
+            if wire_type == 2:
+                uint = sint = number = None
+                text = data[start:end].decode("ascii") if str_valid else None
+            else:
+                text = None
+
+                if wire_type == 0:
+                    number = None
+
+            yield (
+                record, paths[path], field_no, wire_type, offset, length,
+                uint, sint, number, text
+            )
+
+    def to_numpy(self) -> Dict[str, Any]:
+        # views of the columns, NumPy is an optional dependency
+        import numpy
+
+        result = {
+            name: numpy.frombuffer(column, dtype=column.typecode)
+            if isinstance(column, array.array)
+            else numpy.frombuffer(column, dtype=numpy.uint8)
+            for name, column in self.columns().items()
+        }
+        result["paths"] = numpy.array(self.paths, dtype=object)
+
+        return result
+
+    def to_arrow(self) -> Any:
+        # pyarrow is an optional dependency
+        import pyarrow
+        import pyarrow.compute
+
+        size = len(self)
+        arrays = {}
+
+        for name, _, dtype in _COLUMNS[:-1]:
+            arrays[name] = pyarrow.Array.from_buffers(
+                getattr(pyarrow, _ARROW_TYPES[dtype])(), size,
+                [None, pyarrow.py_buffer(getattr(self, name))]
+            )
+
+        arrays["path"] = pyarrow.DictionaryArray.from_arrays(
+            arrays["path"].cast(pyarrow.int32()),
+            pyarrow.array(self.paths, pyarrow.string())
+        )
+        text = pyarrow.Array.from_buffers(
+            pyarrow.large_string(), size, [
+                None, pyarrow.py_buffer(self.str_offsets),
+                pyarrow.py_buffer(self.str_data)
+            ]
+        )
+        str_valid = pyarrow.Array.from_buffers(
+            pyarrow.uint8(), size, [None, pyarrow.py_buffer(self.str_valid)]
+        )
+        arrays["str"] = pyarrow.compute.if_else(
+            pyarrow.compute.not_equal(str_valid, 0), text,
+            pyarrow.scalar(None, pyarrow.large_string())
+        )
+
+        return pyarrow.table(arrays)
+
+
+class ColumnarDecoder:
+    # decodes payloads straight into column buffers without building
+    # message trees, chunks that parse as messages are descended into
+    __slots__ = (
+        "paths", "_path_ids", "descend", "records", "malformed", "_buffers"
+    )
+
+    def __init__(self, descend: bool = True) -> None:
+        self.paths: List[str] = [""]
+        self._path_ids: PathIds = {}
+        self.descend = descend
+        # payloads seen and payloads skipped as malformed
+        self.records = 0
+        self.malformed = 0
+        self._buffers = _new_buffers()
+
+    def __len__(self) -> int:
+        # rows decoded since the last flush
+        return len(self._buffers[3])
+
+    def add(self, payload: Buffer) -> bool:
+        added = scan_columns(
+            payload, self._buffers, self.records, self.paths,
+            self._path_ids, self.descend
+        )
+        self.records += 1
+
+        if not added:
+            self.malformed += 1
+
+        return added
+
+    def flush(self) -> FieldColumns:
+        columns = FieldColumns(self.paths, self._buffers)
+        self._buffers = _new_buffers()
+
+        return columns
+
+    def iter_batches(
+        self, payloads: Iterable[Buffer], batch_rows: int = BATCH_ROWS
+    ) -> Iterator[FieldColumns]:
+        # at most one batch is alive, so memory stays bounded for
+        # corpora of any size
+        for payload in payloads:
+            self.add(payload)
+
+            if len(self) >= batch_rows:
+                yield self.flush()
+
+        if len(self) or not self.records:
+            yield self.flush()
+
+
+def _new_buffers() -> ColumnBuffers:
+    return tuple(bytearray() for _ in range(len(_COLUMNS) + 2))
+
+
+def _sub_path_id(
+    paths: List[str], path_ids: PathIds, parent: int, field_no: int
+) -> int:
+    path_id = path_ids.get((parent, field_no))
+
+    if path_id is None:
+        path_id = path_ids[parent, field_no] = len(paths)
+        paths.append(
+            f"{paths[parent]}.{field_no}" if paths[parent] else str(field_no)
+        )
+
+    return path_id
+
+
+def py_scan_columns(
+    buffer: Buffer,
+    buffers: ColumnBuffers,
+    record: int,
+    paths: List[str],
+    path_ids: PathIds,
+    descend: bool = True
+) -> bool:
+    # appends the rows of a payload to the column buffers, malformed
+    # payloads are skipped as a whole
+    if record > _UINT32_MAX:
+        raise OverflowError("record index is too large")
+
+    fields, stop = py_scan_fields(buffer)
+
+    if stop != len(buffer) or not fields:
+        return False
+
+    view = memoryview(buffer).cast("B")
+    columns = [array.array(typecode) for _, typecode, _ in _COLUMNS]
+    columns.append(array.array("q"))
+    (
+        record_column, path_column, field_no_column, wire_type_column,
+        offset_column, length_column, uint_column, sint_column, float_column,
+        str_valid_column, str_offsets
+    ) = columns
+    str_base = len(buffers[-1])
+    str_data = bytearray()
+    # path ids of the messages added so far
+    message_paths = []
+    # (fields, start, parent message, field number) of the messages to add
+    pending = [(fields, 0, -1, 0)]
+
+    try:
+        while pending:
+            fields, start, parent, field_no = pending.pop()
+            message = len(message_paths)
+            message_paths.append(
+                _sub_path_id(
+                    paths, path_ids, message_paths[parent], field_no
+                ) if parent >= 0 else 0
+            )
+            count = len(fields)
+            identifiers, values, ends = zip(*fields)
+            wire_types = bytes(map(and_, identifiers, repeat(0b111, count)))
+            record_column.extend(repeat(record, count))
+            path_column.extend(repeat(message_paths[-1], count))
+            field_no_column.extend(map(rshift, identifiers, repeat(3, count)))
+            wire_type_column.frombytes(wire_types)
+
+            if wire_types.count(0) == count:
+                # varints only, so all columns are filled in bulk
+                if max(values) > _UINT64_MASK:
+                    values = [value & _UINT64_MASK for value in values]
+
+                # the values start after the tags, which end the previous
+                # fields
+                offsets = list(map(itemgetter(1), map(
+                    py_decode_varint, repeat(view, count),
+                    (start, ) + ends[:-1]
+                )))
+                uint_column.extend(values)
+                sint_column.extend(map(
+                    xor, map(rshift, values, repeat(1, count)),
+                    map(neg, map(and_, values, repeat(1, count)))
+                ))
+                float_column.extend(repeat(math.nan, count))
+                str_valid_column.frombytes(bytes(count))
+                str_offsets.extend(repeat(str_base + len(str_data), count))
+                offset_column.extend(offsets)
+                length_column.extend(map(sub, ends, offsets))
+                continue
+
+            # values of the other wire types are located by their offsets
+            offsets = list(values)
+            sub_messages = []
+
+            for index, wire_type in enumerate(wire_types):
+                value = values[index]
+                end = ends[index]
+
+                if wire_type == 0:
+                    offsets[index] = py_decode_varint(
+                        view, ends[index - 1] if index else start
+                    )[1]
+                    value &= _UINT64_MASK
+                    uint_column.append(value)
+                    sint_column.append(zigzag_decode(value))
+                    float_column.append(math.nan)
+                    str_valid_column.append(0)
+                elif wire_type == 2:
+                    uint_column.append(0)
+                    sint_column.append(0)
+                    float_column.append(math.nan)
+                    chunk = view[value:end]
+
+                    if not chunk.tobytes().translate(None, _PRINTABLE):
+                        str_data += chunk
+                        str_valid_column.append(1)
+                    else:
+                        str_valid_column.append(0)
+
+                    if descend:
+                        sub_fields, stop = py_scan_fields(view, value, end)
+
+                        # only chunks that are messages as a whole are
+                        # descended into, like parse_proto does
+                        if stop == end and looks_like_message(
+                            view, offset=value, end=end
+                        ):
+                            sub_messages.append((
+                                sub_fields, value, message,
+                                identifiers[index] >> 3
+                            ))
+                else:
+                    # the value is repeated so that one struct call reads
+                    # it as unsigned, float and signed
+                    uint, number, sint = (
+                        _FIXED32 if wire_type == 5 else _FIXED64
+                    ).unpack(view[value:end].tobytes() * 3)
+                    uint_column.append(uint)
+                    sint_column.append(sint)
+                    float_column.append(number)
+                    str_valid_column.append(0)
+
+                str_offsets.append(str_base + len(str_data))
+
+            offset_column.extend(offsets)
+            length_column.extend(map(sub, ends, offsets))
+            pending.extend(reversed(sub_messages))
+    except OverflowError:
+        # field numbers beyond the column range
+        return False
+
+    # the payload is added to the batch only once it is decoded as a whole
+    for target, column in zip(buffers, columns):
+        target += column
+
+    buffers[-1].extend(str_data)
+
+    return True
+
+
+if _speedups is not None:
+    scan_columns = _speedups.scan_columns
+else:
+    scan_columns = py_scan_columns
+
+
+def iter_field_columns(
+    payloads: Iterable[Buffer],
+    batch_rows: int = BATCH_ROWS,
+    descend: bool = True
+) -> Iterator[FieldColumns]:
+    return ColumnarDecoder(descend).iter_batches(payloads, batch_rows)
+
+
+def export_csv(
+    payloads: Iterable[Buffer],
+    sink: TextIO,
+    batch_rows: int = BATCH_ROWS,
+    descend: bool = True
+) -> int:
+    writer = csv.writer(sink)
+    writer.writerow(_CSV_HEADER)
+    rows = 0
+
+    for columns in iter_field_columns(payloads, batch_rows, descend):
+        writer.writerows(columns.rows())
+        rows += len(columns)
+
+    return rows
+
+
+def export_npz(
+    payloads: Iterable[Buffer],
+    path: Union[Path, BinaryIO],
+    batch_rows: int = BATCH_ROWS,
+    descend: bool = True
+) -> int:
+    # NumPy is not needed, every column is spilled to a temporary file
+    # batch by batch and stored as a .npy member of the archive at the end
+    decoder = ColumnarDecoder(descend)
+    names = [name for name, _, _ in _COLUMNS] + ["str_offsets", "str_data"]
+    rows = 0
+    str_size = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spills = {
+            name: open(os.path.join(tmp_dir, name), "w+b") for name in names
+        }
+
+        try:
+            array.array("q", [0]).tofile(spills["str_offsets"])
+
+            for columns in decoder.iter_batches(payloads, batch_rows):
+                for name, _, _ in _COLUMNS:
+                    getattr(columns, name).tofile(spills[name])
+
+                offsets = columns.str_offsets
+
+                if str_size:
+                    offsets = array.array(
+                        "q", [offset + str_size for offset in offsets]
+                    )
+
+                offsets[1:].tofile(spills["str_offsets"])
+                spills["str_data"].write(columns.str_data)
+                rows += len(columns)
+                str_size += len(columns.str_data)
+
+            dtypes = {name: dtype for name, _, dtype in _COLUMNS}
+            dtypes["str_offsets"] = "i8"
+            dtypes["str_data"] = "u1"
+
+            with zipfile.ZipFile(
+                path, "w", zipfile.ZIP_STORED, allowZip64=True
+            ) as archive:
+                for name in names:
+                    spill = spills[name]
+                    size = spill.tell() // int(dtypes[name][1])
+                    spill.seek(0)
+
+                    with archive.open(f"{name}.npy", "w",
+                                      force_zip64=True) as member:
+                        member.write(_npy_header(dtypes[name], size))
+                        shutil.copyfileobj(spill, member)
+
+                width = max(len(path_str) for path_str in decoder.paths) or 1
+
+                with archive.open("paths.npy", "w") as member:
+                    member.write(
+                        _npy_header(f"S{width}", len(decoder.paths))
+                    )
+
+                    for path_str in decoder.paths:
+                        member.write(path_str.encode().ljust(width, b"\0"))
+        finally:
+            for spill in spills.values():
+                spill.close()
+
+    return rows
+
+
+def export_parquet(
+    payloads: Iterable[Buffer],
+    path: Path,
+    batch_rows: int = BATCH_ROWS,
+    descend: bool = True
+) -> int:
+    # one row group per batch, pyarrow is an optional dependency
+    import pyarrow.parquet
+
+    writer = None
+    rows = 0
+
+    try:
+        for columns in iter_field_columns(payloads, batch_rows, descend):
+            table = columns.to_arrow()
+
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+
+            writer.write_table(table)
+            rows += len(columns)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+def _npy_header(dtype: str, size: int) -> bytes:
+    # version 1.0 of the .npy format for a one-dimensional array
+    if dtype[0] == "S" or dtype[1:] == "1":
+        dtype = "|" + dtype
+    else:
+        dtype = ("<" if sys.byteorder == "little" else ">") + dtype
+
+    header = (
+        f"{{'descr': '{dtype}', 'fortran_order': False, "
+        f"'shape': ({size},), }}"
+    )
+    # the header ends with a newline and is padded so that the data is
+    # 64 bytes aligned
+    padding = -(10 + len(header) + 1) % 64
+    header = header + " " * padding + "\n"
+
+    return (
+        b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) +
+        header.encode("latin1")
+    )
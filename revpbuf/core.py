@@ -2,9 +2,22 @@
 
 from __future__ import annotations
 
+import functools
 import io
+import mmap
+import os
 from enum import Enum
-from typing import Iterable, Optional, Union, Sequence, Any
+from typing import (
+    BinaryIO, Iterable, List, Optional, TextIO, Union, Sequence, Any, Tuple
+)
+
+if os.environ.get("REVPBUF_PURE_PYTHON"):
+    _speedups = None
+else:
+    try:
+        from . import _speedups
+    except ImportError:
+        _speedups = None
 
 
 class WireType(Enum):
@@ -16,12 +29,61 @@ class WireType(Enum):
     Fixed32 = 5
 
 
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_FIXED_WIDTH = {WireType.Fixed32: 4, WireType.Fixed64: 8}
+# varints are at most 10 bytes long
+_VARINT_MAX_SHIFT = 63
+# the field number rules of parser.looks_like_message, the C scanners are
+# given them on import instead of keeping a copy
+_MAX_FIELD_NO = 2**29 - 1
+_RESERVED_FIELD_NOS = range(19000, 20000)
+# number of leading fields validated before a speculative parse
+_PRECHECK_FIELDS = 4
+
+
 class BaseProtoPrinter:
     def visit(self, ty: Union[FieldDescriptor, BaseTypeRepr]) -> str:
         raise NotImplementedError
 
 
+class BaseProtoWriter(BaseProtoPrinter):
+    # printer that writes its output into a text or binary sink as it goes
+    # instead of returning it, visit returns nothing
+    def __init__(self, sink: Union[TextIO, BinaryIO],
+                 encoding: str = "utf-8") -> None:
+        self.level = 0
+
+        if isinstance(sink, (io.BufferedIOBase, io.RawIOBase)):
+            # text for binary sinks is encoded in blocks by the wrapper
+            self._wrapper = io.TextIOWrapper(
+                sink, encoding=encoding, newline=""
+            )
+            self.write = self._wrapper.write
+        else:
+            self._wrapper = None
+            self.write = sink.write
+
+    def __enter__(self) -> BaseProtoWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def visit(self, ty: Union[FieldDescriptor, BaseTypeRepr]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        # flushes pending output, the sink itself is left open
+        if self._wrapper is not None:
+            self._wrapper.flush()
+            self._wrapper.detach()
+            self._wrapper = None
+
+
 class BaseTypeRepr:
+    __slots__ = ()
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}"
 
@@ -49,6 +111,13 @@ class FieldDescriptor:
         if self.proto_id is None:
             raise ValueError("Incorrect Protobuf stream")
 
+    @classmethod
+    def from_proto_id(cls, proto_id: ProtoId) -> FieldDescriptor:
+        field = cls.__new__(cls)
+        field.proto_id = proto_id
+
+        return field
+
     def __repr__(self) -> str:
         return (
             f"{self.__class__.__name__}"
@@ -67,6 +136,78 @@ class FieldDescriptor:
         return self.proto_id.wire_type
 
 
+class ProtoWriter(BaseProtoWriter):
+    # writes the same text as the example printer, walking sub-messages with
+    # an explicit stack so that no per-level strings are built
+    def visit(self, ty: Union[FieldDescriptor, BaseTypeRepr]) -> None:
+        indent = "\t" * self.level
+
+        if isinstance(ty, FieldDescriptor):
+            self.write(
+                f"{indent}Field {ty.field_no} - type <{ty.wire_type}>"
+                f"{os.linesep}"
+            )
+        else:
+            self._write([(iter(ty.get_fields()), indent + "\t", False)])
+
+    def write_fields(self, fields: Iterable[Any]) -> None:
+        self._write([(iter(fields), "\t" * self.level, True)])
+
+    def _write(self, stack: List[Tuple[Iterable[Any], str, bool]]) -> None:
+        write = self.write
+        linesep = os.linesep
+
+        while stack:
+            items, indent, is_fields = stack[-1]
+            item = next(items, None)
+
+            if item is None:
+                stack.pop()
+            elif is_fields:
+                field_desc = item.field_desc
+                write(
+                    f"{indent}Field {field_desc.field_no} - type "
+                    f"<{field_desc.wire_type}>{linesep}"
+                )
+                stack.append(
+                    (iter(item.field_repr.get_fields()), indent + "\t", False)
+                )
+            else:
+                name, value = item
+
+                if name != "sub-msg":
+                    write(f"{indent}{name}: {value}{linesep}")
+                elif value is not None:
+                    write(f"{indent}sub-msg:{linesep}")
+                    stack.append((iter(value.fields), indent + "\t", True))
+
+
+def dump(message: Any, sink: Union[TextIO, BinaryIO],
+         encoding: str = "utf-8") -> None:
+    with ProtoWriter(sink, encoding) as writer:
+        writer.write_fields(message.fields)
+
+
+def dumps(message: Any) -> str:
+    sink = io.StringIO()
+    dump(message, sink)
+
+    return sink.getvalue()
+
+
+def map_file(source: Union[str, bytes, os.PathLike, BinaryIO]) -> Buffer:
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as stream:
+            return map_file(stream)
+
+    if os.fstat(source.fileno()).st_size == 0:
+        # empty files can not be mapped
+        return b""
+
+    # the mapping stays valid after the file is closed
+    return mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+
 def _iter_bytes(stream: io.BufferedIOBase) -> Iterable[bytes]:
     byte = stream.read1(1)
 
@@ -75,27 +216,225 @@ def _iter_bytes(stream: io.BufferedIOBase) -> Iterable[bytes]:
         byte = stream.read1(1)
 
 
+def py_decode_varint(buffer: Buffer,
+                     offset: int = 0) -> Tuple[Optional[int], int]:
+    try:
+        num = buffer[offset]
+
+        if num < 0b1000_0000:
+            return num, offset + 1
+
+        varint = num & 0b0111_1111
+        pos = 7
+        end = offset + 1
+
+        while True:
+            num = buffer[end]
+            end += 1
+            varint |= (num & 0b0111_1111) << pos
+
+            if num < 0b1000_0000:
+                return varint, end
+
+            pos += 7
+
+            if pos > _VARINT_MAX_SHIFT:
+                raise ValueError("Malformed varint")
+    except IndexError:
+        # either no data at all or malformed varint
+        # as the last byte should clear has_next flag
+        return None, offset
+
+
+# (identifier, value, end) where value is the decoded integer for varints and
+# the start offset of the value for all other wire types
+ScannedField = Tuple[int, int, int]
+
+
+def py_scan_fields(
+    buffer: Buffer,
+    offset: int = 0,
+    end: Optional[int] = None,
+    max_fields: Optional[int] = None
+) -> Tuple[List[ScannedField], int]:
+    # decodes fields up to the first one that is truncated, malformed or of
+    # a group wire type and returns them with the offset decoding stopped at,
+    # at most max_fields of them if given
+    if end is None or end > len(buffer):
+        end = len(buffer)
+
+    if max_fields is None:
+        # every field takes at least two bytes
+        max_fields = end - offset
+
+    fields = []
+    append = fields.append
+
+    try:
+        for _ in range(max_fields):
+            if offset >= end:
+                break
+
+            identifier, start = py_decode_varint(buffer, offset)
+
+            if identifier is None:
+                break
+
+            wire_type = identifier & 0b111
+
+            if wire_type == 0:
+                value, value_end = py_decode_varint(buffer, start)
+
+                if value is None:
+                    break
+            elif wire_type == 2:
+                length, value = py_decode_varint(buffer, start)
+
+                if length is None:
+                    break
+
+                value_end = value + length
+            elif wire_type == 5:
+                value = start
+                value_end = start + 4
+            elif wire_type == 1:
+                value = start
+                value_end = start + 8
+            else:
+                break
+
+            if value_end > end:
+                break
+
+            append((identifier, value, value_end))
+            offset = value_end
+    except ValueError:
+        pass
+
+    return fields, offset
+
+
+if _speedups is not None:
+    _speedups.set_message_precheck(
+        _PRECHECK_FIELDS, _MAX_FIELD_NO, _RESERVED_FIELD_NOS.start,
+        _RESERVED_FIELD_NOS.stop
+    )
+    decode_varint = _speedups.decode_varint
+    scan_fields = _speedups.scan_fields
+else:
+    decode_varint = py_decode_varint
+    scan_fields = py_scan_fields
+
+
+@functools.lru_cache(maxsize=1024)
+def _proto_id(identifier: int) -> ProtoId:
+    return ProtoId(identifier >> 3, identifier & 0b111)
+
+
+@functools.lru_cache(maxsize=1024)
+def _field_descriptor(identifier: int) -> FieldDescriptor:
+    return FieldDescriptor.from_proto_id(_proto_id(identifier))
+
+
+def decode_identifier(buffer: Buffer,
+                      offset: int = 0) -> Tuple[Optional[ProtoId], int]:
+    identifier, offset = decode_varint(buffer, offset)
+
+    if identifier is None:
+        return None, offset
+
+    return _proto_id(identifier), offset
+
+
+def decode_field_descriptor(
+    buffer: Buffer,
+    offset: int = 0
+) -> Tuple[Optional[FieldDescriptor], int]:
+    # descriptors are immutable, so a single instance per tag is shared
+    # by all fields of all parsed messages
+    identifier, offset = decode_varint(buffer, offset)
+
+    if identifier is None:
+        return None, offset
+
+    return _field_descriptor(identifier), offset
+
+
+def decode_fixed(buffer: Buffer, offset: int,
+                 wire_type: WireType) -> Tuple[Optional[Buffer], int]:
+    end = offset + _FIXED_WIDTH[WireType(wire_type)]
+
+    return (buffer[offset:end], end) if end <= len(buffer) else (None, offset)
+
+
+def decode_fixed32(buffer: Buffer,
+                   offset: int = 0) -> Tuple[Optional[Buffer], int]:
+    end = offset + 4
+
+    return (buffer[offset:end], end) if end <= len(buffer) else (None, offset)
+
+
+def decode_fixed64(buffer: Buffer,
+                   offset: int = 0) -> Tuple[Optional[Buffer], int]:
+    end = offset + 8
+
+    return (buffer[offset:end], end) if end <= len(buffer) else (None, offset)
+
+
+def decode_length_delimited(buffer: Buffer,
+                            offset: int = 0) -> Tuple[Optional[Buffer], int]:
+    length, start = decode_varint(buffer, offset)
+
+    if length is None:
+        return None, offset
+
+    end = start + length
+
+    if end > len(buffer):
+        return None, offset
+
+    return buffer[start:end], end
+
+
+_VALUE_DECODERS = {
+    WireType.Varint: decode_varint,
+    WireType.Fixed64: decode_fixed64,
+    WireType.LengthDelimited: decode_length_delimited,
+    WireType.Fixed32: decode_fixed32,
+}
+
+
+def decode_value(buffer: Buffer, offset: int, wire_type: WireType
+                 ) -> Tuple[Optional[Union[int, Buffer]], int]:
+    decoder = _VALUE_DECODERS.get(wire_type)
+
+    if decoder is not None:
+        return decoder(buffer, offset)
+    elif wire_type == WireType.StartGroup or wire_type == WireType.EndGroup:
+        raise NotImplementedError(
+            "Protobuf StartGroup and EndGroup is deprecated"
+        )
+
+    raise Exception(f"Unknown wire type {wire_type}")
+
+
 def read_varint(stream: io.BufferedIOBase) -> Optional[int]:
-    varint = 0
-    pos = 0
-    has_next = False
+    # collect bytes up to the terminating one so that the stream
+    # is never advanced past the end of the varint
+    data = bytearray()
 
     for byte in _iter_bytes(stream):
-        num = ord(byte)
-        has_next = (num & 0b1000_0000) != 0
-        value = num & 0b0111_1111
-        varint |= value << pos
-        pos += 7
+        data += byte
 
-        if not has_next:
+        if byte[0] < 0b1000_0000 or len(data) > _VARINT_MAX_SHIFT // 7:
             break
 
-    if has_next:
-        # malformed varint as the last
-        # byte should clear has_next flag
+    try:
+        value, _ = decode_varint(data)
+    except ValueError:
         return None
 
-    return varint if pos != 0 else None
+    return value
 
 
 def read_identifier(stream: io.BufferedIOBase) -> Optional[ProtoId]:
@@ -104,16 +443,13 @@ def read_identifier(stream: io.BufferedIOBase) -> Optional[ProtoId]:
     if identifier is None:
         return None
 
-    return ProtoId(identifier >> 3, identifier & 0b111)
+    return _proto_id(identifier)
 
 
 def read_fixed(stream: io.BufferedIOBase,
                wire_type: WireType) -> Optional[bytes]:
-    fixed_width = {WireType.Fixed32: 4, WireType.Fixed64: 8}
-    data = stream.read1(fixed_width[WireType(wire_type)])
-
-    if len(data) == 0 or len(data) != fixed_width[wire_type]:
-        return None
+    width = _FIXED_WIDTH[WireType(wire_type)]
+    data, _ = decode_fixed(stream.read1(width), 0, wire_type)
 
     return data
 
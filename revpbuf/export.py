@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import io
+import json
+import math
+import struct
+from json.encoder import encode_basestring_ascii
+from typing import (
+    Any, BinaryIO, Dict, Iterable, List, Optional, Sequence, TextIO, Union
+)
+
+from .core import BaseProtoWriter, BaseTypeRepr, Buffer, FieldDescriptor
+from .parser import (
+    ChunkRepr, Event, Fixed32Repr, FixedRepr, MessageRepr, VarintRepr,
+    decode_printable, zigzag_decode
+)
+from .schema import HintedRepr
+
+INTERPRETATIONS = ("uint", "sint", "float", "str", "hex")
+
+# unsigned, signed and float layouts of the fixed wire types
+_FIXED_STRUCTS = {
+    5: (struct.Struct("<I"), struct.Struct("<i"), struct.Struct("<f")),
+    1: (struct.Struct("<Q"), struct.Struct("<q"), struct.Struct("<d")),
+}
+
+_MAX_HEADS = 4096
+_FLUSH_PARTS = 4096
+
+Sink = Union[TextIO, BinaryIO]
+
+
+class JsonWriter(BaseProtoWriter):
+    # writes messages as JSON arrays of field objects without building
+    # intermediate dicts, sub-messages are walked with an explicit stack
+    def __init__(
+        self,
+        sink: Sink,
+        interpretations: Sequence[str] = INTERPRETATIONS,
+        sub_messages: bool = True,
+        encoding: str = "utf-8"
+    ) -> None:
+        super().__init__(sink, encoding)
+        unknown = set(interpretations).difference(INTERPRETATIONS)
+
+        if unknown:
+            raise ValueError(f"Unknown interpretations {sorted(unknown)}")
+
+        self.interpretations = frozenset(interpretations)
+        self.sub_messages = sub_messages
+        # JSON prefix per shared field descriptor
+        self._heads: Dict[FieldDescriptor, str] = {}
+
+    def visit(self, ty: Union[FieldDescriptor, BaseTypeRepr]) -> None:
+        # every visit writes a standalone JSON object
+        if isinstance(ty, FieldDescriptor):
+            self.write(self._head(ty) + "}")
+            return
+
+        parts = []
+        sub_message = self._write_repr(ty, "", parts)
+        # the members written after an empty head start with a comma
+        parts[0] = "{" + parts[0].lstrip(",")
+
+        if sub_message is not None:
+            self._write_message(sub_message, parts)
+            parts.append("}")
+
+        self.write("".join(parts))
+
+    def write_message(self, message: Optional[MessageRepr]) -> None:
+        parts = []
+        self._write_message(message, parts)
+        self.write("".join(parts))
+
+    def write_record(self, message: Optional[MessageRepr]) -> None:
+        # one NDJSON line, written with a single call unless the message
+        # is large
+        parts = []
+        self._write_message(message, parts)
+        parts.append("\n")
+        self.write("".join(parts))
+
+    def write_event(self, event: Event) -> None:
+        path = ",".join(map(str, event.path))
+        self.write(
+            f'{{"path":[{path}],"field":{event.field_no},'
+            f'"wire_type":{event.wire_type.value},"offset":{event.offset},'
+            f'"length":{event.length}'
+            f'{self._values(event.wire_type.value, event.value, None)}}}\n'
+        )
+
+    def _head(self, field_desc: FieldDescriptor) -> str:
+        head = self._heads.get(field_desc)
+
+        if head is None:
+            if len(self._heads) >= _MAX_HEADS:
+                # descriptors are shared per tag by the parser, others
+                # are not cached forever
+                self._heads.clear()
+
+            head = self._heads[field_desc] = (
+                f'{{"field":{field_desc.field_no},'
+                f'"wire_type":{field_desc.wire_type.value}'
+            )
+
+        return head
+
+    def _write_message(
+        self, message: Optional[MessageRepr], parts: List[str]
+    ) -> None:
+        if message is None:
+            parts.append("null")
+            return
+
+        append = parts.append
+        append("[")
+        stack = [iter(message.fields)]
+        first = True
+
+        while stack:
+            field = next(stack[-1], None)
+
+            if field is None:
+                stack.pop()
+                append("]}" if stack else "]")
+                first = False
+                continue
+
+            if not first:
+                append(",")
+
+            first = False
+
+            sub_message = self._write_repr(
+                field.field_repr, self._head(field.field_desc), parts
+            )
+
+            if sub_message is not None:
+                append("[")
+                stack.append(iter(sub_message.fields))
+                first = True
+
+            if len(parts) >= _FLUSH_PARTS:
+                # large messages are written out in pieces
+                self.write("".join(parts))
+                parts.clear()
+
+    def _write_repr(
+        self, field_repr: BaseTypeRepr, head: str, parts: List[str]
+    ) -> Optional[MessageRepr]:
+        # returns the sub-message to be written next, in which case the
+        # object is left open after its member name
+        if isinstance(field_repr, VarintRepr):
+            parts.append(head + self._values(0, field_repr.int, None) + "}")
+        elif isinstance(field_repr, ChunkRepr):
+            values = self._values(2, field_repr.chunk, field_repr)
+
+            if not self.sub_messages:
+                parts.append(head + values + "}")
+            elif field_repr.msg is None:
+                parts.append(head + values + ',"msg":null}')
+            else:
+                parts.append(head + values + ',"msg":')
+                return field_repr.msg
+        elif isinstance(field_repr, FixedRepr):
+            wire_type = 5 if isinstance(field_repr, Fixed32Repr) else 1
+            parts.append(
+                head + self._values(wire_type, field_repr.value, None) + "}"
+            )
+        elif (
+            isinstance(field_repr, HintedRepr) and
+            isinstance(field_repr.value, MessageRepr)
+        ):
+            # schema decoded sub-messages are written as nested arrays too
+            if not self.sub_messages:
+                parts.append(head + "}")
+                return None
+
+            parts.append(
+                f"{head},{encode_basestring_ascii(field_repr.name)}:"
+            )
+            return field_repr.value
+        else:
+            members = "".join(
+                f",{encode_basestring_ascii(str(name))}:{_json_value(value)}"
+                for name, value in field_repr.get_fields()
+            )
+            parts.append(head + members + "}")
+
+        return None
+
+    def _values(
+        self, wire_type: int, value: Union[int, Buffer],
+        chunk: Optional[ChunkRepr]
+    ) -> str:
+        # JSON members of the selected interpretations of a raw value
+        interpretations = self.interpretations
+        members = ""
+
+        if wire_type == 0:
+            if "uint" in interpretations:
+                members += f',"uint":{value}'
+
+            if "sint" in interpretations:
+                members += f',"sint":{zigzag_decode(value)}'
+        elif wire_type == 2:
+            if "str" in interpretations:
+                text = (
+                    chunk.str if chunk is not None
+                    else decode_printable(value, ChunkRepr.str_max_length)
+                )
+                members += ',"str":' + (
+                    encode_basestring_ascii(text) if text is not None
+                    else "null"
+                )
+
+            if "hex" in interpretations:
+                members += f',"hex":"{value.hex()}"'
+        else:
+            uint_struct, sint_struct, float_struct = _FIXED_STRUCTS[wire_type]
+
+            if "uint" in interpretations:
+                members += f',"uint":{uint_struct.unpack(value)[0]}'
+
+            if "sint" in interpretations:
+                members += f',"sint":{sint_struct.unpack(value)[0]}'
+
+            if "float" in interpretations:
+                number = float_struct.unpack(value)[0]
+                # JSON has no NaN and infinity
+                members += (
+                    f',"float":{number!r}' if math.isfinite(number)
+                    else ',"float":null'
+                )
+
+            if "hex" in interpretations:
+                members += f',"hex":"{value.hex()}"'
+
+        return members
+
+
+def _json_value(value: Any) -> str:
+    # JSON has no NaN and infinity
+    if isinstance(value, float) and not math.isfinite(value):
+        return "null"
+
+    return json.dumps(value, default=str)
+
+
+def to_json(message: Optional[MessageRepr], **options: Any) -> str:
+    sink = io.StringIO()
+
+    with JsonWriter(sink, **options) as writer:
+        writer.write_message(message)
+
+    return sink.getvalue()
+
+
+def dump_json(message: Optional[MessageRepr], sink: Sink,
+              **options: Any) -> None:
+    with JsonWriter(sink, **options) as writer:
+        writer.write_message(message)
+
+
+def dump_ndjson(messages: Iterable[Optional[MessageRepr]], sink: Sink,
+                **options: Any) -> int:
+    count = 0
+
+    with JsonWriter(sink, **options) as writer:
+        for message in messages:
+            writer.write_record(message)
+            count += 1
+
+    return count
+
+
+def dump_events(events: Iterable[Event], sink: Sink, **options: Any) -> int:
+    count = 0
+
+    with JsonWriter(sink, **options) as writer:
+        for event in events:
+            writer.write_event(event)
+            count += 1
+
+    return count
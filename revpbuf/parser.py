@@ -2,16 +2,57 @@
 
 from __future__ import annotations
 
+import array
+import collections
+import hashlib
 import io
+import mmap
 import os
 import string
 import struct
-from typing import Any, Optional, Sequence, Union, List
-
-from .core import read_varint, read_value, WireType, FieldDescriptor, BaseTypeRepr, BaseProtoPrinter
+import sys
+import threading
+import time
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple,
+    Optional, Sequence, Tuple, Union
+)
+
+from .core import (
+    Buffer, BaseProtoPrinter, BaseTypeRepr, FieldDescriptor, WireType,
+    _MAX_FIELD_NO, _PRECHECK_FIELDS, _RESERVED_FIELD_NOS, _field_descriptor,
+    _speedups, decode_identifier, decode_value, decode_varint, map_file,
+    read_value, scan_fields
+)
+
+_UNSET = object()
+_PRINTABLE = string.printable.encode("ascii")
+# binary data is usually rejected by its first bytes
+_PRINTABLE_PREFIX = 64
+# chunks of bytes payloads from this size on are kept as offsets into the
+# payload and only copied when accessed
+_DEFERRED_COPY_SIZE = 256
+# fields located per scan_fields call under a ParseLimits budget, so that
+# the work done ahead of the budget checks stays bounded
+_SCAN_BATCH = 1024
+_PACKED_FORMATS = {
+    WireType.Fixed32: {"sint": "<i", "uint": "<I", "float": "<f"},
+    WireType.Fixed64: {"sint": "<q", "uint": "<Q", "float": "<d"},
+}
+
+
+class Event(NamedTuple):
+    path: Tuple[int, ...]
+    field_no: int
+    wire_type: WireType
+    offset: int
+    length: int
+    value: Union[int, memoryview]
 
 
 class Field:
+    __slots__ = ("field_desc", "field_repr")
+
     def __init__(
         self, field_desc: FieldDescriptor, field_repr: BaseTypeRepr
     ) -> None:
@@ -26,9 +67,30 @@ class Field:
         )
 
 
+FieldPath = Union[str, int, Sequence[int]]
+# field numbers to include, optionally mapped to the projection of their
+# sub-messages, or a predicate over the field number path of a field
+Projection = Union[
+    Iterable[int], Dict[int, Any], Callable[[Tuple[int, ...]], bool]
+]
+_Projection = Union[
+    Dict[int, Optional["_Projection"]],
+    Tuple[Callable[[Tuple[int, ...]], bool], Tuple[int, ...]]
+]
+
+
 class MessageRepr:
+    __slots__ = ("_fields", "_truncated", "_index", "_indexed")
+
     def __init__(self) -> None:
         self._fields: List[Field] = []
+        # name of the limit that stopped parsing of this message
+        # or one of its sub-messages
+        self._truncated: Optional[str] = None
+        # field number to fields map, built on the first lookup and
+        # extended with the fields added after it
+        self._index: Optional[Dict[int, List[Field]]] = None
+        self._indexed = 0
 
     def __repr__(self) -> str:
         return f"{os.linesep}".join([repr(field) for field in self._fields])
@@ -37,16 +99,321 @@ class MessageRepr:
     def fields(self) -> Sequence[Field]:
         return self._fields
 
+    @property
+    def truncated(self) -> Optional[str]:
+        return self._truncated
+
+    @truncated.setter
+    def truncated(self, value: Optional[str]) -> None:
+        if self.frozen:
+            raise TypeError("Frozen messages can not be changed")
+
+        self._truncated = value
+
+    @property
+    def frozen(self) -> bool:
+        return self._fields.__class__ is tuple
+
     def add_field(self, field: Field) -> None:
-        self._fields.append(field)
+        try:
+            self._fields.append(field)
+        except AttributeError:
+            raise TypeError("Frozen messages can not be changed") from None
+
+    def freeze(self) -> None:
+        # frozen messages are shared between parse calls by a ParseCache
+        self._fields = tuple(self._fields)
+
+    def get_all(self, field_no: int) -> Sequence[Field]:
+        index = self._index
+
+        if index is None or self._indexed != len(self._fields):
+            if self.frozen:
+                # shared messages are indexed at once and the index is only
+                # published complete, so concurrent lookups stay consistent
+                index = {}
+
+                for field in self._fields:
+                    index.setdefault(field.field_desc.field_no, []).append(
+                        field
+                    )
+
+                self._index = index
+            else:
+                if index is None:
+                    index = self._index = {}
+
+                for field in self._fields[self._indexed:]:
+                    index.setdefault(field.field_desc.field_no, []).append(
+                        field
+                    )
+
+            self._indexed = len(self._fields)
+
+        return index.get(field_no, ())
+
+    def get(self, field_no: int) -> Optional[Field]:
+        # the last occurrence wins for singular fields
+        fields = self.get_all(field_no)
+
+        return fields[-1] if fields else None
+
+    def find(self, path: FieldPath) -> Optional[Field]:
+        return next(self.iter_path(path), None)
+
+    def find_all(self, path: FieldPath) -> List[Field]:
+        return list(self.iter_path(path))
+
+    def iter_path(self, path: FieldPath) -> Iterator[Field]:
+        # only the sub-messages of the fields along the path are accessed,
+        # so lazily parsed chunks outside of it are never parsed
+        if isinstance(path, str):
+            path = [int(field_no) for field_no in path.split(".")]
+        elif isinstance(path, int):
+            path = [path]
+
+        if not path:
+            raise ValueError("Empty field path")
+
+        return _iter_path(self, path, 0)
+
+
+class ParseLimits(NamedTuple):
+    max_depth: Optional[int] = None
+    max_fields: Optional[int] = None
+    max_bytes: Optional[int] = None
+    time_budget: Optional[float] = None
+
+
+class _Budget:
+    __slots__ = ("limits", "fields", "bytes", "deadline", "exhausted")
+
+    def __init__(self, limits: ParseLimits) -> None:
+        self.limits = limits
+        self.fields = 0
+        self.bytes = 0
+        self.deadline = (
+            time.monotonic() + limits.time_budget
+            if limits.time_budget is not None else None
+        )
+        self.exhausted: Optional[str] = None
+
+    def charge(self, size: int) -> Optional[str]:
+        # size is the length of a non-varint value and 0 for varints
+        limits = self.limits
+        self.fields += 1
+
+        if limits.max_fields is not None and self.fields > limits.max_fields:
+            self.exhausted = "max_fields"
+        elif limits.max_bytes is not None and size:
+            self.bytes += size
+
+            if self.bytes > limits.max_bytes:
+                self.exhausted = "max_bytes"
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.exhausted = "time_budget"
+
+        return self.exhausted
+
+
+# budget and cache of a parse call and nesting depth of the parsed message,
+# None if the call has neither
+_Context = Tuple[Optional[_Budget], int, Optional["ParseCache"]]
+
+
+class SpeculationStats:
+    __slots__ = ("attempted", "skipped", "failed")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(attempted={self.attempted}, "
+            f"skipped={self.skipped}, failed={self.failed})"
+        )
+
+    def reset(self) -> None:
+        self.attempted = 0
+        self.skipped = 0
+        self.failed = 0
+
+
+speculation_stats = SpeculationStats()
+
+
+class ParseCache:
+    # bounded LRU cache of parse results by payload digest and parse
+    # options, the messages it returns are frozen and shared between all
+    # the callers passing it to parse_proto
+    __slots__ = (
+        "max_bytes", "min_size", "size", "hits", "misses", "evictions",
+        "_entries", "_lock"
+    )
+
+    def __init__(
+        self, max_bytes: int = 32 * 1024 * 1024, min_size: int = 16
+    ) -> None:
+        self.max_bytes = max_bytes
+        # smaller payloads are parsed faster than they are looked up
+        self.min_size = min_size
+        # estimated memory held by the entries
+        self.size = 0
+        # message and estimated size of each entry
+        self._entries: collections.OrderedDict[
+            Hashable, Tuple[Optional[MessageRepr], int]
+        ] = collections.OrderedDict()
+        # parse calls may run in executor threads, see revpbuf.aio
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(entries={len(self)}, "
+            f"size={self.size}, hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self,
+        payload: Buffer,
+        eager_depth: Optional[int] = None,
+        limits: Optional[ParseLimits] = None
+    ) -> Optional[Hashable]:
+        # None for payloads that are not cached
+        if len(payload) < self.min_size:
+            return None
+
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+
+        return digest, eager_depth, limits
+
+    def get(
+        self,
+        payload: Buffer,
+        eager_depth: Optional[int] = None,
+        limits: Optional[ParseLimits] = None
+    ) -> Any:
+        # the cached message or None for a payload that is not a message,
+        # _UNSET if the payload is not cached
+        entry = self._lookup(self.key(payload, eager_depth, limits))
+
+        return entry[0] if entry is not None else _UNSET
+
+    def put(
+        self,
+        payload: Buffer,
+        message: Optional[MessageRepr],
+        eager_depth: Optional[int] = None,
+        limits: Optional[ParseLimits] = None
+    ) -> None:
+        self._store(
+            self.key(payload, eager_depth, limits),
+            _CACHE_ENTRY_SIZE + _retained_size(message), message
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(
+        self, key: Optional[Hashable]
+    ) -> Optional[Tuple[Optional[MessageRepr], int]]:
+        # the cached message with the estimated size of its entry, None if
+        # the payload is not cached
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return entry
+
+    def _store(
+        self, key: Optional[Hashable], size: int,
+        message: Optional[MessageRepr]
+    ) -> None:
+        # size is the estimated memory held by the entry, including all the
+        # sub-messages parsed into its message
+        if key is None:
+            return
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            entries = self._entries
+            previous = entries.pop(key, None)
+
+            if previous is not None:
+                self.size -= previous[1]
+
+            entries[key] = message, size
+            self.size += size
+
+            while self.size > self.max_bytes:
+                _, (_, evicted) = entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+
+# estimated memory of a cache entry and of each field of its messages on
+# top of the raw values, see sys.getsizeof of the parsed objects
+_CACHE_ENTRY_SIZE = 256
+_CACHE_FIELD_SIZE = 128
+
+
+def _retained_size(message: Optional[MessageRepr]) -> int:
+    # estimated memory of the fields of a message and of all the
+    # sub-messages parsed so far, without recursion
+    size = 0
+    pending = [message] if message is not None else []
+
+    while pending:
+        for field in pending.pop().fields:
+            field_repr = field.field_repr
+            size += _CACHE_FIELD_SIZE
+
+            if field_repr.__class__ is ChunkRepr:
+                chunk = field_repr._chunk_repr
+
+                if chunk.__class__ is tuple:
+                    # a deferred copy
+                    _, start, end = chunk
+                    size += end - start
+                else:
+                    size += len(chunk)
+
+                if field_repr._message_repr.__class__ is MessageRepr:
+                    pending.append(field_repr._message_repr)
+            elif field_repr.__class__ is not VarintRepr:
+                size += len(field_repr.value)
+
+    return size
 
 
 class VarintRepr(BaseTypeRepr):
-    __slots__ = ("_int_repr", "_sint_repr")
+    __slots__ = ("_int_repr", )
 
     def __init__(self, value: int):
         self._int_repr = value
-        self._sint_repr = zigzag_decode(self._int_repr)
 
     def __repr__(self) -> str:
         return (
@@ -66,7 +433,7 @@ class VarintRepr(BaseTypeRepr):
 
     @classmethod
     def from_bytes(cls, payload: bytes) -> Optional[VarintRepr]:
-        value = read_varint(io.BytesIO(payload))
+        value, _ = decode_varint(payload)
 
         return cls(value) if value is not None else None
 
@@ -76,18 +443,19 @@ class VarintRepr(BaseTypeRepr):
 
     @property
     def sint(self) -> int:
-        return self._sint_repr
+        return zigzag_decode(self._int_repr)
 
 
 class FixedRepr(BaseTypeRepr):
-    __slots__ = ("_float_repr", "_int_repr", "_uint_repr")
+    __slots__ = ("_value", )
 
-    def __init__(
-        self, value: bytes, int_fmt: str, uint_fmt: str, float_fmt: str
-    ) -> None:
-        self._float_repr, *_ = struct.unpack(float_fmt, value)
-        self._int_repr, *_ = struct.unpack(int_fmt, value)
-        self._uint_repr, *_ = struct.unpack(uint_fmt, value)
+    # interpretations are unpacked on access from the raw value
+    _int_struct: struct.Struct
+    _uint_struct: struct.Struct
+    _float_struct: struct.Struct
+
+    def __init__(self, value: Buffer) -> None:
+        self._value = value
 
     def __repr__(self) -> str:
         return (
@@ -99,49 +467,81 @@ class FixedRepr(BaseTypeRepr):
 
     def get_fields(self) -> Sequence[Sequence[Union[str, Any]]]:
         return (
-            ("sint", self._int_repr), ("uint", self._uint_repr),
-            ("float", self._float_repr)
+            ("sint", self.int), ("uint", self.uint), ("float", self.float)
         )
 
     def accept(self, printer: BaseProtoPrinter) -> str:
         return super().accept(printer)
 
+    @property
+    def value(self) -> Buffer:
+        return self._value
+
     @property
     def float(self) -> float:
-        return self._float_repr
+        return self._float_struct.unpack(self._value)[0]
 
     @property
     def int(self) -> int:
-        return self._int_repr
+        return self._int_struct.unpack(self._value)[0]
 
     @property
     def uint(self) -> int:
-        return self._uint_repr
+        return self._uint_struct.unpack(self._value)[0]
 
 
 class Fixed32Repr(FixedRepr):
-    def __init__(self, value: bytes) -> None:
-        super().__init__(value, "<i", "<I", "<f")
+    __slots__ = ()
+
+    _int_struct = struct.Struct("<i")
+    _uint_struct = struct.Struct("<I")
+    _float_struct = struct.Struct("<f")
 
 
 class Fixed64Repr(FixedRepr):
-    def __init__(self, value: bytes) -> None:
-        super().__init__(value, "<q", "<Q", "<d")
+    __slots__ = ()
+
+    _int_struct = struct.Struct("<q")
+    _uint_struct = struct.Struct("<Q")
+    _float_struct = struct.Struct("<d")
 
 
 class ChunkRepr(BaseTypeRepr):
-    def __init__(self, value: bytes) -> None:
+    # _chunk_repr is either the chunk itself or a (payload, start, end)
+    # tuple of a deferred copy
+    __slots__ = ("_chunk_repr", "_str_repr", "_message_repr", "_context")
+
+    # longer chunks are never reported as strings
+    str_max_length: Optional[int] = None
+
+    def __init__(
+        self,
+        value: Buffer,
+        eager_depth: Optional[int] = None,
+        context: Optional[_Context] = None
+    ) -> None:
         self._chunk_repr = value
+        self._str_repr = _UNSET
+        self._message_repr = _UNSET
+        self._context = context
+
+        if context is not None and _too_deep(context):
+            self._message_repr = None
+        elif eager_depth is None:
+            self._message_repr = _parse_speculative(value, None, context)
+        elif eager_depth > 0:
+            self._message_repr = _parse_speculative(
+                value, eager_depth - 1, context
+            )
 
-        try:
-            str_candidate = self._chunk_repr.decode()
-            self._str_repr = str_candidate if all(
-                c in string.printable for c in str_candidate
-            ) else None
-        except UnicodeDecodeError:
-            self._str_repr = None
+    @classmethod
+    def from_parsed(
+        cls, value: Buffer, message: Optional[MessageRepr]
+    ) -> ChunkRepr:
+        chunk = cls(value, 0)
+        chunk._message_repr = message
 
-        self._message_repr = parse_proto(self._chunk_repr)
+        return chunk
 
     def __repr__(self) -> str:
         return (
@@ -162,15 +562,61 @@ class ChunkRepr(BaseTypeRepr):
         return super().accept(printer)
 
     @property
-    def chunk(self) -> bytes:
-        return self._chunk_repr
+    def chunk(self) -> Buffer:
+        chunk = self._chunk_repr
+
+        if chunk.__class__ is tuple:
+            payload, start, end = chunk
+            chunk = self._chunk_repr = payload[start:end]
+
+        return chunk
+
+    def tobytes(self) -> bytes:
+        return bytes(self.chunk)
+
+    def packed_varints(self, zigzag: bool = False) -> Optional[List[int]]:
+        return decode_packed_varints(self.chunk, zigzag)
+
+    def packed_fixed32(self, kind: str = "uint") -> Optional[array.array]:
+        return decode_packed_fixed(self.chunk, WireType.Fixed32, kind)
+
+    def packed_fixed64(self, kind: str = "uint") -> Optional[array.array]:
+        return decode_packed_fixed(self.chunk, WireType.Fixed64, kind)
 
     @property
-    def str(self) -> str:
+    def str(self) -> Optional[str]:
+        if self._str_repr is _UNSET:
+            self._str_repr = decode_printable(
+                self.chunk, self.str_max_length
+            )
+
         return self._str_repr
 
     @property
-    def msg(self) -> MessageRepr:
+    def msg(self) -> Optional[MessageRepr]:
+        if self._message_repr is _UNSET:
+            context = self._context
+
+            if context is not None:
+                budget, depth, cache = context
+
+                if budget is not None:
+                    # a deferred parse gets a budget of its own
+                    context = (_Budget(budget.limits), depth, cache)
+
+            chunk = self._chunk_repr
+
+            if chunk.__class__ is tuple:
+                # a deferred chunk is parsed in place
+                payload, start, end = chunk
+            else:
+                payload, start, end = chunk, 0, None
+
+            # sub-messages of a lazily parsed chunk are lazy as well
+            self._message_repr = _parse_speculative(
+                payload, 0, context, start, end
+            )
+
         return self._message_repr
 
 
@@ -178,6 +624,190 @@ def zigzag_decode(number: int) -> int:
     return (number >> 1) ^ -(number & 1)
 
 
+def looks_like_message(
+    payload: Buffer,
+    max_fields: int = _PRECHECK_FIELDS,
+    offset: int = 0,
+    end: Optional[int] = None
+) -> bool:
+    start = offset
+
+    if end is None:
+        end = len(payload)
+
+    try:
+        for _ in range(max_fields):
+            if offset == end:
+                break
+
+            identifier, offset = decode_varint(payload, offset)
+
+            if identifier is None:
+                return False
+
+            field_no = identifier >> 3
+            wire_type = identifier & 0b111
+
+            if (
+                field_no == 0 or field_no > _MAX_FIELD_NO or
+                field_no in _RESERVED_FIELD_NOS
+            ):
+                return False
+
+            if wire_type == 0:
+                value, offset = decode_varint(payload, offset)
+
+                if value is None:
+                    return False
+            elif wire_type == 2:
+                length, offset = decode_varint(payload, offset)
+
+                if length is None:
+                    return False
+
+                offset += length
+            elif wire_type == 1:
+                offset += 8
+            elif wire_type == 5:
+                offset += 4
+            else:
+                # groups are not supported and 6, 7 are not wire types
+                return False
+
+            if offset > end:
+                return False
+    except ValueError:
+        return False
+
+    return end != start
+
+
+def parse_speculative(
+    payload: Buffer, eager_depth: Optional[int] = None
+) -> Optional[MessageRepr]:
+    return _parse_speculative(payload, eager_depth, None)
+
+
+def _parse_speculative(
+    payload: Buffer,
+    eager_depth: Optional[int],
+    context: Optional[_Context],
+    start: int = 0,
+    end: Optional[int] = None
+) -> Optional[MessageRepr]:
+    if not looks_like_message(payload, _PRECHECK_FIELDS, start, end):
+        speculation_stats.skipped += 1
+        return None
+
+    key = None
+
+    if context is not None:
+        budget, _, cache = context
+
+        # chunks are never deferred when a cache is used, so they are
+        # parsed as a whole
+        if cache is not None and budget is None:
+            key = cache.key(payload, eager_depth)
+            entry = cache._lookup(key)
+
+            if entry is not None:
+                return entry[0]
+
+    speculation_stats.attempted += 1
+    message = _parse_message(
+        payload, eager_depth, context, None, start, end, key
+    )
+
+    if message is None:
+        speculation_stats.failed += 1
+
+    return message
+
+
+def decode_printable(payload: Buffer,
+                     max_length: Optional[int] = None) -> Optional[str]:
+    if max_length is not None and len(payload) > max_length:
+        return None
+
+    # string.printable is ASCII only, so it is enough to check that
+    # deleting all printable bytes leaves nothing behind, binary data is
+    # rejected by its first bytes before a view or a mapping is copied
+    if bytes(payload[:_PRINTABLE_PREFIX]).translate(None, _PRINTABLE):
+        return None
+
+    if not isinstance(payload, bytes):
+        payload = bytes(payload)
+
+    if payload.translate(None, _PRINTABLE):
+        return None
+
+    return payload.decode("ascii")
+
+
+def is_printable(payload: Buffer, max_length: Optional[int] = None) -> bool:
+    return decode_printable(payload, max_length) is not None
+
+
+def py_decode_packed_varints(payload: Buffer,
+                             zigzag: bool = False) -> Optional[List[int]]:
+    if max(payload, default=0) < 0b1000_0000:
+        # every element is a single byte varint
+        values = list(payload)
+    else:
+        values = []
+        append = values.append
+        value = 0
+        pos = 0
+
+        for num in payload:
+            if num < 0b1000_0000:
+                append(value | num << pos)
+                value = 0
+                pos = 0
+            else:
+                value |= (num & 0b0111_1111) << pos
+                pos += 7
+
+                if pos > 63:
+                    return None
+
+        if pos != 0:
+            return None
+
+    if zigzag:
+        return [(value >> 1) ^ -(value & 1) for value in values]
+
+    return values
+
+
+if _speedups is not None:
+    decode_packed_varints = _speedups.decode_packed_varints
+else:
+    decode_packed_varints = py_decode_packed_varints
+
+
+def decode_packed_fixed(
+    payload: Buffer, wire_type: WireType, kind: str = "uint"
+) -> Optional[array.array]:
+    fmt = _PACKED_FORMATS[wire_type][kind]
+    width = struct.calcsize(fmt)
+
+    if len(payload) % width != 0:
+        return None
+
+    values = array.array(fmt[1])
+
+    if values.itemsize == width:
+        values.frombytes(payload)
+
+        if sys.byteorder != "little":
+            values.byteswap()
+    else:
+        values.fromlist([value for value, in struct.iter_unpack(fmt, payload)])
+
+    return values
+
+
 def parse_fixed32(payload: bytes) -> Fixed32Repr:
     return Fixed32Repr(payload)
 
@@ -186,8 +816,12 @@ def parse_fixed64(payload: bytes) -> Fixed64Repr:
     return Fixed64Repr(payload)
 
 
-def parse_chunk(payload: bytes) -> ChunkRepr:
-    return ChunkRepr(payload)
+def parse_chunk(
+    payload: Buffer,
+    eager_depth: Optional[int] = None,
+    context: Optional[_Context] = None
+) -> ChunkRepr:
+    return ChunkRepr(payload, eager_depth, context)
 
 
 def parse_varint(value: int) -> VarintRepr:
@@ -218,27 +852,383 @@ def parse_varint_stream(stream: io.BufferedIOBase) -> VarintRepr:
     return parse_varint(value)
 
 
-def parse_proto(payload: bytes) -> Optional[MessageRepr]:
-    stream = io.BytesIO(payload)
-    message = MessageRepr()
-    handlers = {
-        WireType.Varint: parse_varint_stream,
-        WireType.Fixed64: parse_fixed64_stream,
-        WireType.Fixed32: parse_fixed32_stream,
-        WireType.LengthDelimited: parse_chunk_stream
+def parse_proto(
+    payload: Buffer,
+    eager_depth: Optional[int] = None,
+    zero_copy: bool = False,
+    limits: Optional[ParseLimits] = None,
+    include: Optional[Projection] = None,
+    cache: Optional[ParseCache] = None
+) -> Optional[MessageRepr]:
+    if isinstance(payload, mmap.mmap):
+        # chunks of a mapped file are always views into the mapping
+        zero_copy = True
+
+    if zero_copy and not isinstance(payload, memoryview):
+        # slices of a memoryview are views as well, so every chunk of the
+        # resulting tree references the original payload
+        payload = memoryview(payload).cast("B")
+
+    if payload.__class__ is not bytes or include is not None:
+        # views and mutable buffers are never cached, as the results would
+        # share their memory, and projected results are partial
+        cache = None
+
+    budget = _Budget(limits) if limits is not None else None
+    context = (
+        (budget, 0, cache) if budget is not None or cache is not None
+        else None
+    )
+
+    if cache is None:
+        projection = (
+            _compile_projection(include) if include is not None else None
+        )
+
+        return _parse_message(payload, eager_depth, context, projection)
+
+    key = cache.key(payload, eager_depth, limits)
+    entry = cache._lookup(key)
+
+    if entry is not None:
+        return entry[0]
+
+    return _parse_message(payload, eager_depth, context, None, 0, None, key)
+
+
+def _compile_projection(include: Projection) -> _Projection:
+    if callable(include):
+        return include, ()
+
+    if not isinstance(include, dict):
+        return dict.fromkeys(include)
+
+    return {
+        field_no: (
+            None if sub_include is None or sub_include is True
+            else _compile_projection(sub_include)
+        ) for field_no, sub_include in include.items()
     }
 
+
+def _parse_message(
+    payload: Buffer,
+    eager_depth: Optional[int],
+    context: Optional[_Context],
+    projection: Optional[_Projection] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+    key: Optional[Hashable] = None
+) -> Optional[MessageRepr]:
+    # sub-messages are parsed depth-first with an explicit stack of the
+    # suspended parent messages instead of recursion, the fields of each
+    # message are located in bulk by scan_fields within the payload, so
+    # sub-messages are never sliced out of their parents
+    #
+    # large chunks of bytes payloads are stored as deferred copies, as they
+    # are immutable, which keeps the cost of deep nesting linear
+    #
+    # under a budget fields are scanned in batches of _SCAN_BATCH and the
+    # rest of a message is dropped once the budget is exhausted
+    #
+    # a cache is only passed for bytes payloads parsed without projections,
+    # all messages are frozen, as they may be shared through it, and it is
+    # consulted for every sub-message unless their results depend on the
+    # remaining budget, key is the cache key of the message itself
+    #
+    # retained is the estimated memory of the message with everything parsed
+    # into it, which is what its cache entry holds on to
+    budget = None
+    depth = 0
+    cache = None
+
+    if context is not None:
+        budget, depth, cache = context
+
+    if end is None:
+        end = len(payload)
+
+    lookups = cache if budget is None else None
+    retained = 0
+    deferred = payload.__class__ is bytes and cache is None
+    chunk_context = (
+        (budget, depth + 1, cache) if context is not None else None
+    )
+    stack = []
+    message = MessageRepr()
+    chunk = None
+    batch = _SCAN_BATCH if budget is not None else None
+    fields, stop = scan_fields(payload, start, end, batch)
+    index = 0
+    count = len(fields)
+
     while True:
-        try:
-            field = FieldDescriptor(stream)
-            field_repr = handlers[field.proto_id.wire_type](stream)
-            message.add_field(Field(field, field_repr))
+        if index < count:
+            identifier, value, value_end = fields[index]
+            index += 1
+
+            if projection is not None:
+                # excluded fields are skipped before any repr is created
+                if projection.__class__ is dict:
+                    if identifier >> 3 not in projection:
+                        continue
 
-            if len(stream.read1(1)) == 1:
-                stream.seek(-1, io.SEEK_CUR)
+                    sub_projection = projection[identifier >> 3]
+                else:
+                    predicate, path = projection
+                    sub_path = path + (identifier >> 3, )
+
+                    if not predicate(sub_path):
+                        continue
+
+                    sub_projection = predicate, sub_path
             else:
-                break
-        except ValueError:
-            return None
+                sub_projection = None
+
+            field = _field_descriptor(identifier)
+            wire_type = identifier & 0b111
+            size = 0
+
+            if wire_type != 0:
+                value_start = value
+                size = value_end - value_start
+
+                if (
+                    deferred and wire_type == 2 and
+                    size >= _DEFERRED_COPY_SIZE
+                ):
+                    value = (payload, value_start, value_end)
+                else:
+                    value = payload[value_start:value_end]
+
+            if budget is None or budget.charge(size) is None:
+                retained += _CACHE_FIELD_SIZE + size
+
+                if wire_type == 0:
+                    message.add_field(Field(field, VarintRepr(value)))
+                elif wire_type == 2:
+                    field_repr = ChunkRepr(value, 0, chunk_context)
+                    message.add_field(Field(field, field_repr))
+
+                    if field_repr._message_repr is None:
+                        # strings and blobs beyond max_depth lose nothing
+                        if (
+                            message._truncated is None and
+                            looks_like_message(
+                                payload, _PRECHECK_FIELDS, value_start,
+                                value_end
+                            )
+                        ):
+                            message._truncated = "max_depth"
+                    elif (
+                        eager_depth is None or eager_depth > 0 or
+                        sub_projection is not None
+                    ):
+                        # projected sub-messages are parsed up front, as
+                        # the projection is not kept for lazy parsing
+                        if looks_like_message(
+                            payload, _PRECHECK_FIELDS, value_start, value_end
+                        ):
+                            sub_key = None
+
+                            if lookups is not None:
+                                sub_key = lookups.key(
+                                    value,
+                                    eager_depth - 1 if eager_depth
+                                    else eager_depth
+                                )
+                                entry = lookups._lookup(sub_key)
+
+                                if entry is not None:
+                                    field_repr._message_repr = entry[0]
+                                    retained += entry[1] - _CACHE_ENTRY_SIZE
+                                    continue
+
+                            speculation_stats.attempted += 1
+                            stack.append((
+                                fields, index, count, stop, end, message,
+                                eager_depth, depth, chunk, projection, key,
+                                retained
+                            ))
+                            fields, stop = scan_fields(
+                                payload, value_start, value_end, batch
+                            )
+                            index = 0
+                            count = len(fields)
+                            end = value_end
+                            message = MessageRepr()
+                            eager_depth = (
+                                eager_depth - 1 if eager_depth else eager_depth
+                            )
+                            projection = sub_projection
+                            depth += 1
+                            chunk = field_repr
+                            key = sub_key
+                            retained = 0
+                            chunk_context = (
+                                (budget, depth + 1, cache)
+                                if context is not None else None
+                            )
+                            continue
+
+                        speculation_stats.skipped += 1
+                        field_repr._message_repr = None
+                elif wire_type == 5:
+                    message.add_field(Field(field, Fixed32Repr(value)))
+                else:
+                    message.add_field(Field(field, Fixed64Repr(value)))
+
+                continue
+
+            message._truncated = budget.exhausted
+            # the message ends here, its parents stop at their next field
+            count = index
+            stop = end
+        elif count == batch and stop != end:
+            # the next batch of the fields of a message parsed under a budget
+            fields, stop = scan_fields(payload, stop, end, batch)
+            index = 0
+            count = len(fields)
+            continue
+        elif stop != end or count == 0:
+            if key is not None:
+                cache._store(key, _CACHE_ENTRY_SIZE, None)
+
+            if not stack:
+                return None
+
+            # a malformed sub-message is dropped with everything parsed
+            # inside of it and its parent goes on after the chunk
+            speculation_stats.failed += 1
+            chunk._message_repr = None
+            (
+                fields, index, count, stop, end, message, eager_depth, depth,
+                chunk, projection, key, retained
+            ) = stack.pop()
+            chunk_context = (
+                (budget, depth + 1, cache) if context is not None else None
+            )
+
+            if budget is not None and message._truncated is None:
+                message._truncated = budget.exhausted
+
+            continue
+
+        # the current message is complete, so attach it to its chunk and
+        # resume its parent
+        if cache is not None:
+            message.freeze()
+
+        # results cut short by the clock differ between calls
+        if key is not None and message._truncated != "time_budget":
+            cache._store(key, _CACHE_ENTRY_SIZE + retained, message)
+
+        if not stack:
+            return message
+
+        sub_message = message
+        sub_retained = retained
+        chunk._message_repr = sub_message
+        (
+            fields, index, count, stop, end, message, eager_depth, depth,
+            chunk, projection, key, retained
+        ) = stack.pop()
+        retained += sub_retained
+        chunk_context = (
+            (budget, depth + 1, cache) if context is not None else None
+        )
 
-    return message
+        if sub_message._truncated is not None and message._truncated is None:
+            message._truncated = sub_message._truncated
+
+
+def _iter_path(message: MessageRepr, path: Sequence[int],
+               level: int) -> Iterator[Field]:
+    fields = message.get_all(path[level])
+
+    if level == len(path) - 1:
+        yield from fields
+        return
+
+    for field in fields:
+        field_repr = field.field_repr
+
+        if isinstance(field_repr, ChunkRepr) and field_repr.msg is not None:
+            yield from _iter_path(field_repr.msg, path, level + 1)
+
+
+def _too_deep(context: _Context) -> bool:
+    budget, depth, _ = context
+
+    if budget is None:
+        return False
+
+    max_depth = budget.limits.max_depth
+
+    return max_depth is not None and depth > max_depth
+
+
+def parse_file(
+    path: Union[str, os.PathLike],
+    eager_depth: Optional[int] = None,
+    use_mmap: bool = True
+) -> Optional[MessageRepr]:
+    if use_mmap:
+        return parse_proto(map_file(path), eager_depth)
+
+    with open(path, "rb") as stream:
+        return parse_proto(stream.read(), eager_depth)
+
+
+def iter_events(
+    payload: Buffer,
+    descend: Optional[Callable[[Event], bool]] = None
+) -> Iterator[Event]:
+    view = memoryview(payload).cast("B")
+    offset = 0
+    end = len(view)
+    path = ()
+    parents = []
+
+    while True:
+        if offset == end:
+            if not parents:
+                return
+
+            end, path = parents.pop()
+            continue
+
+        proto_id, offset = decode_identifier(view, offset)
+
+        if proto_id is None:
+            raise ValueError("Incorrect Protobuf stream")
+
+        wire_type = proto_id.wire_type
+
+        # groups are not supported, as in parse_proto
+        if (
+            wire_type == WireType.StartGroup or
+            wire_type == WireType.EndGroup
+        ):
+            raise ValueError("Incorrect Protobuf stream")
+
+        value, value_end = decode_value(view, offset, wire_type)
+
+        if value is None or value_end > end:
+            raise ValueError("Incorrect Protobuf stream")
+
+        is_chunk = wire_type == WireType.LengthDelimited
+        start = value_end - len(value) if is_chunk else offset
+        event = Event(
+            path, proto_id.field_no, wire_type, start, value_end - start, value
+        )
+
+        yield event
+
+        if is_chunk and descend is not None and descend(event):
+            parents.append((end, path))
+            path = path + (proto_id.field_no, )
+            end = value_end
+            offset = start
+        else:
+            offset = value_end
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import io
+import os
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+from .core import (
+    Buffer, _field_descriptor, decode_varint, map_file, scan_fields
+)
+from .parser import (
+    Field, Fixed32Repr, Fixed64Repr, MessageRepr, VarintRepr, parse_chunk,
+    parse_proto
+)
+
+READ_SIZE = 64 * 1024
+
+Source = Union[str, bytes, os.PathLike, BinaryIO]
+
+
+def read_delimited(
+    source: Source,
+    eager_depth: Optional[int] = None,
+    read_size: int = READ_SIZE,
+    use_mmap: bool = False
+) -> Iterator[Optional[MessageRepr]]:
+    if use_mmap:
+        yield from _read_delimited_buffer(map_file(source), eager_depth)
+    elif isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as stream:
+            yield from _read_delimited(stream, eager_depth, read_size)
+    else:
+        yield from _read_delimited(source, eager_depth, read_size)
+
+
+def _read_delimited(
+    stream: io.BufferedIOBase, eager_depth: Optional[int], read_size: int
+) -> Iterator[Optional[MessageRepr]]:
+    buffer = b""
+    offset = 0
+
+    while True:
+        length, start = decode_varint(buffer, offset)
+
+        if length is not None:
+            end = start + length
+
+            if end <= len(buffer):
+                yield _parse_record(buffer[start:end], eager_depth)
+                offset = end
+                continue
+
+            missing = end - len(buffer)
+        else:
+            missing = 1
+
+        data = stream.read(max(read_size, missing))
+
+        if not data:
+            if offset != len(buffer):
+                raise ValueError("Truncated delimited record")
+
+            return
+
+        # keep only the unprocessed tail of the buffer
+        buffer = buffer[offset:] + data
+        offset = 0
+
+
+def _read_delimited_buffer(
+    buffer: Buffer, eager_depth: Optional[int]
+) -> Iterator[Optional[MessageRepr]]:
+    view = memoryview(buffer)
+    offset = 0
+
+    while offset != len(view):
+        length, start = decode_varint(view, offset)
+
+        if length is None or start + length > len(view):
+            raise ValueError("Truncated delimited record")
+
+        offset = start + length
+        yield _parse_record(view[start:offset], eager_depth)
+
+
+def _parse_record(
+    payload: Buffer, eager_depth: Optional[int]
+) -> Optional[MessageRepr]:
+    # a zero-length record is a message with all fields at their defaults,
+    # while parse_proto returns None for an empty payload
+    if not payload:
+        return MessageRepr()
+
+    return parse_proto(payload, eager_depth)
+
+
+class IncrementalDecoder:
+    # push decoder for a single message that arrives in pieces, every feed
+    # returns the top-level fields completed by the data fed so far
+    __slots__ = ("eager_depth", "_buffer", "_needed", "_error")
+
+    def __init__(self, eager_depth: Optional[int] = None) -> None:
+        self.eager_depth = eager_depth
+        # unprocessed tail with the beginning of an incomplete field
+        self._buffer = bytearray()
+        # tail length the pending field needs to be complete, so that the
+        # tail is not scanned again until enough data is there
+        self._needed = 1
+        self._error: Optional[str] = None
+
+    def feed(self, data: Buffer) -> List[Field]:
+        if self._error is not None:
+            raise ValueError(self._error)
+
+        buffer = self._buffer
+        buffer += data
+
+        if len(buffer) < self._needed:
+            return []
+
+        scanned, stop = scan_fields(buffer)
+
+        with memoryview(buffer) as view:
+            fields = [
+                self._make_field(view, identifier, value, end)
+                for identifier, value, end in scanned
+            ]
+
+        del buffer[:stop]
+
+        try:
+            self._needed = _pending_size(buffer)
+        except ValueError as e:
+            # fields before the malformed one are still returned
+            self._error = str(e)
+
+        return fields
+
+    def close(self) -> None:
+        if self._error is not None:
+            raise ValueError(self._error)
+
+        if self._buffer:
+            raise ValueError("Truncated message")
+
+    def _make_field(
+        self, view: memoryview, identifier: int, value: int, end: int
+    ) -> Field:
+        wire_type = identifier & 0b111
+
+        if wire_type == 0:
+            field_repr = VarintRepr(value)
+        elif wire_type == 2:
+            field_repr = parse_chunk(bytes(view[value:end]), self.eager_depth)
+        elif wire_type == 5:
+            field_repr = Fixed32Repr(bytes(view[value:end]))
+        else:
+            field_repr = Fixed64Repr(bytes(view[value:end]))
+
+        return Field(_field_descriptor(identifier), field_repr)
+
+
+def _pending_size(buffer: bytearray) -> int:
+    # buffer starts with a field that scan_fields could not decode, which is
+    # either incomplete or malformed
+    identifier, start = decode_varint(buffer)
+
+    if identifier is None:
+        return len(buffer) + 1
+
+    wire_type = identifier & 0b111
+
+    if wire_type == 0:
+        # the value is incomplete, or decoding it raises
+        decode_varint(buffer, start)
+
+        return len(buffer) + 1
+    elif wire_type == 2:
+        length, value_start = decode_varint(buffer, start)
+
+        return value_start + length if length is not None else len(buffer) + 1
+    elif wire_type == 5:
+        return start + 4
+    elif wire_type == 1:
+        return start + 8
+
+    raise ValueError(f"Unsupported wire type {wire_type}")
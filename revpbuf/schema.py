@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+from .core import (
+    Buffer, BaseProtoPrinter, BaseTypeRepr, WireType, _field_descriptor,
+    scan_fields
+)
+from .parser import (
+    ChunkRepr, Field, Fixed32Repr, Fixed64Repr, MessageRepr, VarintRepr,
+    zigzag_decode
+)
+
+Hints = Dict[int, Union[str, "Hints"]]
+# reads a hinted value located by scan_fields, that is the decoded varint or
+# the start offset of any other value, and the offset after it
+FieldReader = Callable[[Buffer, int, int], BaseTypeRepr]
+
+
+class HintedRepr(BaseTypeRepr):
+    __slots__ = ("_name", "_value")
+
+    def __init__(self, name: str, value: Any) -> None:
+        self._name = name
+        self._value = value
+
+    def __repr__(self) -> str:
+        name, value = self.get_fields()[0]
+
+        return f"{self.__class__.__name__}:{os.linesep}\t{name}: {value}"
+
+    def get_fields(self) -> Sequence[Sequence[Union[str, Any]]]:
+        if self._name == "chunk":
+            return (("chunk", self._value.hex(" ")), )
+
+        return ((self._name, self._value), )
+
+    def accept(self, printer: BaseProtoPrinter) -> str:
+        return super().accept(printer)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+
+class HintedDecoder:
+    __slots__ = ("_readers", )
+
+    def __init__(self, hints: Hints) -> None:
+        # readers are looked up by the raw tag, so a hint applies only to
+        # the wire types it makes sense for
+        self._readers: Dict[int, FieldReader] = {}
+
+        for field_no, hint in hints.items():
+            if isinstance(hint, dict):
+                readers = {
+                    WireType.LengthDelimited:
+                        _message_reader(HintedDecoder(hint))
+                }
+            elif hint in _READERS:
+                readers = _READERS[hint]
+            else:
+                raise ValueError(f"Unknown hint {hint!r} for field {field_no}")
+
+            for wire_type, reader in readers.items():
+                self._readers[field_no << 3 | wire_type.value] = reader
+
+    def parse(
+        self, payload: Buffer, start: int = 0, end: Optional[int] = None
+    ) -> Optional[MessageRepr]:
+        # the fields are located in bulk by scan_fields and each one is read
+        # by the reader of its raw tag
+        if end is None:
+            end = len(payload)
+
+        fields, stop = scan_fields(payload, start, end)
+
+        if stop != end or not fields:
+            return None
+
+        message = MessageRepr()
+        append = message._fields.append
+        readers = self._readers
+
+        for identifier, value, value_end in fields:
+            reader = readers.get(identifier)
+
+            if reader is None:
+                reader = _BLIND_READERS[identifier & 0b111]
+
+            append(Field(
+                _field_descriptor(identifier),
+                reader(payload, value, value_end)
+            ))
+
+        return message
+
+
+def compile_hints(hints: Hints) -> HintedDecoder:
+    return HintedDecoder(hints)
+
+
+def parse_hinted(
+    payload: Buffer, hints: Union[Hints, HintedDecoder]
+) -> Optional[MessageRepr]:
+    if not isinstance(hints, HintedDecoder):
+        hints = HintedDecoder(hints)
+
+    return hints.parse(payload)
+
+
+def _varint_reader(
+    name: str, convert: Optional[Callable[[int], Any]] = None
+) -> FieldReader:
+    if convert is None:
+        def read(payload: Buffer, value: int, end: int) -> BaseTypeRepr:
+            return HintedRepr(name, value)
+    else:
+        def read(payload: Buffer, value: int, end: int) -> BaseTypeRepr:
+            return HintedRepr(name, convert(value))
+
+    return read
+
+
+def _fixed_reader(name: str, fmt: str) -> FieldReader:
+    unpack_from = struct.Struct(fmt).unpack_from
+
+    def read(payload: Buffer, start: int, end: int) -> BaseTypeRepr:
+        value, = unpack_from(payload, start)
+
+        return HintedRepr(name, value)
+
+    return read
+
+
+def _chunk_reader(payload: Buffer, start: int, end: int) -> BaseTypeRepr:
+    return HintedRepr("chunk", payload[start:end])
+
+
+def _str_reader(payload: Buffer, start: int, end: int) -> BaseTypeRepr:
+    value = payload[start:end]
+
+    try:
+        return HintedRepr("str", str(value, "utf-8"))
+    except UnicodeDecodeError:
+        return ChunkRepr(value, 0)
+
+
+def _message_reader(decoder: HintedDecoder) -> FieldReader:
+    def read(payload: Buffer, start: int, end: int) -> BaseTypeRepr:
+        # the sub-message is parsed in place in the payload
+        message = decoder.parse(payload, start, end)
+
+        if message is None:
+            return ChunkRepr.from_parsed(payload[start:end], None)
+
+        return HintedRepr("sub-msg", message)
+
+    return read
+
+
+# fields without a hint are decoded the usual way, but their sub-messages
+# are only parsed on access, group wire types never reach the readers
+_BLIND_READERS = (
+    lambda payload, value, end: VarintRepr(value),
+    lambda payload, start, end: Fixed64Repr(payload[start:end]),
+    lambda payload, start, end: ChunkRepr(payload[start:end], 0),
+    None,
+    None,
+    lambda payload, start, end: Fixed32Repr(payload[start:end]),
+)
+
+_READERS = {
+    "uint": {
+        WireType.Varint: _varint_reader("uint"),
+        WireType.Fixed32: _fixed_reader("uint", "<I"),
+        WireType.Fixed64: _fixed_reader("uint", "<Q"),
+    },
+    "sint": {
+        WireType.Varint: _varint_reader("sint", zigzag_decode),
+        WireType.Fixed32: _fixed_reader("sint", "<i"),
+        WireType.Fixed64: _fixed_reader("sint", "<q"),
+    },
+    "float": {
+        WireType.Fixed32: _fixed_reader("float", "<f"),
+        WireType.Fixed64: _fixed_reader("float", "<d"),
+    },
+    "str": {WireType.LengthDelimited: _str_reader},
+    "chunk": {WireType.LengthDelimited: _chunk_reader},
+}
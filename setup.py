@@ -6,10 +6,11 @@
 
 import io
 import os
+import platform
 import sys
 from shutil import rmtree
 
-from setuptools import find_packages, setup, Command
+from setuptools import Extension, find_packages, setup, Command
 
 # Package meta-data.
 NAME = "revpbuf"
@@ -30,6 +31,17 @@ EXTRAS = {
     # 'fancy feature': ['django'],
 }
 
+# Optional C speedups, the package falls back to pure Python when the
+# extension can not be built or on other interpreters.
+EXT_MODULES = []
+
+if platform.python_implementation() == "CPython":
+    EXT_MODULES.append(
+        Extension(
+            "revpbuf._speedups", ["revpbuf/_speedups.c"], optional=True
+        )
+    )
+
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
 # Except, perhaps the License and Trove Classifiers!
@@ -108,6 +120,7 @@ setup(
     packages=find_packages(
         exclude=["tests", "*.tests", "*.tests.*", "tests.*", "examples"]
     ),
+    ext_modules=EXT_MODULES,
     # If your package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
 
@@ -0,0 +1,109 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, List, Optional
+
+import pytest
+
+from revpbuf import aio, parser
+
+from .test_reader import RECORDS, check_records, delimited
+
+
+def stream_reader(data: bytes, piece_size: Optional[int] = None) -> Any:
+    reader = asyncio.StreamReader()
+    piece_size = piece_size or max(len(data), 1)
+
+    async def feed() -> None:
+        for start in range(0, len(data), piece_size):
+            reader.feed_data(data[start:start + piece_size])
+            await asyncio.sleep(0)
+
+        reader.feed_eof()
+
+    asyncio.get_running_loop().create_task(feed())
+
+    return reader
+
+
+async def collect(data: bytes, **kwargs: Any) -> List[Any]:
+    piece_size = kwargs.pop("piece_size", None)
+
+    return [
+        message async for message in aio.read_delimited(
+            stream_reader(data, piece_size), **kwargs
+        )
+    ]
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 5, 1024])
+@pytest.mark.parametrize("piece_size", [1, 3, None])
+def test_read_delimited(read_size: int, piece_size: Optional[int]) -> None:
+    messages = asyncio.run(
+        collect(
+            delimited(*RECORDS), read_size=read_size, piece_size=piece_size
+        )
+    )
+
+    check_records(messages)
+
+
+def test_read_delimited_empty() -> None:
+    assert asyncio.run(collect(b"")) == []
+
+
+def test_read_delimited_empty_records() -> None:
+    messages = asyncio.run(collect(delimited(b"", RECORDS[0], b"", b"\x08")))
+
+    assert [
+        len(message.fields) if message is not None else None
+        for message in messages
+    ] == [0, 1, 0, None]
+
+
+def test_read_delimited_truncated() -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(collect(delimited(*RECORDS)[:-1]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(delimited(*RECORDS) + b"\x80"))
+
+
+def test_read_delimited_offload(monkeypatch: pytest.MonkeyPatch) -> None:
+    threads = []
+
+    def parse_proto(payload: bytes, eager_depth: Any) -> Any:
+        threads.append(threading.current_thread())
+
+        return parser.parse_proto(payload, eager_depth)
+
+    monkeypatch.setattr(aio, "parse_proto", parse_proto)
+    messages = asyncio.run(collect(delimited(*RECORDS), offload_size=4))
+
+    check_records(messages)
+    # only the records of at least 4 bytes are parsed in the executor
+    assert threads[0] is threading.main_thread()
+    assert all(thread is not threading.main_thread() for thread in threads[1:])
+
+
+def test_parse_proto_async() -> None:
+    async def parse(data: bytes, length: int, **kwargs: Any) -> Any:
+        return await aio.parse_proto_async(
+            stream_reader(data, 1), length, **kwargs
+        )
+
+    message = asyncio.run(parse(RECORDS[2] + b"tail", len(RECORDS[2])))
+
+    assert message.fields[0].field_repr.str == "h" * 128
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        message = asyncio.run(
+            parse(
+                RECORDS[2], len(RECORDS[2]), offload_size=0, executor=executor
+            )
+        )
+
+    assert message.fields[0].field_repr.str == "h" * 128
+
+    with pytest.raises(ValueError):
+        asyncio.run(parse(RECORDS[2], len(RECORDS[2]) + 1))
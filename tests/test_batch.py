@@ -0,0 +1,104 @@
+import pytest
+
+from revpbuf import batch, parser
+
+PAYLOADS = [
+    bytes.fromhex("08 96 01 12 02 08 02"),
+    bytes.fromhex("0d 00 00 20 3e 11 00 00 00 00 00 00 00 40"),
+    bytes.fromhex("0a 06 0a 04 12 02 68 67 0a 02 ff ff"),
+    b"",
+    bytes.fromhex("08 96"),
+] * 5
+
+
+@pytest.mark.parametrize("payload", PAYLOADS[:3])
+def test_compact_round_trip(payload: bytes) -> None:
+    message = parser.parse_proto(payload)
+    compact = batch.to_compact(message, payload)
+
+    assert all(isinstance(field[0], int) for field in compact)
+    assert repr(batch.from_compact(compact, payload)) == repr(message)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_parse_many(workers: int, chunksize: int) -> None:
+    results = list(batch.parse_many(PAYLOADS, workers, chunksize))
+
+    assert all(
+        isinstance(r, batch.CompactRecord) for r in results if r is not None
+    )
+    assert [repr(r.message if r is not None else r) for r in results] == [
+        repr(parser.parse_proto(p)) for p in PAYLOADS
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_rebuild(workers: int) -> None:
+    results = list(batch.parse_many(PAYLOADS, workers, 3, rebuild=True))
+
+    assert [repr(r) for r in results] == [
+        repr(parser.parse_proto(p)) for p in PAYLOADS
+    ]
+
+
+def test_compact_record_is_lazy() -> None:
+    payload = PAYLOADS[2]
+    compact = batch.to_compact(parser.parse_proto(payload), payload)
+    record = batch.CompactRecord(payload, compact)
+
+    assert len(record) == 2
+    assert record._message is parser._UNSET
+    assert record.message is record.message
+    assert record.message.find("1.1.2").field_repr.str == "hg"
+
+    record = batch.CompactRecord.from_message(payload, record.message)
+
+    assert record.compact == compact
+
+
+def _deep_payload(levels: int) -> bytes:
+    payload = b"\x08\x01"
+
+    for _ in range(levels):
+        length = bytearray()
+        size = len(payload)
+
+        while size > 0x7f:
+            length.append(size & 0x7f | 0x80)
+            size >>= 7
+
+        payload = b"\x0a" + bytes(length) + bytes([size]) + payload
+
+    return payload
+
+
+def test_compact_offsets_are_absolute() -> None:
+    payload = PAYLOADS[2]
+    compact = batch.to_compact(parser.parse_proto(payload), payload)
+
+    assert compact == (
+        (10, (2, 8), 1), (10, (4, 8), 1), (18, (6, 8), 1), (104, 103, None),
+        (10, (10, 12), None)
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_deep_nesting(workers: int) -> None:
+    # deeper than the recursion limit
+    payload = _deep_payload(3000)
+    (record, ) = batch.parse_many([payload], workers)
+    message = batch.CompactRecord(payload, record.compact).message
+
+    for _ in range(3000):
+        message = message.fields[0].field_repr.msg
+
+    assert len(record) == 1
+    assert message.fields[0].field_repr.int == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_transform(workers: int) -> None:
+    results = list(batch.parse_many(iter(PAYLOADS), workers, 2, repr))
+
+    assert results == [repr(parser.parse_proto(p)) for p in PAYLOADS]
@@ -0,0 +1,303 @@
+import array
+import ast
+import io
+import math
+import random
+import struct
+import zipfile
+from typing import Any, Dict
+
+import pytest
+
+from revpbuf import columnar, core, parser
+
+# 1: 150, 2: {1: 2, 2: 3}, 3: 1.0f, 2: ff, 4: "hg", 1: inf
+PAYLOAD = bytes.fromhex(
+    "08 96 01 12 04 08 02 10 03 1d 00 00 80 3f 12 01 ff 22 02 68 67"
+    "09 00 00 00 00 00 00 f0 7f"
+)
+# record, path, field_no, wire_type, offset, length, uint, sint, float, str
+ROWS = [
+    (0, "", 1, 0, 1, 2, 150, 75, None, None),
+    (0, "", 2, 2, 5, 4, None, None, None, None),
+    (0, "", 3, 5, 10, 4, 1065353216, 1065353216, 1.0, None),
+    (0, "", 2, 2, 16, 1, None, None, None, None),
+    (0, "", 4, 2, 19, 2, None, None, None, "hg"),
+    (
+        0, "", 1, 1, 22, 8, 0x7ff0000000000000, 0x7ff0000000000000,
+        math.inf, None
+    ),
+    (0, "2", 1, 0, 6, 1, 2, 1, None, None),
+    (0, "2", 2, 0, 8, 1, 3, -2, None, None),
+    (0, "4", 13, 0, 20, 1, 103, -52, None, None),
+]
+
+
+def read_npz(data: bytes) -> Dict[str, Any]:
+    # minimal .npy reader, so that the archive is checked without NumPy
+    typecodes = {
+        "u1": "B", "u4": "I", "u8": "Q", "i8": "q", "f8": "d"
+    }
+    result = {}
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for name in archive.namelist():
+            member = archive.read(name)
+            assert member[:8] == b"\x93NUMPY\x01\x00"
+            (header_size, ) = struct.unpack_from("<H", member, 8)
+            assert (10 + header_size) % 64 == 0
+            header = ast.literal_eval(member[10:10 + header_size].decode())
+            (size, ) = header["shape"]
+            dtype = header["descr"][1:]
+            body = member[10 + header_size:]
+
+            if dtype[0] == "S":
+                width = int(dtype[1:])
+                values = [
+                    body[i * width:(i + 1) * width].rstrip(b"\0").decode()
+                    for i in range(size)
+                ]
+            else:
+                values = list(struct.unpack(
+                    f"={size}{typecodes[dtype]}", body
+                ))
+
+            result[name[:-len(".npy")]] = values
+
+    return result
+
+
+def test_rows() -> None:
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+
+    assert len(columns) == len(ROWS)
+    assert list(columns.rows()) == ROWS
+
+
+def test_rows_match_parse_proto() -> None:
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+    message = parser.parse_proto(PAYLOAD)
+    top_level = [row for row in columns.rows() if row[1] == ""]
+
+    assert [row[2] for row in top_level] == [
+        field.field_desc.field_no for field in message.fields
+    ]
+
+
+def test_without_descend() -> None:
+    (columns, ) = columnar.iter_field_columns([PAYLOAD], descend=False)
+
+    assert list(columns.rows()) == [row for row in ROWS if row[1] == ""]
+
+
+def test_columns() -> None:
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+
+    assert list(columns.field_no) == [1, 2, 3, 2, 4, 1, 1, 2, 13]
+    assert [columns.paths[i] for i in columns.path] == [
+        "", "", "", "", "", "", "2", "2", "4"
+    ]
+    assert math.isnan(columns.float[0])
+    assert list(columns.str_valid) == [0, 0, 0, 0, 1, 0, 0, 0, 0]
+    assert columns.str_data == b"hg"
+    assert list(columns.str_offsets) == [0, 0, 0, 0, 0, 2, 2, 2, 2, 2]
+
+
+def test_batches() -> None:
+    decoder = columnar.ColumnarDecoder()
+    payloads = [PAYLOAD, b"\xff", bytes.fromhex("08 01"), PAYLOAD]
+    batches = list(decoder.iter_batches(payloads, batch_rows=5))
+
+    assert [len(batch) for batch in batches] == [9, 10]
+    assert list(batches[1].record) == [2] + [3] * 9
+    assert decoder.records == 4
+    assert decoder.malformed == 1
+
+
+def test_empty_input() -> None:
+    (columns, ) = columnar.iter_field_columns([])
+
+    assert len(columns) == 0
+    assert list(columns.rows()) == []
+
+
+def test_field_no_overflow_drops_record() -> None:
+    # a 10 byte tag with a field number beyond 32 bits
+    wide_tag = bytes.fromhex("80 80 80 80 80 80 80 80 80 01 01")
+    decoder = columnar.ColumnarDecoder()
+    (columns, ) = decoder.iter_batches(
+        [bytes.fromhex("0a 02 68 67") + wide_tag, PAYLOAD]
+    )
+
+    assert decoder.malformed == 1
+    assert list(columns.rows()) == [(1, ) + row[1:] for row in ROWS]
+
+
+def test_sub_message_offsets_are_absolute() -> None:
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+
+    for row in columns.rows():
+        if row[3] == 0:
+            (value, _) = parser.decode_varint(PAYLOAD, row[4])
+            assert value == row[6]
+
+
+@pytest.mark.skipif(core._speedups is None, reason="C speedups are not built")
+def test_scan_columns_implementations_agree() -> None:
+    rng = random.Random(1234)
+    samples = [
+        bytes(rng.getrandbits(8) for _ in range(rng.randrange(64)))
+        for _ in range(2000)
+    ]
+    # mostly well-formed fields of every wire type
+    samples += [
+        bytes(
+            rng.choice(b"\x08\x0a\x0d\x09\x02\x80\x01\x00\x41")
+            for _ in range(rng.randrange(64))
+        ) for _ in range(2000)
+    ]
+    # the samples nested into chunks
+    samples += [
+        bytes([0x12, len(sample)]) + sample + bytes.fromhex("08 01")
+        for sample in samples if len(sample) < 0x80
+    ]
+
+    for sample in samples:
+        for descend in (True, False):
+            expected, result = [
+                (
+                    scan_columns(
+                        sample, buffers, 3, paths, path_ids, descend
+                    ), buffers, paths
+                ) for scan_columns, buffers, paths, path_ids in (
+                    (columnar.py_scan_columns, columnar._new_buffers(), [""],
+                     {}),
+                    (core._speedups.scan_columns, columnar._new_buffers(),
+                     [""], {}),
+                )
+            ]
+            # NaN payloads may differ between the implementations
+            floats = [
+                array.array("d", buffers[8]).tolist()
+                for _, buffers, _ in (expected, result)
+            ]
+
+            assert result[0] == expected[0], sample.hex()
+            assert result[1][:8] == expected[1][:8], sample.hex()
+            assert result[1][9:] == expected[1][9:], sample.hex()
+            assert str(floats[0]) == str(floats[1]), sample.hex()
+            assert result[2] == expected[2], sample.hex()
+
+
+def test_sub_message_precheck_implementations_agree() -> None:
+    # whether a chunk is descended into is decided by looks_like_message for
+    # parse_proto and py_scan_columns and by is_message in C
+    rng = random.Random(4321)
+    field_nos = [
+        0, 1, 15, 18999, 19000, 19999, 20000, 2**29 - 1, 2**29, 2**60
+    ]
+    scanners = [columnar.py_scan_columns]
+
+    if core._speedups is not None:
+        scanners.append(core._speedups.scan_columns)
+
+    def encode(number: int) -> bytes:
+        data = bytearray()
+
+        while number > 0x7f:
+            data.append(number & 0x7f | 0x80)
+            number >>= 7
+
+        return bytes(data + bytes([number]))
+
+    for _ in range(3000):
+        sample = b""
+
+        # more fields than the pre-check looks at
+        for _ in range(rng.randrange(7)):
+            wire_type = rng.choice([0, 0, 1, 2, 2, 5, 3, 6])
+            sample += encode(rng.choice(field_nos) << 3 | wire_type)
+            sample += {
+                0: encode(rng.getrandbits(rng.choice([7, 64, 70]))),
+                1: bytes(8),
+                2: b"\x02hg",
+                5: bytes(4),
+            }.get(wire_type, b"")
+
+        if rng.random() < 0.1:
+            sample = sample[:rng.randrange(len(sample) + 1)]
+
+        if len(sample) >= 0x80:
+            continue
+
+        payload = bytes([0x0a, len(sample)]) + sample
+        expected = parser.parse_proto(payload).fields[0].field_repr
+        expected = expected.msg is not None
+
+        for scan_columns in scanners:
+            paths = [""]
+            scan_columns(payload, columnar._new_buffers(), 0, paths, {}, True)
+
+            assert ("1" in paths) == expected, (scan_columns, sample.hex())
+
+
+def test_export_csv() -> None:
+    sink = io.StringIO()
+
+    assert columnar.export_csv([PAYLOAD, PAYLOAD], sink) == 2 * len(ROWS)
+
+    lines = sink.getvalue().splitlines()
+
+    assert lines[0] == (
+        "record,path,field_no,wire_type,offset,length,uint,sint,float,str"
+    )
+    assert lines[1] == "0,,1,0,1,2,150,75,,"
+    assert lines[5] == "0,,4,2,19,2,,,,hg"
+    assert lines[9] == "0,4,13,0,20,1,103,-52,,"
+    assert lines[10].startswith("1,,1,0,")
+
+
+def test_export_npz() -> None:
+    sink = io.BytesIO()
+
+    assert columnar.export_npz(
+        [PAYLOAD, b"", PAYLOAD], sink, batch_rows=4
+    ) == 2 * len(ROWS)
+
+    arrays = read_npz(sink.getvalue())
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+
+    assert arrays["record"] == [0] * len(ROWS) + [2] * len(ROWS)
+    assert arrays["field_no"] == list(columns.field_no) * 2
+    assert arrays["uint"] == list(columns.uint) * 2
+    assert arrays["str_offsets"] == [0, 0, 0, 0, 0, 2, 2, 2, 2, 2] + [
+        2, 2, 2, 2, 4, 4, 4, 4, 4
+    ]
+    assert bytes(arrays["str_data"]) == b"hghg"
+    assert arrays["paths"] == ["", "2", "4"]
+    assert [arrays["paths"][i] for i in arrays["path"][:len(ROWS)]] == [
+        row[1] for row in ROWS
+    ]
+
+
+def test_to_numpy() -> None:
+    numpy = pytest.importorskip("numpy")
+    (columns, ) = columnar.iter_field_columns([PAYLOAD])
+    arrays = columns.to_numpy()
+
+    assert arrays["uint"].dtype == numpy.uint64
+    assert arrays["field_no"].tolist() == list(columns.field_no)
+
+
+def test_export_parquet(tmp_path) -> None:
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    path = tmp_path / "fields.parquet"
+
+    assert columnar.export_parquet([PAYLOAD], path) == len(ROWS)
+
+    table = pyarrow.parquet.read_table(path)
+
+    assert table.column("field_no").to_pylist() == [row[2] for row in ROWS]
+    assert table.column("str").to_pylist() == [row[9] for row in ROWS]
@@ -1,9 +1,13 @@
 import io
+import mmap
+import os
+import random
+import sys
 from typing import Union, Any
 
 import pytest
 
-from revpbuf import core
+from revpbuf import core, parser
 
 
 def test_read_varint_normal_input() -> None:
@@ -179,3 +183,250 @@ def test_base_proto_printer() -> None:
 
     with pytest.raises(NotImplementedError):
         core.BaseProtoPrinter().visit(core.FieldDescriptor(stream))
+
+
+IMPLEMENTATIONS = [
+    pytest.param(core.py_decode_varint, core.py_scan_fields, id="python"),
+    pytest.param(
+        getattr(core._speedups, "decode_varint", None),
+        getattr(core._speedups, "scan_fields", None),
+        id="c",
+        marks=pytest.mark.skipif(
+            core._speedups is None, reason="C speedups are not built"
+        )
+    ),
+]
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+@pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        (b"\x01", (1, 1)), (b"\x7f", (127, 1)), (b"\xff\x01", (255, 2)),
+        (b"\xff\xff\xff\xff\xff\xff\xff\xff\xff\x01", (2**64 - 1, 10)),
+        (b"\x96\x01\x08", (150, 2)), (b"\xff", (None, 0)), (b"", (None, 0))
+    ]
+)
+def test_decode_varint(
+    decode_varint: Any, scan_fields: Any, buffer_type: type,
+    test_input: bytes, expected: tuple
+) -> None:
+    assert decode_varint(buffer_type(test_input)) == expected
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_decode_varint_offset(decode_varint: Any, scan_fields: Any) -> None:
+    buffer = b"\x08\x96\x01\x10\x01"
+
+    assert decode_varint(buffer, 1) == (150, 3)
+    assert decode_varint(buffer, 4) == (1, 5)
+    assert decode_varint(buffer, 5) == (None, 5)
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_decode_varint_mmap(decode_varint: Any, scan_fields: Any) -> None:
+    buffer = mmap.mmap(-1, 3)
+    buffer.write(b"\x96\x01\x7f")
+
+    assert decode_varint(buffer) == (150, 2)
+    assert decode_varint(buffer, 2) == (127, 3)
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_decode_varint_wide(decode_varint: Any, scan_fields: Any) -> None:
+    # the 10th byte may carry bits beyond 64 without a continuation flag
+    assert decode_varint(b"\xff" * 9 + b"\x7f") == (2**70 - 1, 10)
+
+
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        ((b"\x08\x01", 1, core.WireType.Varint), (1, 2)),
+        (
+            (b"\x09" + b"\x00" * 8, 1, core.WireType.Fixed64),
+            (b"\x00" * 8, 9)
+        ),
+        ((b"\x0d" + b"\x00" * 4, 1, core.WireType.Fixed32), (b"\x00" * 4, 5)),
+        ((b"\x0d" + b"\x00" * 3, 1, core.WireType.Fixed32), (None, 1)),
+        ((b"\x0a\x02hg", 1, core.WireType.LengthDelimited), (b"hg", 4)),
+        ((b"\x0a\x03hg", 1, core.WireType.LengthDelimited), (None, 1)),
+        ((b"\x0a", 1, core.WireType.LengthDelimited), (None, 1)),
+    ]
+)
+def test_decode_value(test_input: tuple, expected: tuple) -> None:
+    assert core.decode_value(*test_input) == expected
+
+
+def test_decode_identifier() -> None:
+    proto_id, offset = core.decode_identifier(b"\x10\xfd\x3f", 1)
+
+    assert proto_id.field_no == 1023
+    assert proto_id.wire_type == core.WireType.Fixed32
+    assert offset == 3
+    assert core.decode_identifier(b"") == (None, 0)
+
+    with pytest.raises(ValueError):
+        core.decode_identifier(b"\x0f")
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_decode_varint_overlong(decode_varint: Any, scan_fields: Any) -> None:
+    with pytest.raises(ValueError):
+        decode_varint(b"\xff" * 10 + b"\x01")
+
+    assert core.read_varint(io.BytesIO(b"\xff" * 10 + b"\x01")) is None
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+@pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        (b"", ([], 0)),
+        (
+            b"\x08\x96\x01\x0a\x02hg\x0d\x00\x00\x80\x3f"
+            b"\x09\x00\x00\x00\x00\x00\x00\xf0\x3f",
+            ([(8, 150, 3), (10, 5, 7), (13, 8, 12), (9, 13, 21)], 21)
+        ),
+        (b"\x08\x01\x0a\x03hg", ([(8, 1, 2)], 2)),
+        (b"\x08\x01\x0d\x00", ([(8, 1, 2)], 2)),
+        (b"\x08\x01\x08", ([(8, 1, 2)], 2)),
+        (b"\x08\x01\x0b\x0c", ([(8, 1, 2)], 2)),
+        (b"\x08\x01\x0f\x00", ([(8, 1, 2)], 2)),
+        (b"\x08" + b"\xff" * 10 + b"\x01", ([], 0)),
+        (b"\x08" + b"\xff" * 9 + b"\x7f", ([(8, 2**70 - 1, 11)], 11)),
+    ]
+)
+def test_scan_fields(
+    decode_varint: Any, scan_fields: Any, buffer_type: type,
+    test_input: bytes, expected: tuple
+) -> None:
+    assert scan_fields(buffer_type(test_input)) == expected
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_scan_fields_range(decode_varint: Any, scan_fields: Any) -> None:
+    buffer = b"\x08\x01\x10\x02\x18\x03"
+
+    assert scan_fields(buffer, 2) == ([(16, 2, 4), (24, 3, 6)], 6)
+    assert scan_fields(buffer, 2, 4) == ([(16, 2, 4)], 4)
+    assert scan_fields(buffer, 0, 3) == ([(8, 1, 2)], 2)
+    assert scan_fields(buffer, 0, None) == scan_fields(buffer)
+
+
+@pytest.mark.parametrize("decode_varint,scan_fields", IMPLEMENTATIONS)
+def test_scan_fields_max_fields(decode_varint: Any, scan_fields: Any) -> None:
+    buffer = b"\x08\x01\x10\x02\x18\x03"
+
+    assert scan_fields(buffer, 0, None, 2) == ([(8, 1, 2), (16, 2, 4)], 4)
+    assert scan_fields(buffer, 2, 6, 1) == ([(16, 2, 4)], 4)
+    assert scan_fields(buffer, 0, None, 0) == ([], 0)
+    assert scan_fields(buffer, 0, None, None) == scan_fields(buffer)
+
+
+@pytest.mark.skipif(core._speedups is None, reason="C speedups are not built")
+def test_scan_fields_implementations_agree() -> None:
+    rng = random.Random(1234)
+    samples = [
+        bytes(rng.getrandbits(8) for _ in range(rng.randrange(64)))
+        for _ in range(2000)
+    ]
+    # mostly well-formed fields of every wire type
+    samples += [
+        bytes(
+            rng.choice(b"\x08\x0a\x0d\x09\x02\x80\x01\x00")
+            for _ in range(rng.randrange(64))
+        ) for _ in range(500)
+    ]
+
+    for sample in samples:
+        assert (
+            core._speedups.scan_fields(sample) ==
+            core.py_scan_fields(sample)
+        ), sample.hex()
+
+        try:
+            expected = core.py_decode_varint(sample)
+        except ValueError:
+            with pytest.raises(ValueError):
+                core._speedups.decode_varint(sample)
+        else:
+            assert core._speedups.decode_varint(sample) == expected
+
+
+DUMP_PAYLOAD = bytes.fromhex("08 96 01 12 02 08 02 12 01 ff")
+DUMP_TEXT = os.linesep.join([
+    "Field 1 - type <WireType.Varint>",
+    "\tsint: 75",
+    "\tuint: 150",
+    "Field 2 - type <WireType.LengthDelimited>",
+    "\tchunk: 08 02",
+    "\tstr: None",
+    "\tsub-msg:",
+    "\t\tField 1 - type <WireType.Varint>",
+    "\t\t\tsint: 1",
+    "\t\t\tuint: 2",
+    "Field 2 - type <WireType.LengthDelimited>",
+    "\tchunk: ff",
+    "\tstr: None",
+    "",
+])
+
+
+def test_dump_text_sink() -> None:
+    message = parser.parse_proto(DUMP_PAYLOAD)
+    sink = io.StringIO()
+    core.dump(message, sink)
+
+    assert sink.getvalue() == DUMP_TEXT
+    assert core.dumps(message) == DUMP_TEXT
+
+
+def test_dump_binary_sink() -> None:
+    sink = io.BytesIO()
+    core.dump(parser.parse_proto(DUMP_PAYLOAD), sink)
+
+    assert sink.getvalue() == DUMP_TEXT.encode()
+    # the sink is left open
+    assert not sink.closed
+
+
+def test_proto_writer_visit() -> None:
+    message = parser.parse_proto(DUMP_PAYLOAD)
+    sink = io.StringIO()
+
+    with core.ProtoWriter(sink) as writer:
+        for field in message.fields:
+            assert field.field_desc.accept(writer) is None
+            field.field_repr.accept(writer)
+
+    assert sink.getvalue() == DUMP_TEXT
+
+
+def test_dump_deep_nesting() -> None:
+    payload = b"\x08\x01"
+    levels = sys.getrecursionlimit() + 100
+
+    for _ in range(levels):
+        payload = b"\x0a" + encode_length(len(payload)) + payload
+
+    text = core.dumps(parser.parse_proto(payload, eager_depth=0))
+
+    assert text.count("sub-msg:") == levels
+
+
+def encode_length(length: int) -> bytes:
+    data = bytearray()
+
+    while length >= 0x80:
+        data.append(length & 0x7f | 0x80)
+        length >>= 7
+
+    data.append(length)
+
+    return bytes(data)
+
+
+def test_base_proto_writer() -> None:
+    with pytest.raises(NotImplementedError):
+        core.BaseProtoWriter(io.StringIO()).visit(
+            core.FieldDescriptor(io.BytesIO(b"\x08"))
+        )
@@ -0,0 +1,177 @@
+import io
+import json
+from typing import Any
+
+import pytest
+
+from revpbuf import export, parser, schema
+
+# 1: 150, 2: {1: 2, 2: 3}, 3: 1.0f, 2: ff, 4: "hg", 1: inf
+PAYLOAD = bytes.fromhex(
+    "08 96 01 12 04 08 02 10 03 1d 00 00 80 3f 12 01 ff 22 02 68 67"
+    "09 00 00 00 00 00 00 f0 7f"
+)
+EXPECTED = [
+    {"field": 1, "wire_type": 0, "uint": 150, "sint": 75},
+    {
+        "field": 2, "wire_type": 2, "str": None, "hex": "08021003",
+        "msg": [
+            {"field": 1, "wire_type": 0, "uint": 2, "sint": 1},
+            {"field": 2, "wire_type": 0, "uint": 3, "sint": -2},
+        ]
+    },
+    {
+        "field": 3, "wire_type": 5, "uint": 1065353216, "sint": 1065353216,
+        "float": 1.0, "hex": "0000803f"
+    },
+    {"field": 2, "wire_type": 2, "str": None, "hex": "ff", "msg": None},
+    {
+        "field": 4, "wire_type": 2, "str": "hg", "hex": "6867",
+        "msg": [{"field": 13, "wire_type": 0, "uint": 103, "sint": -52}]
+    },
+    {
+        "field": 1, "wire_type": 1, "uint": 0x7ff0000000000000,
+        "sint": 0x7ff0000000000000, "float": None, "hex": "000000000000f07f"
+    },
+]
+
+
+def test_to_json() -> None:
+    assert json.loads(export.to_json(parser.parse_proto(PAYLOAD))) == EXPECTED
+    assert export.to_json(None) == "null"
+    assert export.to_json(parser.MessageRepr()) == "[]"
+
+
+def test_to_json_interpretations() -> None:
+    message = parser.parse_proto(PAYLOAD)
+    result = json.loads(
+        export.to_json(message, interpretations=("hex", ), sub_messages=False)
+    )
+
+    assert result[0] == {"field": 1, "wire_type": 0}
+    assert result[1] == {"field": 2, "wire_type": 2, "hex": "08021003"}
+    assert result[2] == {"field": 3, "wire_type": 5, "hex": "0000803f"}
+
+    with pytest.raises(ValueError):
+        export.to_json(message, interpretations=("text", ))
+
+
+def test_to_json_escapes_strings() -> None:
+    message = parser.parse_proto(b'\x0a\x05a"\\\n\t')
+
+    assert json.loads(export.to_json(message))[0]["str"] == 'a"\\\n\t'
+
+
+def test_to_json_schema_reprs() -> None:
+    message = schema.parse_hinted(PAYLOAD[:3], {1: "uint"})
+
+    assert json.loads(export.to_json(message)) == [
+        {"field": 1, "wire_type": 0, "uint": 150}
+    ]
+
+    message = schema.parse_hinted(PAYLOAD[3:9], {2: {1: "uint"}})
+
+    assert json.loads(export.to_json(message)) == [
+        {
+            "field": 2, "wire_type": 2, "sub-msg": [
+                {"field": 1, "wire_type": 0, "uint": 2},
+                {"field": 2, "wire_type": 0, "uint": 3, "sint": -2},
+            ]
+        }
+    ]
+    assert json.loads(
+        export.to_json(message, sub_messages=False)
+    ) == [{"field": 2, "wire_type": 2}]
+
+
+@pytest.mark.parametrize("value", ["0000c07f", "0000807f", "000080ff"])
+def test_to_json_schema_non_finite_floats(value: str) -> None:
+    message = schema.parse_hinted(bytes.fromhex("0d" + value), {1: "float"})
+    output = export.to_json(message)
+
+    assert output == '[{"field":1,"wire_type":5,"float":null}]'
+    assert json.loads(output) == [{"field": 1, "wire_type": 5, "float": None}]
+
+
+@pytest.mark.parametrize("sink_type", [io.StringIO, io.BytesIO])
+def test_dump_ndjson(sink_type: Any) -> None:
+    sink = sink_type()
+    messages = [parser.parse_proto(PAYLOAD), None, parser.parse_proto(b"")]
+
+    assert export.dump_ndjson(messages, sink) == 3
+
+    output = sink.getvalue()
+    lines = (output if isinstance(output, str) else output.decode()).split(
+        "\n"
+    )
+
+    assert [json.loads(line) for line in lines[:-1]] == [
+        EXPECTED, None, None
+    ]
+    assert lines[-1] == ""
+
+
+def test_dump_json_binary_sink() -> None:
+    sink = io.BytesIO()
+    export.dump_json(parser.parse_proto(PAYLOAD), sink)
+
+    assert json.loads(sink.getvalue()) == EXPECTED
+    assert not sink.closed
+
+
+def test_dump_events() -> None:
+    sink = io.StringIO()
+    events = parser.iter_events(PAYLOAD[:9], lambda event: True)
+
+    assert export.dump_events(events, sink, interpretations=("uint", )) == 4
+    assert [json.loads(line) for line in sink.getvalue().splitlines()] == [
+        {
+            "path": [], "field": 1, "wire_type": 0, "offset": 1, "length": 2,
+            "uint": 150
+        },
+        {"path": [], "field": 2, "wire_type": 2, "offset": 5, "length": 4},
+        {
+            "path": [2], "field": 1, "wire_type": 0, "offset": 6,
+            "length": 1, "uint": 2
+        },
+        {
+            "path": [2], "field": 2, "wire_type": 0, "offset": 8,
+            "length": 1, "uint": 3
+        },
+    ]
+
+
+def test_json_writer_visit() -> None:
+    message = parser.parse_proto(PAYLOAD)
+    sink = io.StringIO()
+
+    with export.JsonWriter(sink) as writer:
+        for field in message.fields:
+            field.field_desc.accept(writer)
+            sink.write("\n")
+            field.field_repr.accept(writer)
+            sink.write("\n")
+
+    objects = [json.loads(line) for line in sink.getvalue().splitlines()]
+
+    assert objects[::2] == [
+        {"field": item["field"], "wire_type": item["wire_type"]}
+        for item in EXPECTED
+    ]
+    assert objects[1::2] == [
+        {
+            key: value for key, value in item.items()
+            if key not in ("field", "wire_type")
+        } for item in EXPECTED
+    ]
+
+
+def test_to_json_large_message() -> None:
+    # written out in several pieces
+    message = parser.parse_proto(bytes.fromhex("0a 02 08 01") * 5000)
+    result = json.loads(export.to_json(message))
+
+    assert len(result) == 5000
+    assert result[-1]["msg"] == [
+        {"field": 1, "wire_type": 0, "uint": 1, "sint": -1}
+    ]
@@ -1,9 +1,14 @@
 import io
-from typing import Sequence, Any
+import mmap
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Optional, Sequence
 
 import pytest
 
-from revpbuf import parser
+from revpbuf import core, parser
 
 
 @pytest.mark.parametrize(
@@ -180,3 +185,837 @@ def test_message_get_fields() -> None:
     assert repr(message_fields[0].field_repr) == repr(
         expected_fields[0].field_repr
     )
+
+
+@pytest.mark.parametrize(
+    "test_input", [b"\x08", b"\x0a\x05ab", b"\x0d\x00", b"\x0b", b"\x08\x96"]
+)
+def test_parse_proto_truncated_input(test_input: bytes) -> None:
+    assert parser.parse_proto(test_input) is None
+
+
+@pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+def test_parse_proto_buffer_types(buffer_type: type) -> None:
+    message = parser.parse_proto(buffer_type(bytes.fromhex("0896011202080a")))
+
+    assert [f.field_desc.field_no for f in message.fields] == [1, 2]
+    assert message.fields[0].field_repr.int == 150
+    assert message.fields[1].field_repr.chunk == b"\x08\x0a"
+    assert message.fields[1].field_repr.msg.fields[0].field_repr.int == 10
+
+
+NESTED_PAYLOAD = bytes.fromhex("0a 06 0a 04 0a 02 08 01")
+
+
+@pytest.mark.parametrize(
+    "eager_depth,expected_calls", [(None, 3), (0, 0), (1, 1), (2, 2), (5, 3)]
+)
+def test_parse_proto_eager_depth(
+    eager_depth: Any, expected_calls: int
+) -> None:
+    stats = parser.speculation_stats
+    stats.reset()
+    message = parser.parse_proto(NESTED_PAYLOAD, eager_depth)
+
+    assert stats.attempted == expected_calls
+
+    chunk = message.fields[0].field_repr
+    inner = chunk.msg.fields[0].field_repr.msg.fields[0].field_repr
+
+    assert inner.msg.fields[0].field_repr.int == 1
+    assert stats.attempted == 3
+    assert inner.msg is inner.msg
+    assert stats.attempted == 3
+
+
+def test_chunk_lazy_str() -> None:
+    chunk = parser.ChunkRepr(b"hg", 0)
+
+    assert chunk.str == "hg"
+    assert chunk.str is chunk.str
+    assert parser.ChunkRepr(b"\xff", 0).str is None
+
+
+def test_parse_proto_zero_copy() -> None:
+    payload = bytes.fromhex("0a 07 0a 05 12 03 61 62 63 10 01")
+    message = parser.parse_proto(payload, zero_copy=True)
+    outer = message.fields[0].field_repr
+    inner = outer.msg.fields[0].field_repr.msg.fields[0].field_repr
+
+    for chunk in (outer, inner):
+        assert isinstance(chunk.chunk, memoryview)
+        assert chunk.chunk.obj is payload
+
+    assert inner.chunk == b"abc"
+    assert inner.tobytes() == b"abc"
+    assert inner.str == "abc"
+    assert message.fields[1].field_repr.int == 1
+
+
+def test_parse_proto_copy_by_default() -> None:
+    message = parser.parse_proto(bytes.fromhex("0a 02 68 67"))
+    chunk = message.fields[0].field_repr
+
+    assert isinstance(chunk.chunk, bytes)
+    assert chunk.tobytes() == b"hg"
+
+
+def test_parse_proto_defers_large_chunk_copies() -> None:
+    inner = b"\x12\x04leaf" + b"\x08\x01" * 200
+    payload = b"\x0a" + _encode_length(len(inner)) + inner
+    payload = b"\x0a" + _encode_length(len(payload)) + payload
+
+    for eager_depth in (None, 0):
+        message = parser.parse_proto(payload, eager_depth)
+        outer = message.fields[0].field_repr
+        middle = outer.msg.fields[0].field_repr
+
+        # nothing is copied until the chunks are accessed
+        for chunk in (outer, middle):
+            assert chunk._chunk_repr.__class__ is tuple
+            assert chunk._chunk_repr[0] is payload
+
+        assert middle.msg.find(2).field_repr.str == "leaf"
+        assert middle.chunk == inner
+        assert isinstance(middle.chunk, bytes)
+        assert outer.tobytes() == payload[3:]
+        assert repr(message) == repr(parser.parse_proto(bytearray(payload)))
+
+
+def test_parse_proto_copies_mutable_payloads() -> None:
+    inner = b"\x08\x01" * 200
+    payload = bytearray(b"\x0a" + _encode_length(len(inner)) + inner)
+    message = parser.parse_proto(payload)
+    payload[4] = 2
+
+    assert message.fields[0].field_repr.chunk == inner
+
+
+EVENTS_PAYLOAD = bytes.fromhex(
+    "08 96 01 12 07 0a 05 12 03 61 62 63 1d 00 00 20 3e"
+)
+
+
+def test_iter_events_flat() -> None:
+    events = list(parser.iter_events(EVENTS_PAYLOAD))
+
+    assert [(e.path, e.field_no, e.wire_type) for e in events] == [
+        ((), 1, parser.WireType.Varint),
+        ((), 2, parser.WireType.LengthDelimited),
+        ((), 3, parser.WireType.Fixed32),
+    ]
+    assert events[0].value == 150
+    assert (events[0].offset, events[0].length) == (1, 2)
+    assert (events[1].offset, events[1].length) == (5, 7)
+    assert events[1].value == EVENTS_PAYLOAD[5:12]
+    assert events[2].value == b"\x00\x00\x20\x3e"
+
+
+def test_iter_events_descend() -> None:
+    events = list(
+        parser.iter_events(EVENTS_PAYLOAD, lambda e: e.path != (2, 1))
+    )
+
+    assert [(e.path, e.field_no, e.offset, e.length) for e in events] == [
+        ((), 1, 1, 2),
+        ((), 2, 5, 7),
+        ((2, ), 1, 7, 5),
+        ((2, 1), 2, 9, 3),
+        ((), 3, 13, 4),
+    ]
+    assert events[3].value == b"abc"
+
+
+@pytest.mark.parametrize(
+    "test_input", [
+        b"\x08", b"\x0a\x05ab", b"\x0f", b"\x0a\x02\x08\x96", b"\x0b",
+        b"\x0c"
+    ]
+)
+def test_iter_events_malformed(test_input: bytes) -> None:
+    with pytest.raises(ValueError):
+        list(parser.iter_events(test_input, lambda e: True))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_parse_file(tmp_path: Any, use_mmap: bool) -> None:
+    path = tmp_path / "message.bin"
+    path.write_bytes(bytes.fromhex("08 96 01 12 02 68 67"))
+    message = parser.parse_file(path, use_mmap=use_mmap)
+    chunk = message.fields[1].field_repr
+
+    assert message.fields[0].field_repr.int == 150
+    assert chunk.str == "hg"
+    assert isinstance(chunk.chunk, memoryview if use_mmap else bytes)
+
+
+def test_parse_file_empty(tmp_path: Any) -> None:
+    path = tmp_path / "message.bin"
+    path.write_bytes(b"")
+
+    assert parser.parse_file(path) is None
+
+
+def test_parse_proto_mmap() -> None:
+    payload = mmap.mmap(-1, 4)
+    payload.write(bytes.fromhex("0a 02 68 67"))
+    message = parser.parse_proto(payload)
+    events = list(parser.iter_events(payload))
+
+    assert isinstance(message.fields[0].field_repr.chunk, memoryview)
+    assert message.fields[0].field_repr.tobytes() == b"hg"
+    assert events[0].value == b"hg"
+
+
+def test_parsed_objects_are_slotted() -> None:
+    payload = bytes.fromhex("08 01 0d 00 00 00 00 09 00 00 00 00 00 00 00 00")
+    message = parser.parse_proto(payload + bytes.fromhex("12 02 68 67"))
+    objects = [message]
+
+    for field in message.fields:
+        objects += [field, field.field_desc, field.field_repr]
+
+    assert not any(hasattr(obj, "__dict__") for obj in objects)
+
+
+def test_field_descriptors_are_shared() -> None:
+    message = parser.parse_proto(bytes.fromhex("08 01 08 02 10 01"))
+    descriptors = [field.field_desc for field in message.fields]
+
+    assert descriptors[0] is descriptors[1]
+    assert descriptors[0] is not descriptors[2]
+
+
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        (b"", []), (b"\x01\x02\x7f", [1, 2, 127]),
+        (b"\x96\x01\x01\xff\xff\xff\xff\x0f", [150, 1, 2**32 - 1]),
+        (b"\x96", None), (b"\xff" * 10 + b"\x01", None)
+    ]
+)
+def test_decode_packed_varints(test_input: bytes, expected: Any) -> None:
+    chunk = parser.ChunkRepr(test_input, 0)
+
+    assert parser.decode_packed_varints(test_input) == expected
+    assert parser.py_decode_packed_varints(test_input) == expected
+    assert chunk.packed_varints() == expected
+
+
+def test_decode_packed_varints_zigzag() -> None:
+    chunk = parser.ChunkRepr(memoryview(b"\x01\x02\xfe\xff\xff\xff\x0f"), 0)
+
+    assert chunk.packed_varints(zigzag=True) == [-1, 1, 2147483647]
+
+
+@pytest.mark.skipif(core._speedups is None, reason="C speedups are not built")
+def test_decode_packed_varints_implementations_agree() -> None:
+    rng = random.Random(1234)
+    samples = [
+        bytes(rng.getrandbits(8) for _ in range(rng.randrange(32)))
+        for _ in range(2000)
+    ]
+    # long and wide varints
+    samples += [
+        bytes([0xff] * rng.randrange(12) + [rng.getrandbits(7)]) * 2
+        for _ in range(200)
+    ]
+
+    for sample in samples:
+        for zigzag in (False, True):
+            assert core._speedups.decode_packed_varints(
+                sample, zigzag=zigzag
+            ) == parser.py_decode_packed_varints(sample, zigzag), sample.hex()
+
+
+@pytest.mark.parametrize(
+    "test_input,wire_type,expected", [
+        (
+            b"\x00\x00\x20\x3e\x00\x00\x20\xbe", parser.WireType.Fixed32, {
+                "sint": [1042284544, -1105199104],
+                "uint": [1042284544, 3189768192],
+                "float": [0.15625, -0.15625]
+            }
+        ),
+        (
+            b"\x00\x00\x00\x00\x00\x00\x00\xc0", parser.WireType.Fixed64, {
+                "sint": [-4611686018427387904],
+                "uint": [13835058055282163712],
+                "float": [-2.0]
+            }
+        ),
+    ]
+)
+def test_decode_packed_fixed(
+    test_input: bytes, wire_type: parser.WireType, expected: dict
+) -> None:
+    chunk = parser.ChunkRepr(test_input, 0)
+
+    for kind, values in expected.items():
+        assert list(
+            parser.decode_packed_fixed(test_input, wire_type, kind)
+        ) == values
+
+    assert list(chunk.packed_fixed32("float")) == list(
+        parser.decode_packed_fixed(
+            test_input, parser.WireType.Fixed32, "float"
+        )
+    )
+    assert list(chunk.packed_fixed64()) == list(
+        parser.decode_packed_fixed(test_input, parser.WireType.Fixed64)
+    )
+
+
+def test_decode_packed_fixed_invalid_length() -> None:
+    chunk = parser.ChunkRepr(b"\x00" * 6, 0)
+
+    assert chunk.packed_fixed32() is None
+    assert chunk.packed_fixed64() is None
+
+
+def test_fixed_raw_value() -> None:
+    fixed32 = parser.Fixed32Repr(memoryview(b"\x00\x00\x20\x3e"))
+
+    assert fixed32.value == b"\x00\x00\x20\x3e"
+    fixed_checker(fixed32, (1042284544, 1042284544, 0.15625))
+
+
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        (b"", ""), (b"hg", "hg"), (b"a b\tc\r\n\x0b\x0c~", "a b\tc\r\n\x0b\x0c~"),
+        (b"h" * 100 + b"\x00", None), (b"\x7f", None), (b"\xff\xff", None),
+        ("привет".encode(), None), (memoryview(b"hg"), "hg")
+    ]
+)
+def test_decode_printable(test_input: Any, expected: Any) -> None:
+    assert parser.decode_printable(test_input) == expected
+    assert parser.is_printable(test_input) == (expected is not None)
+    assert parser.ChunkRepr(test_input, 0).str == expected
+
+
+def test_decode_printable_rejects_views_without_copying() -> None:
+    blob = memoryview(b"\xff" * (4 << 20))
+    tracemalloc.start()
+
+    try:
+        assert parser.decode_printable(blob) is None
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 1 << 20
+
+
+def test_decode_printable_max_length(monkeypatch: Any) -> None:
+    assert parser.decode_printable(b"hg", 2) == "hg"
+    assert parser.decode_printable(b"hgh", 2) is None
+    assert not parser.is_printable(b"hgh", 2)
+
+    monkeypatch.setattr(parser.ChunkRepr, "str_max_length", 2)
+
+    assert parser.ChunkRepr(b"hg", 0).str == "hg"
+    assert parser.ChunkRepr(b"hgh", 0).str is None
+
+
+@pytest.mark.parametrize(
+    "test_input,expected", [
+        (b"\x08\x01", True), (bytes.fromhex("0a 02 68 67 10 01"), True),
+        (b"\x0d\x00\x00\x20\x3e", True), (b"\x08\x01" * 10 + b"\xff", True),
+        (b"", False), (b"\x00\x01", False), (b"\x0b", False),
+        (b"\x0c", False), (b"\x0e", False), (b"\xc0\xb9\x09\x01", False),
+        (b"\x08", False), (b"\x0a\x05ab", False), (b"\x0d\x00\x00", False),
+        (b"\xff" * 11, False), (b"\xf8\xff\xff\xff\x1f\x01", False),
+    ]
+)
+def test_looks_like_message(test_input: bytes, expected: bool) -> None:
+    assert parser.looks_like_message(test_input) == expected
+
+
+def test_speculation_stats() -> None:
+    parser.speculation_stats.reset()
+    # the first two chunks pass the pre-check, but only the first one is
+    # a valid message, the rest are rejected up front
+    payload = bytes.fromhex(
+        "0a 02 08 01 0a 09 08 01 08 01 08 01 08 01 ff 0a 02 ff ff 0a 00"
+    )
+    message = parser.parse_proto(payload)
+    stats = parser.speculation_stats
+
+    assert (stats.attempted, stats.skipped, stats.failed) == (2, 2, 1)
+    assert message.fields[0].field_repr.msg is not None
+    assert all(f.field_repr.msg is None for f in message.fields[1:])
+    assert repr(stats) == "SpeculationStats(attempted=2, skipped=2, failed=1)"
+
+    stats.reset()
+
+    assert (stats.attempted, stats.skipped, stats.failed) == (0, 0, 0)
+
+
+@pytest.mark.parametrize("eager_depth", [None, 0])
+def test_parse_limits_max_depth(eager_depth: Any) -> None:
+    limits = parser.ParseLimits(max_depth=1)
+    message = parser.parse_proto(NESTED_PAYLOAD, eager_depth, limits=limits)
+    outer = message.fields[0].field_repr
+    inner = outer.msg.fields[0].field_repr
+
+    assert inner.chunk == b"\x0a\x02\x08\x01"
+    assert inner.msg is None
+
+    if eager_depth is None:
+        assert message.truncated == "max_depth"
+        assert outer.msg.truncated == "max_depth"
+    else:
+        assert message.truncated is None
+        assert outer.msg.truncated == "max_depth"
+
+
+def test_parse_limits_max_depth_zero() -> None:
+    message = parser.parse_proto(
+        NESTED_PAYLOAD, limits=parser.ParseLimits(max_depth=0)
+    )
+
+    assert message.fields[0].field_repr.msg is None
+    assert message.truncated == "max_depth"
+
+
+@pytest.mark.parametrize("payload", [b"\x0a\x05hello", b"\x0a\x02\xff\xff"])
+def test_parse_limits_max_depth_strings_not_truncated(payload: bytes) -> None:
+    message = parser.parse_proto(
+        payload, limits=parser.ParseLimits(max_depth=0)
+    )
+
+    assert message.fields[0].field_repr.msg is None
+    assert message.truncated is None
+
+
+def test_parse_limits_max_fields() -> None:
+    limits = parser.ParseLimits(max_fields=3)
+    message = parser.parse_proto(b"\x08\x01" * 5, limits=limits)
+
+    assert len(message.fields) == 3
+    assert message.truncated == "max_fields"
+
+    # sub-message fields count as well
+    message = parser.parse_proto(NESTED_PAYLOAD + b"\x10\x01", limits=limits)
+    inner = message.fields[0].field_repr.msg.fields[0].field_repr.msg
+
+    assert len(message.fields) == 1
+    assert len(inner.fields) == 1
+    assert inner.fields[0].field_repr.msg.fields == []
+    assert message.truncated == "max_fields"
+
+
+def test_parse_limits_max_bytes() -> None:
+    limits = parser.ParseLimits(max_bytes=5)
+    message = parser.parse_proto(
+        bytes.fromhex("0a 02 68 67 08 01 0a 02 68 67 0a 02 68 67"),
+        limits=limits
+    )
+
+    assert len(message.fields) == 3
+    assert message.truncated == "max_bytes"
+
+
+def test_parse_limits_time_budget() -> None:
+    limits = parser.ParseLimits(time_budget=-1)
+    message = parser.parse_proto(b"\x08\x01" * 5, limits=limits)
+
+    assert message.fields == []
+    assert message.truncated == "time_budget"
+
+
+@pytest.mark.parametrize("limits", [
+    parser.ParseLimits(time_budget=0.001), parser.ParseLimits(max_fields=10)
+])
+def test_parse_limits_bound_large_payloads(limits: parser.ParseLimits) -> None:
+    # the payload is not scanned as a whole ahead of the budget
+    payload = b"\x08\x01" * 3_000_000
+    start = time.perf_counter()
+    message = parser.parse_proto(payload, limits=limits)
+
+    assert time.perf_counter() - start < 0.1
+    assert message.truncated in ("time_budget", "max_fields")
+
+
+def test_parse_limits_scan_batches() -> None:
+    # messages spanning several scan batches parse as without limits
+    limits = parser.ParseLimits(max_fields=10**6)
+    payload = _nest(b"\x08\x01" * 3000, 1)
+    message = parser.parse_proto(payload, limits=limits)
+
+    assert message.truncated is None
+    assert repr(message) == repr(parser.parse_proto(payload))
+    assert parser.parse_proto(payload + b"\x08", limits=limits) is None
+
+
+def test_parse_limits_not_reached() -> None:
+    limits = parser.ParseLimits(10, 10, 100, 10.0)
+    message = parser.parse_proto(NESTED_PAYLOAD, limits=limits)
+
+    assert message.truncated is None
+    assert repr(message) == repr(parser.parse_proto(NESTED_PAYLOAD))
+
+
+def _nest(payload: bytes, levels: int) -> bytes:
+    for _ in range(levels):
+        length = _encode_length(len(payload))
+        payload = b"\x0a" + length + payload + b"\x10\x02"
+
+    return payload
+
+
+def _encode_length(length: int) -> bytes:
+    data = bytearray()
+
+    while length >= 0x80:
+        data.append(length & 0x7f | 0x80)
+        length >>= 7
+
+    data.append(length)
+
+    return bytes(data)
+
+
+def test_parse_proto_deep_nesting() -> None:
+    levels = sys.getrecursionlimit() * 2
+    message = parser.parse_proto(_nest(b"\x08\x01", levels))
+    depth = 0
+
+    while len(message.fields) == 2:
+        assert message.fields[1].field_repr.int == 2
+        message = message.fields[0].field_repr.msg
+        depth += 1
+
+    assert depth == levels
+    assert message.fields[0].field_repr.int == 1
+
+
+def test_parse_proto_malformed_sub_message_siblings() -> None:
+    # the innermost chunk passes the pre-check but is truncated
+    message = parser.parse_proto(_nest(b"\x08\x01\x0a\x05", 2))
+    inner = message.fields[0].field_repr.msg
+
+    assert inner.fields[1].field_repr.int == 2
+    assert inner.fields[0].field_repr.msg is None
+    assert inner.fields[0].field_repr.tobytes() == b"\x08\x01\x0a\x05"
+    assert message.fields[1].field_repr.int == 2
+
+
+# 1: 1, 2: {4: {3: "a"}, 4: {3: "b", 3: "c"}}, 2: {4: {3: "d"}}, 1: 2
+PATH_PAYLOAD = bytes.fromhex(
+    "08 01 12 0d 22 03 1a 01 61 22 06 1a 01 62 1a 01 63"
+    "12 05 22 03 1a 01 64 08 02"
+)
+
+
+def test_message_get_all() -> None:
+    message = parser.parse_proto(PATH_PAYLOAD)
+
+    assert [field.field_repr.int for field in message.get_all(1)] == [1, 2]
+    assert len(message.get_all(2)) == 2
+    assert list(message.get_all(3)) == []
+    assert message.get(1).field_repr.int == 2
+    assert message.get(3) is None
+
+
+def test_message_get_all_after_add_field() -> None:
+    message = parser.parse_proto(PATH_PAYLOAD)
+
+    assert len(message.get_all(1)) == 2
+
+    message.add_field(message.fields[0])
+
+    assert len(message.get_all(1)) == 3
+
+
+@pytest.mark.parametrize("path", ["2.4.3", (2, 4, 3), [2, 4, 3]])
+def test_message_find(path: Any) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD)
+
+    assert message.find(path).field_repr.str == "a"
+    assert [
+        field.field_repr.str for field in message.find_all(path)
+    ] == ["a", "b", "c", "d"]
+
+
+def test_message_find_missing() -> None:
+    message = parser.parse_proto(PATH_PAYLOAD)
+
+    assert message.find("2.4.5") is None
+    assert message.find("1.4") is None
+    assert message.find_all("7") == []
+    assert message.find(1).field_repr.int == 1
+
+    with pytest.raises(ValueError):
+        message.find("2.x")
+
+    with pytest.raises(ValueError):
+        message.find([])
+
+
+def test_message_find_parses_only_path() -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, eager_depth=0)
+    parser.speculation_stats.reset()
+
+    assert message.find("2.4.3").field_repr.str == "a"
+    # the first field 2 and its first field 4
+    assert parser.speculation_stats.attempted == 2
+
+    message.find_all("2.4.3")
+
+    # the remaining field 4 of the first field 2 and the second field 2
+    # with its field 4
+    assert parser.speculation_stats.attempted == 5
+
+
+@pytest.mark.parametrize("include", [{1}, [1], {1: None}, {1: True}])
+def test_parse_proto_include_fields(include: Any) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, include=include)
+
+    assert [field.field_repr.int for field in message.fields] == [1, 2]
+
+
+def test_parse_proto_include_nested() -> None:
+    parser.speculation_stats.reset()
+    message = parser.parse_proto(PATH_PAYLOAD, include={2: {4: {3}}})
+
+    assert [field.field_desc.field_no for field in message.fields] == [2, 2]
+    assert [
+        field.field_repr.str for field in message.find_all("2.4.3")
+    ] == ["a", "b", "c", "d"]
+    # chunks of the innermost field 3 are not parsed as sub-messages
+    assert parser.speculation_stats.attempted == 5
+
+
+def test_parse_proto_include_skips_excluded() -> None:
+    parser.speculation_stats.reset()
+    message = parser.parse_proto(PATH_PAYLOAD, include={1: None, 2: {5}})
+
+    assert len(message.fields) == 4
+    assert message.find("2.4") is None
+    assert all(
+        not field.field_repr.msg.fields for field in message.get_all(2)
+    )
+    assert parser.speculation_stats.attempted == 2
+
+
+def test_parse_proto_include_lazy() -> None:
+    message = parser.parse_proto(
+        PATH_PAYLOAD, eager_depth=0, include={2: {4: None}}
+    )
+    inner = message.fields[0].field_repr.msg
+
+    # projected sub-messages are parsed up front, the rest stays lazy
+    assert message.fields[0].field_repr._message_repr is inner
+    assert inner.fields[0].field_repr._message_repr is parser._UNSET
+    assert message.find("2.4.3").field_repr.str == "a"
+
+
+def test_parse_proto_include_predicate() -> None:
+    paths = []
+
+    def include(path: tuple) -> bool:
+        paths.append(path)
+
+        return path[0] == 2 and path[1:2] != (4, )
+
+    message = parser.parse_proto(PATH_PAYLOAD, include=include)
+
+    assert [field.field_desc.field_no for field in message.fields] == [2, 2]
+    assert message.find("2.4") is None
+    assert paths == [(1, ), (2, ), (2, 4), (2, 4), (2, ), (2, 4), (1, )]
+
+
+def test_parse_proto_include_nothing() -> None:
+    assert parser.parse_proto(PATH_PAYLOAD, include=()).fields == []
+    assert parser.parse_proto(b"\x08", include=()) is None
+
+
+@pytest.fixture
+def parse_cache() -> parser.ParseCache:
+    return parser.ParseCache(min_size=0)
+
+
+def test_parse_cache_hit(parse_cache: parser.ParseCache) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, cache=parse_cache)
+
+    assert parser.parse_proto(PATH_PAYLOAD, cache=parse_cache) is message
+    assert parser.parse_proto(
+        bytes(PATH_PAYLOAD), cache=parse_cache
+    ) is message
+    assert parse_cache.hits == 2
+    assert parse_cache.get(PATH_PAYLOAD) is message
+    assert message.frozen
+    assert message.find("2.4.3").field_repr.str == "a"
+    # other calls are not affected
+    assert not parser.parse_proto(PATH_PAYLOAD).frozen
+
+
+def test_parse_cache_keys_options(parse_cache: parser.ParseCache) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, cache=parse_cache)
+    lazy = parser.parse_proto(PATH_PAYLOAD, eager_depth=0, cache=parse_cache)
+    limits = parser.ParseLimits(max_fields=2)
+    limited = parser.parse_proto(
+        PATH_PAYLOAD, limits=limits, cache=parse_cache
+    )
+
+    assert lazy is not message
+    assert lazy.fields[1].field_repr._message_repr is parser._UNSET
+    assert limited.truncated == "max_fields"
+    assert parser.parse_proto(
+        PATH_PAYLOAD, eager_depth=0, cache=parse_cache
+    ) is lazy
+    assert parser.parse_proto(
+        PATH_PAYLOAD, limits=limits, cache=parse_cache
+    ) is limited
+
+
+def test_parse_cache_skips_time_budget(
+    parse_cache: parser.ParseCache
+) -> None:
+    limits = parser.ParseLimits(time_budget=-1)
+    message = parser.parse_proto(
+        PATH_PAYLOAD, limits=limits, cache=parse_cache
+    )
+
+    assert message.truncated == "time_budget"
+    assert message.frozen
+    assert len(parse_cache) == 0
+
+
+def test_parse_cache_shares_sub_messages(
+    parse_cache: parser.ParseCache
+) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, cache=parse_cache)
+    hits = parse_cache.hits
+    # 3: {4: {3: "a"}, 4: {3: "b", 3: "c"}}
+    other = parser.parse_proto(
+        bytes.fromhex("1a 0d") + PATH_PAYLOAD[4:17], cache=parse_cache
+    )
+
+    assert parse_cache.hits == hits + 1
+    assert other.fields[0].field_repr.msg is message.fields[1].field_repr.msg
+    assert other.fields[0].field_repr.msg.frozen
+
+
+def test_parse_cache_frozen_messages(parse_cache: parser.ParseCache) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, cache=parse_cache)
+    inner = message.find("2.4").field_repr.msg
+
+    for frozen in (message, inner):
+        with pytest.raises(TypeError):
+            frozen.add_field(message.fields[0])
+
+        with pytest.raises(TypeError):
+            frozen.truncated = "max_fields"
+
+    assert isinstance(message.fields, tuple)
+    assert len(message.get_all(1)) == 2
+
+
+@pytest.mark.parametrize("limits", [None, parser.ParseLimits(max_depth=8)])
+def test_parse_cache_lazy_sub_messages(
+    parse_cache: parser.ParseCache, limits: Optional[parser.ParseLimits]
+) -> None:
+    message = parser.parse_proto(
+        PATH_PAYLOAD, eager_depth=0, limits=limits, cache=parse_cache
+    )
+    chunk = message.fields[1].field_repr
+
+    assert chunk._message_repr is parser._UNSET
+    assert chunk.msg.frozen
+    assert chunk.msg.fields[0].field_repr.msg.frozen
+
+    if limits is None:
+        # lazily parsed sub-messages are cached as well
+        assert chunk.msg is parse_cache.get(chunk.chunk, 0)
+
+
+def test_parse_cache_malformed(parse_cache: parser.ParseCache) -> None:
+    assert parser.parse_proto(b"\x08\x96", cache=parse_cache) is None
+    assert len(parse_cache) == 1
+    assert parser.parse_proto(b"\x08\x96", cache=parse_cache) is None
+    assert parse_cache.hits == 1
+
+
+@pytest.mark.parametrize("options", [{"zero_copy": True}, {"include": {1}}])
+def test_parse_cache_bypass(
+    parse_cache: parser.ParseCache, options: Dict[str, Any]
+) -> None:
+    message = parser.parse_proto(PATH_PAYLOAD, cache=parse_cache, **options)
+
+    assert not message.frozen
+    assert len(parse_cache) == 0
+
+
+def test_parse_cache_skips_mutable_buffers(
+    parse_cache: parser.ParseCache
+) -> None:
+    for payload in (bytearray(PATH_PAYLOAD), memoryview(PATH_PAYLOAD)):
+        assert not parser.parse_proto(payload, cache=parse_cache).frozen
+
+    assert len(parse_cache) == 0
+
+
+def test_parse_cache_eviction() -> None:
+    payloads = [bytes([0x08, value]) * 16 for value in range(4)]
+    messages = [parser.parse_proto(payload) for payload in payloads]
+    size = parser._CACHE_ENTRY_SIZE + parser._CACHE_FIELD_SIZE * 16
+    cache = parser.ParseCache(max_bytes=3 * size)
+
+    for payload, message in zip(payloads, messages):
+        cache.put(payload, message)
+        # the first payload is the most recently used one
+        assert cache.get(payloads[0]) is messages[0]
+
+    assert len(cache) == 3
+    assert cache.size == 3 * size
+    assert cache.evictions == 1
+    assert cache.get(payloads[1]) is parser._UNSET
+
+    cache.put(b"\x08\x01" * 4096, parser.parse_proto(b"\x08\x01" * 4096))
+
+    # entries larger than the cache are not stored
+    assert len(cache) == 3
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.size == 0
+    assert repr(cache) == (
+        "ParseCache(entries=0, size=0, hits=4, misses=1, evictions=1)"
+    )
+
+
+def test_parse_cache_charges_sub_messages() -> None:
+    # a single chunk of nested varints
+    payload = _nest(b"\x08\x01" * 1000, 1)
+    cache = parser.ParseCache(min_size=0)
+    message = parser.parse_proto(payload, cache=cache)
+    inner = message.fields[0].field_repr.msg
+    size = parser._CACHE_ENTRY_SIZE + parser._retained_size(message)
+
+    assert size > parser._CACHE_FIELD_SIZE * 1000
+    assert cache.size == size + parser._CACHE_ENTRY_SIZE + (
+        parser._retained_size(inner)
+    )
+
+    cache.clear()
+    cache.put(payload, message)
+
+    assert cache.size == size
+
+    # the whole tree is too large, so it is not held through its parent
+    cache = parser.ParseCache(max_bytes=size - 1, min_size=0)
+    parser.parse_proto(payload, cache=cache)
+
+    assert cache.get(payload) is parser._UNSET
+    assert cache.size <= size - 1
+
+
+def test_parse_cache_min_size() -> None:
+    cache = parser.ParseCache(min_size=8)
+    cache.put(b"\x08\x01", None)
+
+    assert len(cache) == 0
+    assert cache.get(b"\x08\x01") is parser._UNSET
+    assert cache.misses == 0
@@ -0,0 +1,189 @@
+import io
+import pathlib
+
+import pytest
+
+from revpbuf import core, parser, reader
+
+RECORDS = (
+    bytes.fromhex("08 96 01"),
+    bytes.fromhex("12 02 68 67"),
+    bytes.fromhex("0a 80 01") + b"h" * 128,
+)
+
+
+def delimited(*records: bytes) -> bytes:
+    result = bytearray()
+
+    for record in records:
+        length = len(record)
+
+        while length > 0x7f:
+            result.append(length & 0x7f | 0x80)
+            length >>= 7
+
+        result.append(length)
+        result += record
+
+    return bytes(result)
+
+
+def check_records(messages: list) -> None:
+    assert len(messages) == len(RECORDS)
+    assert messages[0].fields[0].field_repr.int == 150
+    assert messages[1].fields[0].field_repr.str == "hg"
+    assert messages[2].fields[0].field_repr.str == "h" * 128
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 5, 1024])
+def test_read_delimited_stream(read_size: int) -> None:
+    stream = io.BytesIO(delimited(*RECORDS))
+
+    check_records(list(reader.read_delimited(stream, read_size=read_size)))
+
+
+def test_read_delimited_path(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "records.bin"
+    path.write_bytes(delimited(*RECORDS))
+
+    check_records(list(reader.read_delimited(path)))
+    check_records(list(reader.read_delimited(str(path))))
+
+
+def test_read_delimited_empty() -> None:
+    assert list(reader.read_delimited(io.BytesIO(b""))) == []
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_read_delimited_empty_records(
+    tmp_path: pathlib.Path, use_mmap: bool
+) -> None:
+    path = tmp_path / "records.bin"
+    path.write_bytes(delimited(b"", RECORDS[0], b"", b"\x08"))
+    messages = list(reader.read_delimited(path, use_mmap=use_mmap))
+
+    assert [
+        len(message.fields) if message is not None else None
+        for message in messages
+    ] == [0, 1, 0, None]
+
+
+@pytest.mark.parametrize(
+    "test_input", [b"\x03\x08\x96", b"\x80", delimited(*RECORDS)[:-1]]
+)
+def test_read_delimited_truncated(test_input: bytes) -> None:
+    with pytest.raises(ValueError):
+        list(reader.read_delimited(io.BytesIO(test_input), read_size=2))
+
+
+@pytest.mark.parametrize("as_path", [True, False])
+def test_read_delimited_mmap(tmp_path: pathlib.Path, as_path: bool) -> None:
+    path = tmp_path / "records.bin"
+    path.write_bytes(delimited(*RECORDS))
+
+    if as_path:
+        messages = list(reader.read_delimited(path, use_mmap=True))
+    else:
+        with open(path, "rb") as stream:
+            messages = list(reader.read_delimited(stream, use_mmap=True))
+
+    check_records(messages)
+    assert isinstance(messages[1].fields[0].field_repr.chunk, memoryview)
+
+
+def test_read_delimited_mmap_empty(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "records.bin"
+    path.write_bytes(b"")
+
+    assert list(reader.read_delimited(path, use_mmap=True)) == []
+
+
+def test_read_delimited_mmap_truncated(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "records.bin"
+    path.write_bytes(delimited(*RECORDS)[:-1])
+
+    with pytest.raises(ValueError):
+        list(reader.read_delimited(path, use_mmap=True))
+
+
+MESSAGE = (
+    bytes.fromhex("08 96 01 12 04 08 01 10 02 1d 00 00 80 3f") +
+    bytes.fromhex("0a 80 01") + b"h" * 128 +
+    bytes.fromhex("09 00 00 00 00 00 00 f0 3f")
+)
+
+
+def field_summary(fields: list) -> list:
+    return [
+        (field.field_desc.field_no, field.field_repr.get_fields())
+        for field in fields
+    ]
+
+
+@pytest.mark.parametrize("piece_size", [1, 2, 3, 7, 64, len(MESSAGE)])
+def test_incremental_decoder(piece_size: int) -> None:
+    decoder = reader.IncrementalDecoder()
+    fields = []
+
+    for start in range(0, len(MESSAGE), piece_size):
+        fields += decoder.feed(MESSAGE[start:start + piece_size])
+
+    decoder.close()
+
+    assert repr(fields) == repr(parser.parse_proto(MESSAGE).fields)
+
+
+def test_incremental_decoder_emits_completed_fields() -> None:
+    decoder = reader.IncrementalDecoder()
+
+    assert decoder.feed(b"\x08") == []
+    (varint, ) = decoder.feed(b"\x01\x12\x05ab")
+    assert varint.field_repr.int == 1
+    assert decoder.feed(b"c") == []
+    (chunk, ) = decoder.feed(b"de")
+    assert chunk.field_repr.str == "abcde"
+
+    decoder.close()
+
+
+def test_incremental_decoder_waits_for_pending_field(
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    decoder = reader.IncrementalDecoder()
+    scans = []
+
+    def scan_fields(buffer: bytearray) -> tuple:
+        scans.append(len(buffer))
+
+        return core.scan_fields(buffer)
+
+    monkeypatch.setattr(reader, "scan_fields", scan_fields)
+    decoder.feed(b"\x0a\x80\x01")
+
+    for _ in range(127):
+        assert decoder.feed(b"h") == []
+
+    assert len(decoder.feed(b"h")) == 1
+    # the tail is scanned only when the pending chunk is complete
+    assert scans == [3, 131]
+
+
+def test_incremental_decoder_truncated() -> None:
+    decoder = reader.IncrementalDecoder()
+    decoder.feed(b"\x08\x01\x0a\x02h")
+
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_incremental_decoder_malformed() -> None:
+    decoder = reader.IncrementalDecoder()
+
+    # fields before the malformed one are still returned
+    assert len(decoder.feed(b"\x08\x01\x0f\x00")) == 1
+
+    with pytest.raises(ValueError):
+        decoder.feed(b"\x08\x01")
+
+    with pytest.raises(ValueError):
+        decoder.close()
@@ -0,0 +1,93 @@
+import pytest
+
+from revpbuf import parser, schema
+
+PAYLOAD = bytes.fromhex(
+    "08 96 01 12 0A 50 68 6F 6E 65 20 42 6F 6F"
+    "6B 18 01 22 0F 0A 0B 41 6C 65 78 20 49 76"
+    "61 6E 6F 76 10 01 22 0F 0A 0B 56 6F 76 61"
+    "20 50 65 74 72 6F 76 10 02 2d 00 00 20 3e"
+)
+HINTS = {1: "uint", 2: "str", 3: "sint", 4: {1: "str", 2: "uint"}, 5: "float"}
+
+
+def field_values(message: parser.MessageRepr) -> list:
+    return [
+        (
+            field.field_desc.field_no, field.field_repr.name,
+            field_values(field.field_repr.value)
+            if field.field_repr.name == "sub-msg" else field.field_repr.value
+        ) for field in message.fields
+    ]
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_parse_hinted(compiled: bool) -> None:
+    hints = schema.compile_hints(HINTS) if compiled else HINTS
+    message = schema.parse_hinted(PAYLOAD, hints)
+
+    assert field_values(message) == [
+        (1, "uint", 150),
+        (2, "str", "Phone Book"),
+        (3, "sint", -1),
+        (4, "sub-msg", [(1, "str", "Alex Ivanov"), (2, "uint", 1)]),
+        (4, "sub-msg", [(1, "str", "Vova Petrov"), (2, "uint", 2)]),
+        (5, "float", 0.15625),
+    ]
+
+
+def test_hinted_decoder_range() -> None:
+    decoder = schema.compile_hints(HINTS)
+    padded = b"\xff" + PAYLOAD + b"\xff"
+
+    assert field_values(decoder.parse(padded, 1, len(PAYLOAD) + 1)) == (
+        field_values(decoder.parse(PAYLOAD))
+    )
+    assert decoder.parse(padded, 1) is None
+
+
+def test_parse_hinted_unhinted_fields() -> None:
+    message = schema.parse_hinted(PAYLOAD, {4: {2: "sint"}})
+    blind = parser.parse_proto(PAYLOAD)
+
+    for field, blind_field in zip(message.fields, blind.fields):
+        if field.field_desc.field_no != 4:
+            assert repr(field) == repr(blind_field)
+
+    sub_message = message.fields[3].field_repr.value
+
+    assert sub_message.fields[1].field_repr.get_fields() == (("sint", -1), )
+    assert sub_message.fields[0].field_repr.str == "Alex Ivanov"
+
+
+@pytest.mark.parametrize(
+    "test_input,hints", [
+        (b"\x0a\x02\xff\xff", {1: "str"}),
+        (b"\x0a\x02\xff\xff", {1: {1: "uint"}}),
+        (b"\x08\x01", {1: "float"}),
+        (b"\x08\x01", {1: "str"}),
+    ]
+)
+def test_parse_hinted_fallback(test_input: bytes, hints: dict) -> None:
+    message = schema.parse_hinted(test_input, hints)
+
+    assert repr(message) == repr(parser.parse_proto(test_input))
+
+
+@pytest.mark.parametrize(
+    "test_input", [b"\x08", b"\x0a\x05ab", b"\x0d\x00", b"\x0b", b""]
+)
+def test_parse_hinted_malformed(test_input: bytes) -> None:
+    assert schema.parse_hinted(test_input, {1: "uint"}) is None
+
+
+def test_parse_hinted_chunk() -> None:
+    message = schema.parse_hinted(b"\x0a\x02\xff\x01", {1: "chunk"})
+
+    assert message.fields[0].field_repr.value == b"\xff\x01"
+    assert message.fields[0].field_repr.get_fields() == (("chunk", "ff 01"), )
+
+
+def test_compile_hints_unknown() -> None:
+    with pytest.raises(ValueError):
+        schema.compile_hints({1: "uint128"})